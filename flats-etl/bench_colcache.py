@@ -0,0 +1,65 @@
+import argparse
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from joblib import Parallel, delayed
+
+from colcache import cache_path, read_csv
+from synthetic import cleaned
+
+def fit(X):
+    """
+    Stand in for fitting a candidate on a fold.
+    """
+
+    return len(X)
+
+
+def benchmark(n, n_jobs, tasks):
+    """
+    Time reading the csv against its column cache, and sending
+    the data to workers pickled against memory mapped.
+    """
+
+    with TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'cleaned_data.csv'
+        cleaned(n).to_csv(path, index=False)
+        mb = path.stat().st_size / 1e6
+        print(f'{n:,} rows, {mb:,.0f}MB csv')
+
+        start = time.perf_counter()
+        df = pd.read_csv(path)
+        csv_time = time.perf_counter() - start
+        print(f'{"read csv":<28}{csv_time:7.3f}s')
+
+        start = time.perf_counter()
+        read_csv(path)
+        print(f'{"read csv, write cache":<28}{time.perf_counter() - start:7.3f}s')
+
+        start = time.perf_counter()
+        cached = read_csv(path)
+        cache_time = time.perf_counter() - start
+        size = sum(p.stat().st_size for p in cache_path(path).iterdir()) / 1e6
+        print(f'{"read cache":<28}{cache_time:7.3f}s  {csv_time / cache_time:6.0f}x, '
+              f'{size:,.0f}MB on disk')
+
+        for name, X in [('workers, pickled', df), ('workers, memory mapped', cached)]:
+            start = time.perf_counter()
+            Parallel(n_jobs=n_jobs)(delayed(fit)(X) for _ in range(tasks))
+            print(f'{name:<28}{time.perf_counter() - start:7.3f}s')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the column cache.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--n-jobs', type=int, default=4)
+    parser.add_argument('--tasks', type=int, default=40,
+                        help='tasks sent to workers, like fits of a grid search')
+    args = parser.parse_args()
+
+    benchmark(args.rows, args.n_jobs, args.tasks)
@@ -0,0 +1,106 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dedup import blocking_key, candidate_pairs, signatures, THRESHOLD
+from synthetic import listings
+
+# Share of listings that are reposts of another listing.
+REPOST_FRACTION = 0.3
+
+# Words changed in a repost.
+EDITS = 3
+
+
+def synthetic(n, n_words=60, vocabulary=20000, seed=0):
+    """
+    Generate `n` listings, some of which are reposts
+    with a few words and the price changed.
+
+    Returns
+    -------
+    DataFrame :
+        Listings with the id of the original flat in `Flat`.
+
+    """
+
+    rng = np.random.default_rng(seed)
+    words = np.array([f'w{i}' for i in range(vocabulary)])
+
+    n_flats = int(n * (1 - REPOST_FRACTION))
+    flat = np.concatenate([np.arange(n_flats), rng.integers(0, n_flats, n - n_flats)])
+
+    tokens = rng.integers(0, vocabulary, (n_flats, n_words))[flat]
+    reposts = np.arange(n_flats, n)
+    for _ in range(EDITS):
+        tokens[reposts, rng.integers(0, n_words, len(reposts))] = \
+            rng.integers(0, vocabulary, len(reposts))
+
+    df = listings(n_flats, seed=seed).iloc[flat].reset_index(drop=True)
+    change = np.where(flat == np.arange(n), 1, rng.uniform(0.97, 1.03, n))
+
+    return df.assign(Date=pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365, n), 'D'),
+                     Amount=(df['Amount'] * change).round(-3),
+                     Title=[' '.join(x) for x in words[tokens[:, :6]]],
+                     Description=[' '.join(x) for x in words[tokens[:, 6:]]],
+                     Flat=flat)
+
+
+def pair_scores(truth, labels):
+    """
+    Precision and recall of the pairs of listings clustered together.
+    """
+
+    def pairs(sizes):
+        return (sizes * (sizes - 1) // 2).sum()
+
+    both = pd.DataFrame({'truth': truth, 'labels': labels})
+    together = pairs(both.groupby(['truth', 'labels']).size())
+
+    precision = together / max(pairs(both.groupby('labels').size()), 1)
+    recall = together / max(pairs(both.groupby('truth').size()), 1)
+
+    return precision, recall
+
+
+def benchmark(sizes, threshold=THRESHOLD):
+    """
+    Time every stage of near-duplicate clustering and score its result.
+    """
+
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    print(f'{"rows":>9}{"minhash s":>11}{"lsh s":>8}{"verify s":>10}{"total s":>9}'
+          f'{"rows/s":>10}{"pairs":>11}{"precision":>11}{"recall":>8}')
+
+    for n in sizes:
+        df = synthetic(n)
+
+        t0 = time.perf_counter()
+        sig = signatures(df['Title'] + ' ' + df['Description'])
+        t1 = time.perf_counter()
+        blocks = blocking_key(df)
+        left, right = candidate_pairs(sig, blocks)
+        t2 = time.perf_counter()
+        similar = (sig[left] == sig[right]).mean(axis=1) >= threshold
+        similar &= blocks[left] == blocks[right]
+        graph = coo_matrix((np.ones(similar.sum()), (left[similar], right[similar])), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+        t3 = time.perf_counter()
+
+        precision, recall = pair_scores(df['Flat'].to_numpy(), labels)
+        print(f'{n:>9}{t1 - t0:>11.1f}{t2 - t1:>8.1f}{t3 - t2:>10.1f}{t3 - t0:>9.1f}'
+              f'{n / (t3 - t0):>10,.0f}{len(left):>11,}{precision:>11.3f}{recall:>8.3f}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark near-duplicate detection.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    benchmark(args.sizes, threshold=args.threshold)
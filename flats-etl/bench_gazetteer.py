@@ -0,0 +1,85 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl import districts
+from gazetteer import Gazetteer, tokenize
+
+# Locations with no known name, like the ones naming only the city.
+OTHER = ['Kraków, małopolskie', 'Kraków-Kraków', 'Wielicka, Kraków', 'Centrum, Kraków']
+
+
+def synthetic(names, n, seed=0):
+    """
+    Generate `n` locations naming a street or estate, written
+    the ways listings write them, with house numbers.
+    """
+
+    rng = np.random.default_rng(seed)
+    formats = np.array(['{} {}, Kraków', '{} {}, Kraków, małopolskie', '{}, Kraków, {}'])
+
+    picked = rng.choice(names, n)
+    prefixes = np.where(np.char.startswith(picked.astype(str), 'os. '), 'Osiedle ', 'ul. ')
+    picked = [p + name.replace('os. ', '') if r < 0.5 else name
+              for p, name, r in zip(prefixes, picked, rng.random(n))]
+    numbers = rng.integers(1, 200, n)
+    locations = [f.format(name, number)
+                 for f, name, number in zip(rng.choice(formats, n), picked, numbers)]
+    other = rng.random(n) < 0.1
+    locations = np.where(other, rng.choice(OTHER, n), locations)
+
+    return pd.Series(locations)
+
+
+def scan(names, labels):
+    """
+    Match every name against every location, the way
+    `etl.extract_district` matches districts.
+    """
+
+    keys = [' '.join(tokenize(name)) for name in names]
+
+    def match(x):
+        x = ' '.join(tokenize(x))
+        for key, label in zip(keys, labels):
+            if key in x:
+                return label
+        return np.nan
+
+    return match
+
+
+def benchmark(n, n_scan):
+    """
+    Time resolving locations with the gazetteer against scanning all names.
+    """
+
+    gazetteer = Gazetteer.load(districts=districts)
+    s = synthetic(gazetteer.names, n)
+
+    start = time.perf_counter()
+    resolved = gazetteer.resolve(s)
+    duration = time.perf_counter() - start
+    print(f'{n:,} locations, {s.nunique():,} distinct, {len(gazetteer.names)} names: '
+          f'gazetteer {duration:.2f}s ({n / duration:,.0f}/s), '
+          f'{resolved.notna().mean():.1%} resolved')
+
+    match = scan(gazetteer.names, gazetteer.districts)
+    start = time.perf_counter()
+    s[:n_scan].apply(match)
+    per_row = (time.perf_counter() - start) / n_scan
+    print(f'scanning all names, {per_row * n:.2f}s for {n:,} '
+          f'(from {n_scan:,}), {per_row * n / duration:.1f}x slower')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark resolving districts with the gazetteer.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--scan-rows', type=int, default=100_000,
+                        help='locations scanned, the time is extrapolated to all rows')
+    args = parser.parse_args()
+
+    benchmark(args.rows, args.scan_rows)
@@ -0,0 +1,96 @@
+import argparse
+import time
+
+import numpy as np
+
+from impute import impute
+from synthetic import cleaned
+
+# Share of Rooms and Bathrooms hidden to measure imputation quality.
+MISSING_FRACTION = 0.1
+
+
+def hide_values(df, fraction=MISSING_FRACTION, seed=0):
+    """
+    Hide a `fraction` of Rooms and Bathrooms.
+
+    Returns
+    -------
+    tuple :
+        Data with missing values and a mask of hidden values per column.
+
+    """
+
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    masks = {}
+
+    for col in ['Rooms', 'Bathrooms']:
+        masks[col] = rng.random(len(df)) < fraction
+        df[col] = df[col].astype(float).mask(masks[col])
+
+    return df, masks
+
+
+def quality(truth, imputed, masks):
+    """
+    Mean absolute error and share of exact matches on hidden values.
+    """
+
+    scores = {}
+
+    for col, mask in masks.items():
+        error = np.abs(imputed.loc[mask, col].to_numpy() - truth.loc[mask, col].to_numpy())
+        scores[col] = (error.mean(), (error == 0).mean())
+
+    return scores
+
+
+def benchmark(sizes, methods, knn_max_rows, seed=0):
+    """
+    Time imputation methods and compare the quality of their results.
+
+    Parameters
+    ----------
+    sizes : list
+        Numbers of rows to benchmark.
+    methods : list
+        Imputation methods, see `impute.impute`.
+    knn_max_rows : int
+        Largest dataset the 'knn' method is run on, it
+        needs O(n^2) time.
+
+    """
+
+    print(f'{"rows":>9} {"method":<8}{"seconds":>9}{"rows/s":>12}'
+          f'{"rooms mae":>11}{"rooms acc":>11}{"baths mae":>11}{"baths acc":>11}')
+
+    for n in sizes:
+        truth = cleaned(n, seed=seed)
+        data, masks = hide_values(truth, seed=seed)
+
+        for method in methods:
+            if method == 'knn' and n > knn_max_rows:
+                print(f'{n:>9} {method:<8}{"skipped":>9}')
+                continue
+
+            start = time.perf_counter()
+            imputed = impute(data, method=method)
+            elapsed = time.perf_counter() - start
+
+            scores = quality(truth, imputed, masks)
+            print(f'{n:>9} {method:<8}{elapsed:>9.2f}{n / elapsed:>12,.0f}'
+                  f'{scores["Rooms"][0]:>11.3f}{scores["Rooms"][1]:>11.1%}'
+                  f'{scores["Bathrooms"][0]:>11.3f}{scores["Bathrooms"][1]:>11.1%}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark imputation of Rooms and Bathrooms.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--methods', nargs='+', default=['knn', 'grouped', 'tree'])
+    parser.add_argument('--knn-max-rows', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.methods, args.knn_max_rows, seed=args.seed)
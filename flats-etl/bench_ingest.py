@@ -0,0 +1,95 @@
+import argparse
+import csv
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from ingest import SCHEMA, pa_csv, read_files
+
+WORDS = ['mieszkanie', 'sprzedaż', 'pokój', 'łazienka', 'balkon', 'piętro',
+         'osiedle', 'Kraków', 'zieleń', 'komunikacja', 'garaż', 'piwnica',
+         '"okazja"', 'cena, do negocjacji', '\n', '\n\n']
+
+
+def write_scrape(path, n, malformed, seed):
+    """
+    Write a file like the listing spider does, with descriptions of
+    many lines, quotes and commas, and `malformed` rows with an
+    extra field.
+    """
+
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SCHEMA)
+
+        for i in range(n):
+            row = [f'{rng.integers(200, 2000) * 1000:,} zł'.replace(',', ' '),
+                   'Dębniki, Kraków', '2020-09-13', 'Agencja', 'Mieszkanie',
+                   f'{rng.integers(1, 5)} pokoje', '1 łazienka', str(rng.integers(20, 120)),
+                   'Ulica', f'Mieszkanie {i}',
+                   ' '.join(rng.choice(words, 300)),
+                   f'https://www.gumtree.pl/a/{seed}/{i}']
+            if i < malformed:
+                row.append('extra')
+            writer.writerow(row)
+
+
+def benchmark(n_files, rows, malformed, jobs):
+    """
+    Read throughput of plain `pd.read_csv` against the ingestion layer.
+    """
+
+    with TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(n_files):
+            path = Path(tmp) / f'{i}.csv'
+            # Every fourth file has malformed rows.
+            write_scrape(path, rows, malformed if i % 4 == 0 else 0, seed=i)
+            paths.append(str(path))
+
+        empty = Path(tmp) / 'empty.csv'
+        empty.touch()
+        paths.append(str(empty))
+
+        mb = sum(Path(p).stat().st_size for p in paths) / 1e6
+        print(f'{n_files} files, {rows:,} rows each, {mb:,.0f}MB')
+
+        start = time.perf_counter()
+        n = 0
+        for path in paths:
+            try:
+                n += len(pd.read_csv(path, on_bad_lines='skip'))
+            except pd.errors.EmptyDataError:
+                pass
+        duration = time.perf_counter() - start
+        print(f'{"pd.read_csv":<18}{duration:7.2f}s {mb / duration:7.1f}MB/s {n:>10,} rows')
+
+        engines = ['pandas'] + (['pyarrow'] if pa_csv is not None else [])
+        for engine in engines:
+            for n_jobs in jobs:
+                start = time.perf_counter()
+                frames, report = read_files(paths, n_jobs=n_jobs, engine=engine)
+                duration = time.perf_counter() - start
+                print(f'{f"{engine} x{n_jobs}":<18}{duration:7.2f}s {mb / duration:7.1f}MB/s '
+                      f'{report["rows"].sum():>10,} rows, {report["malformed"].sum()} quarantined')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark reading scraped listings.')
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--malformed', type=int, default=5,
+                        help='malformed rows in every fourth file')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 4],
+                        help='numbers of threads to try')
+    args = parser.parse_args()
+
+    benchmark(args.files, args.rows, args.malformed, args.jobs)
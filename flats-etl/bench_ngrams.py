@@ -0,0 +1,112 @@
+import argparse
+import time
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from unidecode import unidecode
+
+from ngrams import correlate, count_matrix, hashed_matrix, top_ngrams
+
+# Words descriptions are generated from, the first ones are the most frequent.
+WORDS = ['mieszkanie', 'pokoje', 'kuchnia', 'balkon', 'blisko', 'tramwaju',
+         'sklepy', 'osiedle', 'parking', 'garaz', 'piwnica', 'winda', 'jasne',
+         'ciche', 'remontu', 'wysoki', 'standard', 'okna', 'plastikowe',
+         'ogrzewanie', 'miejskie', 'komunikacja', 'szkola', 'przedszkole',
+         'zielen', 'park', 'centrum', 'wlasnosc', 'hipoteka', 'czynsz']
+
+
+def synthetic(n, n_words=60, vocabulary=5000, seed=0):
+    """
+    Generate `n` descriptions with Zipf distributed words
+    and prices that depend on some of them.
+    """
+
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS + [f'slowo{chr(97 + i % 26)}{i}' for i in range(vocabulary)])
+    p = 1 / np.arange(1, len(words) + 1)
+    p /= p.sum()
+
+    idx = rng.choice(len(words), size=(n, n_words), p=p)
+    descriptions = [' '.join(row) for row in words[idx]]
+    amount = 400_000 + 50_000 * (idx == 3).any(axis=1) + rng.normal(0, 80_000, n)
+
+    return pd.DataFrame({'Description': descriptions, 'Amount': amount.round(-3)})
+
+
+def notebook(df, n=75):
+    """
+    N-gram ranking as done in the wrangling notebook.
+    """
+
+    data_text = df[['Amount', 'Description']].copy()
+    data_text['Description'] = data_text['Description'].apply(unidecode)
+
+    text = ' '.join(data_text['Description'].to_list()).split(' ')
+    text = [x for x in text if x.isalpha() and len(x) > 3]
+
+    counters = {'uni': Counter(text),
+                'bi': Counter(zip(text, text[1:])),
+                'tri': Counter(zip(text, text[1:], text[2:]))}
+
+    features = {}
+    for prefix, counter in counters.items():
+        for gram, count in counter.most_common(100):
+            if count > 25:
+                words = [gram] if prefix == 'uni' else list(gram)
+                features[prefix + '_' + '_'.join(words)] = \
+                    data_text['Description'].str.contains(' '.join(words)).astype(int)
+
+    features = pd.DataFrame(features)
+    corrs = features.corrwith(data_text['Amount']).abs()
+
+    return corrs.sort_values(ascending=False).head(n)
+
+
+def timed(f, *args, **kwargs):
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark(sizes, notebook_max_rows):
+    """
+    Time the notebook n-gram analysis against sparse n-gram matrices.
+    """
+
+    print(f'{"rows":>9}{"notebook s":>12}{"sparse s":>10}{"hashed s":>10}'
+          f'{"ngrams":>9}{"nnz":>12}{"matrix MB":>11}')
+
+    for n in sizes:
+        df = synthetic(n)
+
+        if n <= notebook_max_rows:
+            _, t_notebook = timed(notebook, df)
+            t_notebook = f'{t_notebook:>12.2f}'
+        else:
+            t_notebook = f'{"skipped":>12}'
+
+        _, t_sparse = timed(top_ngrams, df)
+
+        start = time.perf_counter()
+        X = hashed_matrix(df['Description'])
+        correlate(X, df['Amount'].to_numpy())
+        t_hashed = time.perf_counter() - start
+
+        X, names = count_matrix(df['Description'])
+        size = (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 2 ** 20
+
+        print(f'{n:>9}{t_notebook}{t_sparse:>10.2f}{t_hashed:>10.2f}'
+              f'{len(names):>9}{X.nnz:>12,}{size:>11.1f}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark description n-gram mining.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000, 200_000])
+    parser.add_argument('--notebook-max-rows', type=int, default=50_000)
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.notebook_max_rows)
@@ -0,0 +1,140 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rules import MATCHERS, RULES
+
+
+# The hand written parsers the rules replaced, kept
+# to check that labels and priorities are unchanged.
+def parse_seller(x):
+    if pd.isnull(x):
+        return x
+    if not isinstance(x, str):
+        return np.nan
+    x = x.lower()
+    if 'agencja' in x:
+        return 'realtor'
+    elif 'właściciel' in x:
+        return 'owner'
+    return np.nan
+
+
+def parse_property(x):
+    if pd.isnull(x):
+        return x
+    if not isinstance(x, str):
+        return np.nan
+    x = x.lower()
+    if 'dom' in x:
+        return 'house'
+    elif 'mieszkanie' in x:
+        return 'flat'
+    return np.nan
+
+
+def parse_parking(x):
+    if pd.isnull(x):
+        return x
+    if not isinstance(x, str):
+        return np.nan
+    x = x.lower()
+    if 'garaż' in x:
+        return 'garage'
+    elif 'kryty' in x:
+        return 'covered'
+    elif 'ulica' in x:
+        return 'street'
+    elif 'brak' in x:
+        return 'no parking'
+    return np.nan
+
+
+def extract_currency(x):
+    if pd.isnull(x):
+        return x
+    if not isinstance(x, str):
+        return np.nan
+    x = x.lower()
+    if 'zł' in x or 'pln' in x:
+        return 'pln'
+    return np.nan
+
+
+def extract_city(x):
+    if pd.isnull(x):
+        return x
+    if not isinstance(x, str):
+        return np.nan
+    x = [s.strip().lower() for s in x.split(',')]
+    if 'kraków' in x or 'krakow' in x or 'cracow' in x:
+        return 'kraków'
+    return np.nan
+
+
+REFERENCE = {'Seller': parse_seller,
+             'Property': parse_property,
+             'Parking': parse_parking,
+             'Currency': extract_currency,
+             'City': extract_city}
+
+# Values like the scraped ones, with keywords in both orders,
+# other cases, missing values and values of other types.
+VALUES = {'Seller': ['Agencja', 'Właściciel', 'AGENCJA nieruchomości', 'właściciel, agencja',
+                     'inny', '', None, 12],
+          'Property': ['Dom', 'Mieszkanie', 'mieszkanie w domu', 'Domek', 'Działka', None],
+          'Parking': ['Garaż', 'Kryty', 'Ulica', 'Brak', 'ulica, garaż', 'brak, kryty',
+                      'Parking', None],
+          'Currency': ['Proszę o kontakt', 'PLN', 'EUR', None, 100000.0],
+          'City': ['Piotra Stachiewicza, Kraków-Krowodrza, Kraków', 'Modlniczka, krakowski',
+                   'os. Na Stoku, Kraków-Nowa Huta,  Kraków ', 'Cracow', 'krakow,x',
+                   'Wieliczka, wielicki', None]}
+
+
+def synthetic(col, n, seed=0):
+    """
+    Generate `n` values of the source column of `col`.
+    """
+
+    rng = np.random.default_rng(seed)
+    values = pd.Series(rng.choice(np.array(VALUES[col], dtype=object), n))
+
+    if col == 'Currency':
+        # Prices are mostly distinct.
+        prices = pd.Series([f'{x:,} zł'.replace(',', ' ') for x in rng.integers(100, 3000, n) * 1000])
+        values = values.where(rng.random(n) < 0.1, prices)
+
+    return values
+
+
+def benchmark(n):
+    """
+    Time every rule set against its hand written parser.
+    """
+
+    for col in RULES:
+        s = synthetic(col, n)
+        uniques = s.nunique()
+
+        start = time.perf_counter()
+        expected = s.apply(REFERENCE[col])
+        reference = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = MATCHERS[col](s)
+        duration = time.perf_counter() - start
+
+        assert result.fillna('-').tolist() == expected.fillna('-').tolist()
+        print(f'{col:<10}{uniques:>9,} distinct  apply {reference:6.2f}s  '
+              f'rules {duration:6.2f}s  {reference / duration:6.1f}x')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the rules of categorical columns.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    benchmark(args.rows)
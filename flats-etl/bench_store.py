@@ -0,0 +1,62 @@
+import argparse
+import os
+import time
+
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from store import ListingStore
+from synthetic import listings
+
+def timed(f, *args, **kwargs):
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark(n, repeat=5):
+    """
+    Compare common queries on the store with reading the csv into pandas.
+    """
+
+    with TemporaryDirectory() as tmp:
+        csv = os.path.join(tmp, 'raw_data.csv')
+        listings(n).to_csv(csv, index=False)
+
+        store = ListingStore(os.path.join(tmp, 'listings.sqlite'))
+        _, t_load = timed(store.load_csv, csv)
+        print(f'Loaded {n:,} listings in {t_load:.1f}s.')
+
+        def pandas_median():
+            df = pd.read_csv(csv, lineterminator='\n')
+            df = df[(df['City'] == 'kraków') & (df['Currency'] == 'pln') & (df['Property'] == 'flat')]
+            df = df.assign(week=pd.to_datetime(df['Date']).dt.strftime('%Y-%W'),
+                           price_m2=df['Amount'] / df['Area'])
+            return df.groupby(['District', 'week'])['price_m2'].median()
+
+        queries = {'pandas: median price/m2 by district and week': pandas_median,
+                   'store: median price/m2 by district and week': store.price_m2,
+                   'store: one district': lambda: store.price_m2(district='krowodrza'),
+                   'store: district summary view': lambda: store.query('SELECT * FROM district_summary'),
+                   'store: listings of one link': lambda: store.query(
+                       'SELECT * FROM listings WHERE link = ?', (f'/a-mieszkania-i-domy-sprzedam-i-kupie/krakow/{n // 2}',)),
+                   'store: listings of one day': lambda: store.query(
+                       "SELECT COUNT(*) FROM listings WHERE date = '2020-01-01'")}
+
+        for name, query in queries.items():
+            times = [timed(query)[1] for _ in range(repeat)]
+            print(f'{name:<50}{np.median(times) * 1000:>10.1f} ms')
+
+        store.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark queries on the analytical store.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    benchmark(args.rows, repeat=args.repeat)
@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from unidecode import unidecode
+
+from translit import transliterate_series
+
+WORDS = ['mieszkanie', 'sprzedaż', 'pokój', 'łazienka', 'kuchnią', 'balkonem',
+         'piętro', 'osiedle', 'Kraków', 'Podgórze', 'Dębniki', 'Krowodrza',
+         'zieleń', 'komunikacja', 'sklepy', 'szkoła', 'przedszkole', 'w', 'z',
+         'bardzo', 'dobrej', 'lokalizacji', 'ciche', 'słoneczne', 'wykończone',
+         'miejsce', 'postojowe', 'garaż', 'piwnica', 'komórka', 'lokatorska',
+         '50 m²', '–', '„idealne”', 'okolicy']
+
+# Characters only unidecode knows, put in a share of the rows.
+OTHER = ['🏠', '✔', 'ß', 'ø', '™']
+
+
+def synthetic(n, n_words=250, other_fraction=0.05, seed=0):
+    """
+    Generate `n` texts like the `Full Text` of listings, with
+    whole descriptions of around 2,000 characters.
+    """
+
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS + OTHER)
+
+    tokens = rng.integers(0, len(WORDS), (n, n_words))
+    other = rng.random(n) < other_fraction
+    tokens[other, 0] = rng.integers(len(WORDS), len(words), other.sum())
+
+    return pd.Series([' '.join(x) for x in words[tokens]])
+
+
+def benchmark(sizes, jobs):
+    """
+    Time unidecode on every row against the translation table fast path.
+    """
+
+    for n in sizes:
+        s = synthetic(n)
+        mb = s.str.len().sum() / 1e6
+
+        start = time.perf_counter()
+        expected = s.apply(unidecode)
+        baseline = time.perf_counter() - start
+        print(f'{n:>9,} rows, {mb:,.0f}M chars  unidecode      {baseline:7.2f}s')
+
+        for n_jobs in jobs:
+            start = time.perf_counter()
+            result = transliterate_series(s, n_jobs=n_jobs)
+            duration = time.perf_counter() - start
+
+            assert result.tolist() == expected.tolist()
+            print(f'{"":>26}table x{n_jobs:<7} {duration:7.2f}s  '
+                  f'{baseline / duration:5.1f}x')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark transliteration of Full Text.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 4],
+                        help='numbers of processes to try')
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.jobs)
@@ -0,0 +1,84 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from sketch import KLLSketch
+from wrangle import AMOUNT_QUANTILES
+
+# Values generated and sketched at once.
+CHUNK_SIZE = 100_000
+
+
+def chunks(n, seed=0):
+    """
+    Generate `n` amounts in chunks, so that
+    they never have to be held in memory at once.
+    """
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, CHUNK_SIZE):
+        yield rng.lognormal(13.5, 0.5, min(CHUNK_SIZE, n - start)).round(-3)
+
+
+def exact(n):
+    values = pd.Series(np.concatenate(list(chunks(n))))
+    return tuple(values.quantile(list(AMOUNT_QUANTILES)))
+
+
+def streaming(n):
+    seeds = np.random.SeedSequence(0)
+    sketch = KLLSketch(seed=seeds.spawn(1)[0])
+    for chunk in chunks(n):
+        sketch.merge(KLLSketch(seed=seeds.spawn(1)[0]).add(chunk))
+    return tuple(sketch.quantile(q) for q in AMOUNT_QUANTILES), sketch
+
+
+def measure(f, *args):
+    """
+    Run `f` and report its result, seconds and peak traced memory in MB.
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = f(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def benchmark(sizes):
+    """
+    Compare exact quantiles with streaming sketches on trimming bounds of `Amount`.
+    """
+
+    print(f'{"rows":>11}{"method":>8}{"seconds":>9}{"peak MB":>9}'
+          f'{"lower":>11}{"upper":>12}{"rank err":>10}{"bound":>8}')
+
+    for n in sizes:
+        bounds, t, mem = measure(exact, n)
+        print(f'{n:>11,}{"exact":>8}{t:>9.2f}{mem:>9.1f}{bounds[0]:>11,.0f}{bounds[1]:>12,.0f}')
+
+        (estimates, sketch), t, mem = measure(streaming, n)
+
+        # Rank of the estimates among all values, to measure the real error.
+        below = np.zeros(2)
+        for chunk in chunks(n):
+            below += [(chunk < x).sum() for x in estimates]
+        error = np.abs(below / n - AMOUNT_QUANTILES).max()
+
+        print(f'{n:>11,}{"sketch":>8}{t:>9.2f}{mem:>9.1f}{estimates[0]:>11,.0f}'
+              f'{estimates[1]:>12,.0f}{error:>10.3%}{sketch.rank_error():>8.2%}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark outlier trimming with quantile sketches.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    benchmark(args.sizes)
@@ -0,0 +1,81 @@
+import argparse
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from etl import districts, parse_listings
+from validate import CATEGORIES, validate
+
+WORDS = ['mieszkanie', 'balkon', 'ogród', 'taras', 'piwnica', 'nowe', 'w bloku',
+         'w kamienicy', 'apartament', 'kawalerka', 'komunikacji miejskiej', 'widok']
+
+LOCATIONS = ['Piotra Stachiewicza, Kraków-Krowodrza, Kraków',
+             'os. Na Stoku, Kraków-Nowa Huta, Kraków',
+             'Kraków-Dębniki, Kraków',
+             'Modlniczka, Wielka Wieś, krakowski']
+
+
+def synthetic(n, n_words=40, invalid=0.01, seed=0):
+    """
+    Generate `n` scraped listings with translated columns,
+    a share `invalid` of them with prices of a few zloty.
+    """
+
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+
+    price = rng.integers(200, 3000, n) * 1000
+    price[rng.random(n) < invalid] = 1
+    scraped = pd.Timestamp('2020-09-13')
+
+    df = pd.DataFrame({'Price': [f'{x:,} zł'.replace(',', ' ') for x in price],
+                       'Location': rng.choice(LOCATIONS, n),
+                       'Date': (scraped - pd.to_timedelta(rng.integers(0, 60, n), 'D')).strftime('%Y-%m-%d'),
+                       'Seller': rng.choice(['Agencja', 'Właściciel'], n),
+                       'Property': rng.choice(['Mieszkanie', 'Dom'], n),
+                       'Rooms': rng.choice(['Kawalerka lub garsoniera', '2 pokoje', '3 pokoje'], n),
+                       'Bathrooms': rng.choice(['1 łazienka', '2 łazienki'], n),
+                       'Area': rng.integers(20, 150, n),
+                       'Parking': rng.choice(['Ulica', 'Garaż', 'Brak'], n),
+                       'Title': [f'Mieszkanie {i}!!' for i in range(n)],
+                       'Description': [' '.join(x) for x in rng.choice(words, (n, n_words))],
+                       'Link': [f'https://www.gumtree.pl/a/{i}' for i in range(n)]})
+
+    return df, pd.Series(scraped, index=df.index)
+
+
+def benchmark(n):
+    """
+    Time validation against parsing and writing the same listings.
+    """
+
+    df, scraped = synthetic(n)
+    categories = {**CATEGORIES, 'District': list(districts)}
+
+    with TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        df = parse_listings(df)
+        df.to_csv(Path(tmp) / 'raw_data.csv', index=False)
+        etl = time.perf_counter() - start
+
+        start = time.perf_counter()
+        valid, report = validate(df, scraped=scraped, categories=categories,
+                                 report_path=Path(tmp) / 'raw_report.json',
+                                 quarantine_path=Path(tmp) / 'raw_invalid.csv')
+        duration = time.perf_counter() - start
+
+    print(f'{n:,} listings, parse and write {etl:.1f}s, validate {duration:.2f}s '
+          f'({duration / etl:.1%} overhead), {report["quarantined"]:,} quarantined.')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the validation of parsed listings.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    benchmark(args.rows)
@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Bump when the layout of the cache changes.
+CACHE_VERSION = 1
+
+
+def cache_path(path):
+    """
+    Directory of the column cache of a csv file.
+
+    Examples
+    --------
+    >>> cache_path('../flats-data/cleaned_data.csv').name
+    'cleaned_data.cols'
+
+    """
+
+    return Path(path).with_suffix('.cols')
+
+
+def signature(path):
+    """
+    Size and modification time of a file, the cache of
+    a csv is fresh while they are unchanged.
+    """
+
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def codes_dtype(n):
+    """
+    Smallest integer type for codes of `n` categories, the one
+    pandas uses so that codes are not copied when read.
+    """
+
+    for dtype in [np.int8, np.int16, np.int32]:
+        if n < np.iinfo(dtype).max:
+            return dtype
+
+    return np.int64
+
+
+class ColumnCache:
+    """
+    Columns of a DataFrame saved as one `.npy` file each.
+
+    Numbers and booleans are saved as they are and dates as
+    nanoseconds. Text is dictionary encoded into integer codes,
+    with the distinct values in a json file, and read back as a
+    Categorical. Columns are memory mapped when read, so processes
+    reading the same cache share its pages instead of each holding
+    a copy, and joblib passes memory mapped arrays to workers by
+    file name rather than pickling them.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the cache.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> df = pd.DataFrame({'District': ['podgorze', None, 'podgorze'],
+    ...                    'Area': [50.0, 61.5, 38.0]})
+    >>> with tempfile.TemporaryDirectory() as tmp:
+    ...     cache = ColumnCache(f'{tmp}/data.cols')
+    ...     cache.write(df)
+    ...     cached = cache.read()
+    >>> cached['District'].tolist()
+    ['podgorze', nan, 'podgorze']
+    >>> cached['Area'].tolist()
+    [50.0, 61.5, 38.0]
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def meta(self):
+        path = self.path / 'meta.json'
+        if not path.exists():
+            return None
+
+        meta = json.loads(path.read_text())
+        return meta if meta.get('version') == CACHE_VERSION else None
+
+    def fresh(self, source):
+        """
+        Check if the cache was written from `source` as it is now.
+        """
+
+        meta = self.meta()
+        return meta is not None and meta.get('source') == signature(source)
+
+    def write(self, df, source=None):
+        """
+        Save the columns of `df`, replacing the cache.
+
+        Parameters
+        ----------
+        df : DataFrame
+            Data to save, its index is not kept.
+        source : str or None
+            File the data was read from, see `fresh`.
+
+        """
+
+        # Write next to the cache and swap it in, so that
+        # readers never see a partially written cache.
+        tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        columns = []
+        for i, (name, col) in enumerate(df.items()):
+            entry = {'name': name, 'file': f'{i}.npy'}
+
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                entry['kind'] = 'category'
+                values = col.cat.codes.to_numpy()
+                categories = col.cat.categories.tolist()
+            elif pd.api.types.is_datetime64_any_dtype(col):
+                entry['kind'] = 'datetime'
+                values = col.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            elif pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+                entry['kind'] = 'numeric'
+                values = col.to_numpy()
+            else:
+                entry['kind'] = 'category'
+                values, categories = pd.factorize(col)
+                categories = categories.tolist()
+
+            if entry['kind'] == 'category':
+                values = values.astype(codes_dtype(len(categories)))
+                entry['categories'] = f'{i}.json'
+                (tmp / entry['categories']).write_text(json.dumps(categories))
+
+            np.save(tmp / entry['file'], values)
+            columns.append(entry)
+
+        meta = {'version': CACHE_VERSION,
+                'rows': len(df),
+                'columns': columns,
+                'source': signature(source) if source is not None else None}
+        (tmp / 'meta.json').write_text(json.dumps(meta, indent=2))
+
+        old = self.path.with_name(f'{self.path.name}.{os.getpid()}.old')
+        if self.path.exists():
+            self.path.rename(old)
+        tmp.rename(self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def read(self, columns=None, mmap=True):
+        """
+        Read columns of the cache.
+
+        Parameters
+        ----------
+        columns : list or None
+            Names of columns to read, all if None.
+        mmap : bool
+            Memory map the columns instead of reading them into memory.
+
+        Returns
+        -------
+        DataFrame :
+            Cached data, text columns as Categoricals.
+
+        """
+
+        meta = self.meta()
+        if meta is None:
+            raise FileNotFoundError(f'No column cache in {self.path}.')
+
+        entries = {c['name']: c for c in meta['columns']}
+        names = columns if columns is not None else list(entries)
+
+        data = {}
+        for name in names:
+            entry = entries[name]
+            values = np.load(self.path / entry['file'], mmap_mode='r' if mmap else None)
+
+            if entry['kind'] == 'category':
+                categories = json.loads((self.path / entry['categories']).read_text())
+                values = pd.Categorical.from_codes(values, categories)
+            elif entry['kind'] == 'datetime':
+                values = values.view('datetime64[ns]')
+
+            data[name] = values
+
+        # Without copy, every column keeps its memory mapped array.
+        return pd.DataFrame(data, columns=names, copy=False)
+
+
+def read_csv(path, columns=None, **kwargs):
+    """
+    Read a csv file through its column cache.
+
+    The cache next to the file is read if it is fresh, otherwise
+    the csv is parsed and the cache written for next time.
+
+    Parameters
+    ----------
+    path : str
+        Path to the csv file.
+    columns : list or None
+        Names of columns to read, all if None.
+    **kwargs :
+        Passed to `pd.read_csv` when the cache is not fresh.
+
+    """
+
+    cache = ColumnCache(cache_path(path))
+
+    if not cache.fresh(path):
+        cache.write(pd.read_csv(path, **kwargs), source=path)
+
+    return cache.read(columns=columns)
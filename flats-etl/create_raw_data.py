@@ -1,4 +1,3 @@
-from etl import transform
 from os import listdir
 from os.path import isfile
 
@@ -8,18 +7,58 @@ path_listings = '../flats-data/listings'
 # Output path
 path_cleaned = '../flats-data/'
 
-files_to_open = list()
+# Analytical store
+path_db = '../flats-data/listings.sqlite'
 
-# Gather files
-for folder in listdir(path_listings):
-    path_scrape = f'{path_listings}/{folder}'
-    for f in listdir(path_scrape):
-        path = f'{path_listings}/{folder}/{f}'
-        if isfile(path) and path.endswith('.csv'):
-            files_to_open.append(path)
 
-print(files_to_open)
+def gather_files(path_listings, before=None):
+    """
+    List csv files of all scrapes.
 
-# Create cleaned dataset.
-transform(in_path=files_to_open, 
-          out_path=path_cleaned)
\ No newline at end of file
+    Parameters
+    ----------
+    path_listings : str
+        Folder with a folder for every scrape,
+        named with its unix timestamp in ms.
+    before : int or None
+        Only scrapes started before this timestamp, so
+        scrapes still running are left out.
+
+    Notes
+    -----
+    Entries not named with a timestamp are skipped.
+    """
+
+    files_to_open = list()
+
+    for folder in listdir(path_listings):
+        if not folder.isdigit():
+            continue
+        if before is not None and int(folder) >= before:
+            continue
+        path_scrape = f'{path_listings}/{folder}'
+        for f in listdir(path_scrape):
+            path = f'{path_listings}/{folder}/{f}'
+            if isfile(path) and path.endswith('.csv'):
+                files_to_open.append(path)
+
+    return files_to_open
+
+
+def main(path_listings=path_listings, path_cleaned=path_cleaned, path_db=path_db, before=None):
+    """
+    Create raw dataset from all scrapes.
+    """
+
+    from etl import transform
+
+    files_to_open = gather_files(path_listings, before=before)
+    print(files_to_open)
+
+    transform(in_path=files_to_open, 
+              out_path=path_cleaned,
+              db_path=path_db)
+
+
+if __name__ == '__main__':
+    main()
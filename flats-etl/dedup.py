@@ -0,0 +1,264 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Number of hash functions in a MinHash signature, split into
+# bands of rows for locality sensitive hashing. Listings sharing
+# a band become candidates, with 16 bands of 4 rows that is likely
+# above a Jaccard similarity of about (1 / 16) ** (1 / 4) = 0.5.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity above which candidates are duplicates.
+THRESHOLD = 0.7
+
+# Number of words in a shingle.
+SHINGLE = 2
+
+# Width in m2 of the area buckets in the blocking key.
+AREA_BUCKET = 5
+
+# Listings whose signatures are computed at once, bounds memory use.
+CHUNK_SIZE = 50_000
+
+SEED = 123
+
+
+def _hash_functions(seed=SEED):
+    """
+    Draw the multiply-shift hash functions used for MinHash.
+    """
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+    return a, b
+
+
+def shingles(texts):
+    """
+    Hash the word shingles of every text.
+
+    Parameters
+    ----------
+    texts : Series
+        Texts with a default index.
+
+    Returns
+    -------
+    tuple :
+        Shingle hashes and the position of the text of
+        every hash, sorted by position. Texts shorter than
+        a shingle are represented by their words.
+
+    """
+
+    words = texts.fillna('').str.lower().str.split().explode().dropna()
+    doc = words.index.to_numpy()
+    h = pd.util.hash_array(words.to_numpy(dtype=object))
+
+    combined = h[:len(h) - SHINGLE + 1].copy()
+    valid = np.ones(len(combined), dtype=bool)
+    for i in range(1, SHINGLE):
+        combined = combined * np.uint64(0x9E3779B97F4A7C15) + h[i:len(h) - SHINGLE + 1 + i]
+        valid &= doc[:len(combined)] == doc[i:i + len(combined)]
+
+    hashes, positions = combined[valid], doc[:len(combined)][valid]
+
+    short = ~np.isin(doc, positions)
+    if short.any():
+        hashes = np.concatenate([hashes, h[short]])
+        positions = np.concatenate([positions, doc[short]])
+        order = np.argsort(positions, kind='stable')
+        hashes, positions = hashes[order], positions[order]
+
+    return hashes, positions
+
+
+def signatures(texts, chunk_size=CHUNK_SIZE, seed=SEED):
+    """
+    Compute MinHash signatures of texts.
+
+    Returns
+    -------
+    ndarray :
+        Array of shape (n_texts, NUM_PERM). Empty texts get
+        signatures that do not match any other.
+
+    Examples
+    --------
+    >>> s = signatures(pd.Series(['duze mieszkanie z balkonem blisko centrum',
+    ...                           'duze mieszkanie z balkonem blisko parku',
+    ...                           'kawalerka na nowym osiedlu']))
+    >>> bool((s[0] == s[1]).mean() > (s[0] == s[2]).mean())
+    True
+
+    """
+
+    a, b = _hash_functions(seed)
+    texts = texts.reset_index(drop=True)
+    sig = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts.iloc[start:start + chunk_size].reset_index(drop=True)
+        hashes, positions = shingles(chunk)
+
+        present, starts = np.unique(positions, return_index=True)
+        block = np.empty((len(chunk), NUM_PERM), dtype=np.uint32)
+
+        # Unique values that never collide with each other,
+        # hashed values above are below 2 ** 32.
+        block[:] = (start + np.arange(len(chunk)))[:, None] % 2 ** 32
+
+        if len(hashes):
+            for p in range(NUM_PERM):
+                values = (a[p] * hashes + b[p]) >> np.uint64(32)
+                block[present, p] = np.minimum.reduceat(values, starts)
+
+        sig[start:start + chunk_size] = block
+
+    return sig
+
+
+def blocking_key(df):
+    """
+    Group listings by District, Rooms and Area bucket.
+
+    Returns
+    -------
+    ndarray :
+        Integer block of every listing.
+
+    """
+
+    keys = pd.DataFrame({'District': df['District'].fillna(''),
+                         'Rooms': df['Rooms'].fillna(-1).to_numpy(),
+                         'Area': (df['Area'] // AREA_BUCKET).fillna(-1).to_numpy()})
+
+    return keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+
+
+def candidate_pairs(sig, blocks):
+    """
+    Find pairs of listings in the same block sharing a band.
+
+    Within every band, listings are sorted by the hash of their
+    block and band values, and each listing is paired with the
+    first one of its bucket, so the number of pairs is linear in
+    the number of listings.
+
+    Returns
+    -------
+    tuple :
+        Arrays of the positions of both listings in every pair.
+
+    """
+
+    left, right = [], []
+    blocks = blocks.astype(np.uint64)
+
+    for band in range(BANDS):
+        h = blocks * np.uint64(0x9E3779B97F4A7C15)
+        for r in range(band * ROWS, (band + 1) * ROWS):
+            h = (h ^ sig[:, r].astype(np.uint64)) * np.uint64(0xBF58476D1CE4E5B9)
+
+        order = np.argsort(h, kind='stable')
+        h = h[order]
+
+        new = np.ones(len(h), dtype=bool)
+        new[1:] = h[1:] != h[:-1]
+        first = np.maximum.accumulate(np.where(new, np.arange(len(h)), 0))
+
+        left.append(order[first[~new]])
+        right.append(order[~new])
+
+    left, right = np.concatenate(left), np.concatenate(right)
+    pairs = np.unique(np.column_stack([left, right]), axis=0)
+
+    return pairs[:, 0], pairs[:, 1]
+
+
+def clusters(df, threshold=THRESHOLD):
+    """
+    Cluster near-duplicate listings.
+
+    Listings are compared on the shingles of their title and
+    description, but only within the same blocking key.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Listings with `Title`, `Description`, `District`,
+        `Rooms` and `Area`.
+    threshold : float
+        Estimated Jaccard similarity above which
+        listings are duplicates.
+
+    Returns
+    -------
+    ndarray :
+        Cluster label of every listing.
+
+    """
+
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    text = df['Title'].fillna('') + ' ' + df['Description'].fillna('')
+    sig = signatures(text)
+    blocks = blocking_key(df)
+
+    left, right = candidate_pairs(sig, blocks)
+
+    similar = (sig[left] == sig[right]).mean(axis=1) >= threshold
+    similar &= blocks[left] == blocks[right]
+    left, right = left[similar], right[similar]
+
+    n = len(df)
+    graph = coo_matrix((np.ones(len(left)), (left, right)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+
+    return labels
+
+
+def deduplicate(df, threshold=THRESHOLD):
+    """
+    Keep the latest listing of every cluster of near-duplicates.
+
+    Returns
+    -------
+    DataFrame :
+        Listings without near-duplicates, in their original order.
+
+    """
+
+    labels = clusters(df, threshold=threshold)
+
+    keep = (pd.DataFrame({'Date': df['Date'].to_numpy(), 'label': labels})
+            .sort_values('Date', ascending=False, na_position='last', kind='stable')
+            .drop_duplicates('label')
+            .index)
+
+    return df.iloc[np.sort(keep)].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Remove near-duplicate listings.')
+    parser.add_argument('--in', dest='in_path', default='../flats-data/raw_data.csv')
+    parser.add_argument('--out', dest='out_path', default='../flats-data/deduplicated_data.csv')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.in_path, lineterminator='\n')
+
+    start = time.perf_counter()
+    deduplicated = deduplicate(df, threshold=args.threshold)
+    duration = time.perf_counter() - start
+
+    print(f'Kept {len(deduplicated)} of {len(df)} listings in {duration:.1f}s.')
+    deduplicated.to_csv(args.out_path, index=False)
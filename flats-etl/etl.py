@@ -2,8 +2,16 @@ import pandas as pd
 import numpy as np
 import re 
 
+from pathlib import Path
 from unidecode import unidecode
 
+from colcache import ColumnCache, cache_path
+from gazetteer import Gazetteer
+from ingest import read_file, read_files
+from rules import MATCHERS, apply_rules
+from translit import transliterate, transliterate_series
+from validate import CATEGORIES, validate
+
 # Map district in Kraków to integers.
 # For details see:
 # https://en.wikipedia.org/wiki/Districts_of_Krak%C3%B3w
@@ -32,6 +40,10 @@ districts = {'stare miasto': 1,
 for key in list(districts.keys()):
     districts[unidecode(key)] = districts.pop(key)
 
+# Binary columns extracted from the listing text.
+BINARY = ['Garden', 'Balcony', 'Terrace', 'Basement', 'New',
+          'Block', 'Townhouse', 'Apartment', 'Bus stops', 'Studio']
+
 # Translate data from polish to english.
 translation = {'Cena': 'Price',
                'Lokalizacja': 'Location',
@@ -59,7 +71,7 @@ def remove_polish_characters(x):
     if pd.isnull(x):
         return x
     else:
-        x = unidecode(x)
+        x = transliterate(x)
         return x
 
 def parse_price(x):
@@ -129,18 +141,8 @@ def extract_currency(x):
 
     """
 
-    if pd.isnull(x):
-        return x
-    else:
-        if isinstance(x, str):
-            x = x.lower()            
-            if 'zł' in x or 'zł' in x or 'pln' in x:
-                return 'pln'
-            else:
-                return np.nan
-        else:
-            return np.nan               
-        
+    return MATCHERS['Currency'].match(x)
+
 def parse_bathrooms(x):    
     """
     Extract first digit from string 
@@ -265,19 +267,8 @@ def extract_city(x):
     nan
 
     """
-    
-    if pd.isnull(x):
-        return x
-    else:
-        if isinstance(x, str):
-            x = x.split(',')        
-            x = [s.strip().lower() for s in x]
-            if 'kraków' in x or 'krakow' in x or 'cracow' in x:
-                return 'kraków'
-            else:
-                return np.nan
-        else:
-            return np.nan
+
+    return MATCHERS['City'].match(x)
 
 def extract_district(x):
     """
@@ -330,35 +321,11 @@ def parse_seller(x):
     """
     Translate seller column to english.
     """
-    
-    if pd.isnull(x):
-        return x
-    else:
-        if isinstance(x, str):
-            x = x.lower()
-            if 'agencja' in x:
-                return 'realtor'
-            elif 'właściciel' in x:
-                return 'owner'
-            else:
-                return np.nan
-        else:
-            return np.nan                
+
+    return MATCHERS['Seller'].match(x)
 
 def parse_property(x):
-    if pd.isnull(x):
-        return x
-    else:
-        if isinstance(x, str):
-            x = x.lower()
-            if 'dom' in x:
-                return 'house'
-            elif 'mieszkanie' in x:
-                return 'flat'
-            else:
-                return np.nan
-        else:
-            return np.nan
+    return MATCHERS['Property'].match(x)
 
 def parse_parking(x):
     """
@@ -374,23 +341,7 @@ def parse_parking(x):
     'no parking'
     """
 
-    if pd.isnull(x):
-        return x
-    else:
-        if isinstance(x, str):
-            x = x.lower()
-            if 'garaż' in x:
-                return 'garage'
-            elif 'kryty' in x:
-                return 'covered'
-            elif 'ulica' in x:
-                return 'street'
-            elif 'brak' in x:
-                return 'no parking'
-            else:
-                return np.nan
-        else:
-            return np.nan
+    return MATCHERS['Parking'].match(x)
 
 def extract_garden(x):
     """
@@ -686,60 +637,76 @@ def get_data(path):
         return
     else:
         try:
-            data = pd.read_csv(path)
+            data, bad = read_file(path)
         except FileNotFoundError:
             print(f'{path} does not exist.')
             return
         else:
+            if bad:
+                print(f'Skipped {len(bad)} malformed rows.')
             print(f'Data read.')
             return data
 
 
 
-def transform(in_path, out_path, prefix='raw'):
+def scrape_time(path):
+    """
+    Get the time of a scrape from the name of its folder.
 
-    if isinstance(in_path, list):
-        dfs = list()
-        for path in in_path:
-            try:
-                tmp = get_data(path=path)
-            except pd.errors.EmptyDataError:
-                pass
-            else:
-                dfs.append(tmp)
-        df = pd.concat(dfs)
-        df = df.reset_index(drop=True)
-    elif isinstance(in_path, str):
-        df = get_data(path=in_path)
-    else:
-        print(f'in_path should be string or list, got {type(in_path)} instead.')
-        return
+    Returns
+    -------
+    Timestamp : Time of the scrape, NaT if the folder is not named
+        with a timestamp in milliseconds.
 
-    df = translate_cols(df)
+    Examples
+    --------
+    >>> scrape_time('../flats-data/listings/1600000000000/data.csv')
+    Timestamp('2020-09-13 12:26:40')
 
-    nrows_before = len(df)
-    print(f'Rows before transforming {nrows_before}.')
-    print('Missing before processing:')    
-    print(count_missing(df))
+    """
+
+    try:
+        ms = int(Path(path).parent.name)
+    except ValueError:
+        return pd.NaT
+
+    return pd.Timestamp(ms, unit='ms')
+
+def parse_listings(df):
+    """
+    Parse and extract columns of scraped listings.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Scraped listings with columns translated by `translate_cols`.
+
+    Returns
+    -------
+    DataFrame : Parsed listings, see `transform`.
+
+    """
 
     text_cols = ['Title', 'Location', 'Description']
     df['Full Text'] = df[text_cols].apply(lambda x: ' '.join(map(str, x)), axis=1)
-    df['Full Text'] = df['Full Text'].apply(remove_polish_characters)
+    df['Full Text'] = transliterate_series(df['Full Text'])
 
     # Parse
     df['Amount'] = df['Price'].apply(parse_price)
     df['Bathrooms'] = df['Bathrooms'].apply(parse_bathrooms)    
     df['Rooms'] = df['Rooms'].apply(parse_rooms)
-    df['Seller'] = df['Seller'].apply(parse_seller)    
-    df['Property'] = df['Property'].apply(parse_property)    
-    df['Parking'] = df['Parking'].apply(parse_parking)
     df['Title'] = df['Title'].apply(parse_title)
 
-    # Extract
-    df['City'] = df['Location'].apply(extract_city)    
-    df['Currency'] = df['Price'].apply(extract_currency)    
+    # Seller, Property, Parking, City and Currency, see `rules.RULES`.
+    df = apply_rules(df)
 
+    # Extract
     df['District'] = df['Full Text'].apply(extract_district)    
+    # Listings in Kraków whose text names no district are looked
+    # up by the streets and estates in their location.
+    mask = df['District'].isna() & (df['City'] == 'kraków')
+    gazetteer = Gazetteer.load(districts=districts)
+    df.loc[mask, 'District'] = gazetteer.resolve(df.loc[mask, 'Location'])
     df['Garden'] = df['Full Text'].apply(extract_garden)
     df['Balcony'] = df['Full Text'].apply(extract_balcony)
     df['Terrace'] = df['Full Text'].apply(extract_terrace)
@@ -759,15 +726,54 @@ def transform(in_path, out_path, prefix='raw'):
     # Reorrder
     cols = ['Date',  'City', 'District', 'Amount', 'Currency', 
             'Property', 'Seller', 'Area', 'Rooms', 'Bathrooms', 
-            'Parking', 'Garden', 'Balcony', 'Terrace', 'Basement', 
-            'New', 'Block', 'Townhouse', 'Apartment', 'Bus stops',
-            'Studio', 'Title', 'Description', 'Link']
+            'Parking'] + BINARY + ['Title', 'Description', 'Link']
 
     df = df[cols]
 
+    return df
+
+def transform(in_path, out_path, prefix='raw', db_path=None):
+
+    if isinstance(in_path, str):
+        in_path = [in_path]
+
+    if isinstance(in_path, list):
+        # Malformed rows are saved next to the output.
+        frames, report = read_files(in_path, quarantine_path=f'{out_path}{prefix}_quarantine.csv')
+        print(f'Read {report["rows"].sum()} rows from {len(report)} files.')
+        dfs = [df.assign(Scraped=scrape_time(path))
+               for df, path in zip(frames, in_path) if len(df)]
+        if not dfs:
+            print('No rows to transform.')
+            return
+        df = pd.concat(dfs)
+        df = df.reset_index(drop=True)
+    else:
+        print(f'in_path should be string or list, got {type(in_path)} instead.')
+        return
+
+    df = translate_cols(df)
+    # Only kept for the analytical store.
+    scraped = df.pop('Scraped')
+
+    nrows_before = len(df)
+    print(f'Rows before transforming {nrows_before}.')
+    print('Missing before processing:')    
+    print(count_missing(df))
+
+    df = parse_listings(df)
+
     print('Missing after processing:')
     print(count_missing(df))
 
+    # Listings failing checks are saved next to the output.
+    valid, report = validate(df, scraped=scraped,
+                             categories={**CATEGORIES, 'District': list(districts)},
+                             report_path=f'{out_path}{prefix}_report.json',
+                             quarantine_path=f'{out_path}{prefix}_invalid.csv')
+    print(f'{report["quarantined"]} listings failed validation.')
+    df, scraped = df[valid], scraped[valid]
+
     nrows_after = len(df)
     print(f'Rows remaining {nrows_after}.')
     print(f'Dropped {nrows_before - nrows_after}.')    
@@ -775,6 +781,16 @@ def transform(in_path, out_path, prefix='raw'):
     out_path += f'{prefix}_data.csv'
 
     df.to_csv(out_path, index=False, line_terminator='\n')
+    ColumnCache(cache_path(out_path)).write(df, source=out_path)
+
+    if db_path is not None:
+        from store import ListingStore
+
+        # Only scrapes not loaded by an earlier run are added.
+        store = ListingStore(db_path)
+        n = store.load_scrapes(df.assign(Scraped=scraped))
+        store.close()
+        print(f'Loaded {n} listings of new scrapes into {db_path}.')
 
 if __name__ == '__main__':
 
@@ -0,0 +1,200 @@
+import csv
+import re
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from unidecode import unidecode
+
+from translit import transliterate
+
+# Streets, estates and areas of Kraków with the district they are in.
+# Entries with no district, like streets running through two districts
+# or areas whose district is not certain, are matched but not resolved.
+PATH = Path(__file__).parent / 'gazetteer.csv'
+
+# Words written before names that are not part of them,
+# and words with a short form names are stored with.
+PREFIXES = {'ul', 'ulica', 'al', 'aleja', 'aleje'}
+ABBREVIATIONS = {'osiedle': 'os'}
+
+WORD = re.compile('[a-z0-9]+')
+
+# Marks the end of a name in the trie.
+END = ''
+
+
+def tokenize(text):
+    """
+    Split text into lower case ascii words, without prefixes.
+
+    Examples
+    --------
+    >>> tokenize('ul. Piotra Stachiewicza 12')
+    ['piotra', 'stachiewicza', '12']
+    >>> tokenize('Osiedle Na Stoku')
+    ['os', 'na', 'stoku']
+
+    """
+
+    words = WORD.findall(transliterate(text.lower()))
+
+    return [ABBREVIATIONS.get(w, w) for w in words if w not in PREFIXES]
+
+
+class Gazetteer:
+    """
+    Resolve districts from street and estate names in locations.
+
+    Names are kept in a trie of words, so a location is matched in
+    one pass over its words, whatever the size of the gazetteer.
+    A name has to end a comma separated field, see `find`.
+
+    Parameters
+    ----------
+    names : list
+        Names of streets, estates and areas.
+    districts : list
+        District of every name, None or '' where it is not known,
+        the name is then matched but not resolved.
+
+    Examples
+    --------
+    >>> g = Gazetteer(['Stachiewicza', 'os. Na Stoku', 'Lubicz'],
+    ...               ['krowodrza', 'wzgorza krzeslawickie', None])
+    >>> g.match('ul. Piotra Stachiewicza 12, Kraków')
+    'krowodrza'
+    >>> g.match('Osiedle Na Stoku, Kraków-Nowa Huta, Kraków')
+    'wzgorza krzeslawickie'
+    >>> g.match('Lubicz, Kraków')
+    nan
+    >>> g.match('Na Stoku, Kraków')
+    nan
+
+    First names and the first words of longer names do not match.
+
+    >>> g = Gazetteer.load()
+    >>> g.match('ul. Józefa Wybickiego, Kraków')
+    nan
+    >>> g.match('Józefa Conrada, Kraków')
+    nan
+    >>> g.match('Powstańców Wielkopolskich, Kraków')
+    nan
+    >>> g.match('Tadeusza Kościuszki 5, Kraków')
+    'zwierzyniec'
+
+    """
+
+    def __init__(self, names, districts):
+        self.names = list(names)
+        self.districts = np.array([d or None for d in districts], dtype=object)
+
+        self.trie = {}
+        for name, district in zip(self.names, self.districts):
+            self.insert(tokenize(name), district)
+
+    @classmethod
+    def load(cls, path=PATH, districts=None):
+        """
+        Read a gazetteer from a csv with columns name, kind and district.
+
+        Parameters
+        ----------
+        path : str
+            Csv file, the bundled gazetteer by default.
+        districts : iterable or None
+            Known districts, to check the ones in the file against.
+
+        """
+
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        names = [row['name'] for row in rows]
+        labels = [unidecode(row['district'].strip().lower()) for row in rows]
+
+        if districts is not None:
+            unknown = sorted(set(labels) - set(districts) - {''})
+            if unknown:
+                raise ValueError(f'{path} has unknown districts: {", ".join(unknown)}.')
+
+        return cls(names, labels)
+
+    def insert(self, words, district):
+        node = self.trie
+        for w in words:
+            node = node.setdefault(w, {})
+
+        # A name in two districts does not tell which one it is.
+        if END in node and node[END] != district:
+            district = None
+        node[END] = district
+
+    def find(self, words):
+        """
+        District of the longest name ending a list of words.
+
+        A name has to end at the last word, or be followed only by
+        house numbers, so first names and the first words of names
+        missing from the gazetteer do not match. A name matched as
+        ambiguous does not give way to a shorter one, and names of
+        the same length in different districts are ambiguous.
+
+        Examples
+        --------
+        >>> g = Gazetteer(['Nowa Wieś', 'Wieś 2'], ['krowodrza', 'bronowice'])
+        >>> g.find(tokenize('ul. Nowa Wieś 12'))
+        'krowodrza'
+        >>> g.find(tokenize('Nowa Wieś 2')) is None
+        True
+
+        """
+
+        # Words before trailing house numbers.
+        stop = len(words)
+        while stop and any(c.isdigit() for c in words[stop - 1]):
+            stop -= 1
+
+        found, length = set(), 0
+        for start in range(len(words)):
+            node = self.trie
+            for end in range(start, len(words)):
+                node = node.get(words[end])
+                if node is None:
+                    break
+                if END not in node or end + 1 < stop:
+                    continue
+                if end + 1 - start > length:
+                    found, length = {node[END]}, end + 1 - start
+                elif end + 1 - start == length:
+                    found.add(node[END])
+
+        return found.pop() if len(found) == 1 else None
+
+    def match(self, x):
+        """
+        District of a location, from the first of its comma
+        separated fields that has a known name.
+        """
+
+        if not isinstance(x, str):
+            return np.nan
+
+        for field in x.split(','):
+            district = self.find(tokenize(field))
+            if district is not None:
+                return district
+
+        return np.nan
+
+    def resolve(self, s):
+        """
+        Resolve a column of locations, matching each distinct value once.
+        """
+
+        codes, uniques = pd.factorize(s)
+        labels = np.array([self.match(x) for x in uniques] + [np.nan], dtype=object)
+
+        return pd.Series(labels[codes], index=s.index, dtype=object)
@@ -0,0 +1,277 @@
+import argparse
+import json
+import sqlite3
+
+from pathlib import Path
+
+import pandas as pd
+
+from etl import get_data, parse_listings, scrape_time, translate_cols
+
+# Kinds of records kept for a listing. New and relisted records hold
+# the whole listing, changes only the fields that changed and
+# removals nothing.
+KINDS = ['new', 'change', 'removed', 'relisted']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    valid_from TEXT PRIMARY KEY,
+    path TEXT,
+    n_rows INTEGER
+);
+CREATE TABLE IF NOT EXISTS records (
+    link TEXT NOT NULL,
+    valid_from TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS records_link_valid_from ON records (link, valid_from);
+CREATE INDEX IF NOT EXISTS records_valid_from ON records (valid_from);
+CREATE TABLE IF NOT EXISTS latest (
+    link TEXT PRIMARY KEY,
+    raw_hash INTEGER,
+    present INTEGER,
+    data TEXT
+);
+'''
+
+
+def snapshot_time(path):
+    """
+    Get the time of a scrape from the name of its folder.
+
+    Examples
+    --------
+    >>> snapshot_time('../flats-data/listings/1600000000000/data.csv')
+    '2020-09-13T12:26:40'
+
+    """
+
+    ts = scrape_time(path)
+    if pd.isna(ts):
+        raise ValueError(f'{path} is not in a folder named with a timestamp.')
+
+    return ts.isoformat(timespec='seconds')
+
+
+def to_records(df):
+    """
+    Turn parsed listings into json serializable dicts keyed by link.
+    """
+
+    records = json.loads(df.to_json(orient='records', date_format='iso'))
+    return {r.pop('Link'): r for r in records}
+
+
+def diff(old, new):
+    """
+    Get the fields of `new` that differ from `old`.
+
+    Examples
+    --------
+    >>> diff({'Amount': 500000, 'Rooms': 2}, {'Amount': 480000, 'Rooms': 2})
+    {'Amount': 480000}
+
+    """
+
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+
+class HistoryStore:
+    """
+    History of listings across scrapes in a sqlite database.
+
+    Every scrape is compared with the latest known state of its
+    listings and only differences are stored as delta records,
+    indexed by link and the time they became valid.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.con = sqlite3.connect(path)
+        self.con.executescript(SCHEMA)
+
+    def close(self):
+        self.con.close()
+
+    def last_snapshot(self):
+        return self.con.execute('SELECT MAX(valid_from) FROM snapshots').fetchone()[0]
+
+    def ingest(self, path):
+        """
+        Add the changes of a scrape saved in `path`.
+
+        Only rows whose raw content changed since the previous
+        scrape are parsed. Listings missing from the scrape are
+        marked as removed. Scrapes must be added in order.
+
+        Returns
+        -------
+        dict :
+            Number of records of every kind added.
+
+        """
+
+        valid_from = snapshot_time(path)
+        last = self.last_snapshot()
+
+        if last is not None and valid_from <= last:
+            if self.con.execute('SELECT 1 FROM snapshots WHERE valid_from = ?',
+                                (valid_from,)).fetchone():
+                print(f'{path} already ingested.')
+                return {}
+            raise ValueError(f'{path} is older than the last ingested scrape {last}.')
+
+        raw = get_data(path=str(path))
+        if raw is None or raw.empty:
+            # An empty scrape failed, it does not mean
+            # that every listing was removed.
+            print(f'{path} is empty, skipping.')
+            return {}
+
+        raw = translate_cols(raw)
+        raw = raw.drop_duplicates('Link', keep='last').reset_index(drop=True)
+        raw_hash = pd.util.hash_pandas_object(raw, index=False).to_numpy().view('int64')
+
+        latest = pd.read_sql('SELECT link, raw_hash, present, data FROM latest',
+                             self.con, index_col='link')
+
+        known = raw['Link'].map(latest['raw_hash'])
+        changed = (known.to_numpy() != raw_hash) | known.isna().to_numpy()
+
+        parsed = to_records(parse_listings(raw[changed].copy()))
+        hashes = dict(zip(raw['Link'], raw_hash.tolist()))
+
+        records, updates = [], []
+        counts = dict.fromkeys(KINDS, 0)
+
+        for link, data in parsed.items():
+            if link not in latest.index:
+                kind, delta = 'new', data
+            elif not latest.at[link, 'present']:
+                kind, delta = 'relisted', data
+            else:
+                kind, delta = 'change', diff(json.loads(latest.at[link, 'data']), data)
+
+            if delta or kind != 'change':
+                records.append((link, valid_from, kind, json.dumps(delta)))
+                counts[kind] += 1
+            updates.append((link, hashes[link], 1, json.dumps(data)))
+
+        # Unchanged listings that were removed before are back.
+        present = raw['Link'].map(latest['present']).to_numpy()
+        relisted = raw.loc[~changed & (present == 0), 'Link'].tolist()
+        for link in relisted:
+            records.append((link, valid_from, 'relisted', latest.at[link, 'data']))
+            counts['relisted'] += 1
+
+        removed = latest.index[latest['present'].astype(bool) & ~latest.index.isin(raw['Link'])]
+        for link in removed:
+            records.append((link, valid_from, 'removed', None))
+            counts['removed'] += 1
+
+        with self.con:
+            self.con.executemany('INSERT INTO records VALUES (?, ?, ?, ?)', records)
+            self.con.executemany('INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?)', updates)
+            self.con.executemany('UPDATE latest SET present = 1 WHERE link = ?',
+                                 [(x,) for x in relisted])
+            self.con.executemany('UPDATE latest SET present = 0 WHERE link = ?',
+                                 [(x,) for x in removed])
+            self.con.execute('INSERT INTO snapshots VALUES (?, ?, ?)',
+                             (valid_from, str(path), len(raw)))
+
+        print(f'{path}: {len(raw)} rows, {int(changed.sum())} parsed, '
+              + ', '.join(f'{v} {k}' for k, v in counts.items()) + '.')
+
+        return counts
+
+    def ingest_all(self, path_listings):
+        """
+        Add every scrape in `path_listings` not added yet, oldest first.
+        Folders not named with a timestamp are skipped.
+        """
+
+        last = self.last_snapshot()
+        paths = [p for p in Path(path_listings).glob('*/data.csv') if p.parent.name.isdigit()]
+        paths = sorted(paths, key=lambda x: int(x.parent.name))
+
+        for path in paths:
+            if last is None or snapshot_time(path) > last:
+                self.ingest(path)
+
+    def as_of(self, when):
+        """
+        Get the state of all listings present at `when`.
+
+        Parameters
+        ----------
+        when : str or datetime
+            Time of the state, a date means its midnight.
+
+        Returns
+        -------
+        DataFrame :
+            Parsed listings, with the columns of `etl.transform`.
+
+        """
+
+        when = pd.Timestamp(when).isoformat()
+        rows = self.con.execute('SELECT link, kind, data FROM records '
+                                'WHERE valid_from <= ? ORDER BY link, valid_from', (when,))
+
+        state = {}
+        for link, kind, data in rows:
+            if kind == 'removed':
+                state.pop(link, None)
+            elif kind == 'change':
+                state[link].update(json.loads(data))
+            else:
+                state[link] = json.loads(data)
+
+        return self._frame(state)
+
+    def history(self, link):
+        """
+        Get the records of a single listing, oldest first.
+        """
+
+        return pd.read_sql('SELECT valid_from, kind, data FROM records '
+                           'WHERE link = ? ORDER BY valid_from', self.con, params=(link,))
+
+    def _frame(self, state):
+        df = pd.DataFrame.from_dict(state, orient='index')
+        if df.empty:
+            return df
+
+        df = df.rename_axis('Link').reset_index()
+        df['Date'] = pd.to_datetime(df['Date'])
+
+        cols = [c for c in df.columns if c != 'Link'] + ['Link']
+        return df[cols]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Track listings across scrapes.')
+    parser.add_argument('--db', default='../flats-data/history.sqlite')
+    parser.add_argument('--listings', default='../flats-data/listings')
+    parser.add_argument('--as-of', help='export listings present at this time instead of ingesting')
+    parser.add_argument('--out', default='../flats-data/raw_data.csv')
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+
+    if args.as_of:
+        df = store.as_of(args.as_of)
+        df.to_csv(args.out, index=False)
+        print(f'Saved {len(df)} listings present at {args.as_of} to {args.out}.')
+    else:
+        store.ingest_all(args.listings)
+
+    store.close()
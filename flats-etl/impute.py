@@ -0,0 +1,144 @@
+import numpy as np
+
+# Columns with missing values to fill in.
+TARGETS = ['Rooms', 'Bathrooms']
+
+# Width in m2 of the area buckets used by grouped imputation.
+AREA_BUCKET = 10
+
+# Features used to find neighbours by tree imputation.
+NEIGHBOUR_FEATURES = ['Area', 'Amount']
+
+METHODS = ['grouped', 'tree', 'knn']
+
+
+def impute_grouped(df, targets=TARGETS, bucket=AREA_BUCKET):
+    """
+    Fill in missing values with the median of similar listings.
+
+    Listings are grouped by `District` and `Area` bucket. Values
+    missing for a whole group fall back to the district median
+    and then to the overall median.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({'District': ['a', 'a', 'a', 'b'],
+    ...                    'Area': [40, 42, 45, 90],
+    ...                    'Rooms': [2, 3, None, None],
+    ...                    'Bathrooms': [1, 1, 1, 2]})
+    >>> impute_grouped(df)['Rooms'].tolist()
+    [2.0, 3.0, 2.5, 2.5]
+
+    """
+
+    df = df.copy()
+    buckets = df['Area'] // bucket
+
+    for col in targets:
+        fill = df.groupby([df['District'], buckets])[col].transform('median')
+        fill = fill.fillna(df.groupby('District')[col].transform('median'))
+        fill = fill.fillna(df[col].median())
+        df[col] = df[col].fillna(fill)
+
+    return df
+
+
+def impute_tree(df, targets=TARGETS, features=NEIGHBOUR_FEATURES, n_neighbors=5):
+    """
+    Fill in missing values with the mean of the nearest neighbours.
+
+    Neighbours are found with a KD-tree over standardized `features`
+    only, so finding them takes O(n log n) rather than the O(n^2) of
+    computing distances between all pairs of rows.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({'Area': [30, 31, 80, 82, 81],
+    ...                    'Amount': [300, 310, 800, 820, 805],
+    ...                    'Rooms': [1, 1, 3, 3, None],
+    ...                    'Bathrooms': [1, 1, 2, 2, 2]})
+    >>> impute_tree(df, n_neighbors=2)['Rooms'].tolist()
+    [1.0, 1.0, 3.0, 3.0, 3.0]
+
+    """
+
+    from sklearn.neighbors import KDTree
+
+    df = df.copy()
+
+    X = df[features].astype(float)
+    X = X.fillna(X.median())
+    X = ((X - X.mean()) / X.std(ddof=0).replace(0, 1)).to_numpy()
+
+    for col in targets:
+        values = df[col].to_numpy(dtype=float, copy=True)
+        missing = np.isnan(values)
+        n_known = int((~missing).sum())
+
+        if not missing.any() or n_known == 0:
+            continue
+
+        tree = KDTree(X[~missing])
+        _, idx = tree.query(X[missing], k=min(n_neighbors, n_known))
+
+        values[missing] = values[~missing][idx].mean(axis=1)
+        df[col] = values
+
+    return df
+
+
+def impute_knn(df, n_neighbors=5):
+    """
+    Fill in missing values with `KNNImputer` over all numeric columns.
+
+    Notes
+    -----
+    Distances between all pairs of rows are computed, which
+    limits this method to small datasets.
+    """
+
+    from sklearn.impute import KNNImputer
+
+    df = df.copy()
+    numeric = list(df.select_dtypes('number').columns)
+
+    imputer = KNNImputer(n_neighbors=n_neighbors)
+    df[numeric] = imputer.fit_transform(df[numeric])
+
+    return df
+
+
+def impute(df, method='grouped'):
+    """
+    Fill in missing numeric values and round numeric columns.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Filtered listings.
+    method : str
+        One of 'grouped', 'tree' or 'knn', see `impute_grouped`,
+        `impute_tree` and `impute_knn`.
+
+    Returns
+    -------
+    DataFrame :
+        Copy of `df` with missing values filled in.
+
+    """
+
+    if method == 'grouped':
+        df = impute_grouped(df)
+    elif method == 'tree':
+        df = impute_tree(df)
+    elif method == 'knn':
+        df = impute_knn(df)
+    else:
+        raise ValueError(f'{method} is not a valid method, expected one of {METHODS}.')
+
+    numeric = list(df.select_dtypes('number').columns)
+    df[numeric] = np.round(df[numeric]).astype(int)
+
+    return df
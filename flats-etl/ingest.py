@@ -0,0 +1,219 @@
+import csv
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+# Columns of scraped listings. All are read as text and parsed in
+# `etl`, except the area which is converted to a number here,
+# values that are not numbers become missing.
+SCHEMA = {'Cena': str,
+          'Lokalizacja': str,
+          'Data dodania': str,
+          'Na sprzedaż przez': str,
+          'Rodzaj nieruchomości': str,
+          'Liczba pokoi': str,
+          'Liczba łazienek': str,
+          'Wielkość (m2)': str,
+          'Parking': str,
+          'Tytuł': str,
+          'Opis': str,
+          'Link': str}
+
+NUMERIC = ['Wielkość (m2)']
+
+ENGINES = ['pyarrow', 'pandas']
+
+QUARANTINE_COLUMNS = ['path', 'line', 'reason', 'text']
+
+
+def empty_frame():
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in SCHEMA})
+
+
+def to_numeric(df):
+    """
+    Convert the numeric columns, values that are
+    not numbers become missing values.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'Wielkość (m2)': ['48.5', 'brak', None]})
+    >>> to_numeric(df)['Wielkość (m2)'].tolist()
+    [48.5, nan, nan]
+
+    """
+
+    for col in NUMERIC:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    return df
+
+
+def read_pyarrow(path):
+    bad = []
+
+    def handler(row):
+        bad.append({'path': str(path), 'line': row.number, 'reason': 'wrong number of fields',
+                    'text': row.text})
+        return 'skip'
+
+    table = pa_csv.read_csv(path,
+                            parse_options=pa_csv.ParseOptions(newlines_in_values=True,
+                                                              invalid_row_handler=handler),
+                            convert_options=pa_csv.ConvertOptions(
+                                column_types={c: 'string' for c in SCHEMA},
+                                include_columns=list(SCHEMA),
+                                include_missing_columns=True,
+                                strings_can_be_null=True))
+
+    return table.to_pandas(), bad
+
+
+def read_records(path):
+    """
+    Read a file with the csv module, keeping rows with as
+    many fields as the header and returning the others.
+    """
+
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows, bad = [], []
+        line = reader.line_num
+
+        for row in reader:
+            if len(row) == len(header):
+                rows.append(row)
+            else:
+                bad.append({'path': str(path), 'line': line + 1, 'reason': 'wrong number of fields',
+                            'text': ','.join(row)})
+            line = reader.line_num
+
+    # Empty fields are missing values, like in `pd.read_csv`.
+    df = pd.DataFrame(rows, columns=header).reindex(columns=list(SCHEMA))
+    return df.where(df != ''), bad
+
+
+def read_pandas(path):
+    try:
+        df = pd.read_csv(path, dtype=str)
+    except pd.errors.ParserError:
+        df = None
+
+    # When the first rows have an extra field pandas silently
+    # shifts the columns and uses the first one as the index.
+    if df is None or not isinstance(df.index, pd.RangeIndex):
+        # Files with malformed rows are read again row by row.
+        return read_records(path)
+
+    return df.reindex(columns=list(SCHEMA)), []
+
+
+def read_file(path, engine=None):
+    """
+    Read scraped listings with an explicit schema.
+
+    Parameters
+    ----------
+    path : str
+        Path to a csv file written by the listing spider.
+    engine : str or None
+        'pyarrow' or 'pandas', pyarrow if it is installed.
+
+    Returns
+    -------
+    tuple :
+        Listings with the columns in `SCHEMA` and a list of malformed
+        rows. Empty files give no listings, columns missing from the
+        file are filled with missing values.
+
+    """
+
+    engine = engine or ('pyarrow' if pa_csv is not None else 'pandas')
+
+    if os.path.getsize(path) == 0:
+        return empty_frame(), []
+
+    if engine == 'pyarrow':
+        try:
+            df, bad = read_pyarrow(path)
+        except pa.ArrowInvalid as e:
+            # Files with only blank lines have no header row.
+            if 'Empty CSV file' not in str(e):
+                raise
+            return empty_frame(), []
+    else:
+        try:
+            df, bad = read_pandas(path)
+        except pd.errors.EmptyDataError:
+            return empty_frame(), []
+
+    return to_numeric(df), bad
+
+
+def read_files(paths, n_jobs=None, engine=None, quarantine_path=None):
+    """
+    Read many files of scraped listings in parallel.
+
+    Parameters
+    ----------
+    paths : list
+        Paths to csv files.
+    n_jobs : int or None
+        Number of threads, all cores if None. Parsing
+        in pyarrow and pandas mostly runs without the GIL.
+    engine : str or None
+        See `read_file`.
+    quarantine_path : str or None
+        Csv file malformed rows are saved to.
+
+    Returns
+    -------
+    tuple :
+        List of listings of every file, in the order of `paths`,
+        and a report with rows, malformed rows, size and read time
+        of every file.
+
+    """
+
+    def read(path):
+        start = time.perf_counter()
+        df, bad = read_file(path, engine=engine)
+        return df, bad, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        results = list(pool.map(read, paths))
+
+    frames = [df for df, _, _ in results]
+    quarantined = [row for _, bad, _ in results for row in bad]
+
+    report = pd.DataFrame({'path': [str(p) for p in paths],
+                           'rows': [len(df) for df in frames],
+                           'malformed': [len(bad) for _, bad, _ in results],
+                           'mb': [os.path.getsize(p) / 1e6 for p in paths],
+                           'seconds': [s for _, _, s in results]})
+    report['empty'] = report['rows'] == 0
+
+    if quarantined:
+        print(f'{len(quarantined)} malformed rows in {int((report["malformed"] > 0).sum())} files.')
+        if quarantine_path is not None:
+            pd.DataFrame(quarantined, columns=QUARANTINE_COLUMNS).to_csv(quarantine_path, index=False)
+            print(f'Saved them to {quarantine_path}.')
+    elif quarantine_path is not None:
+        # Do not leave the rows of an earlier run behind.
+        Path(quarantine_path).unlink(missing_ok=True)
+
+    for path in report.loc[report['empty'], 'path']:
+        print(f'{path} has no listings.')
+
+    return frames, report
@@ -0,0 +1,312 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from unidecode import unidecode
+
+# Orders of n-grams mined, with the prefix of their feature names.
+PREFIXES = {1: 'uni', 2: 'bi', 3: 'tri'}
+
+# Minimum number of descriptions an n-gram has to appear in.
+MIN_DF = 26
+
+# Descriptions vectorized at once by `count_matrix` and `hashed_matrix`.
+CHUNK_SIZE = 10_000
+
+
+def tokenize(text):
+    """
+    Split a description into words, keeping alphabetic
+    words longer than three characters.
+
+    Examples
+    --------
+    >>> tokenize('Mieszkanie 2-pokojowe, blisko tramwaju i sklepów')
+    ['Mieszkanie', 'blisko', 'tramwaju', 'sklepow']
+
+    """
+
+    return [x for x in unidecode(text).split(' ') if x.isalpha() and len(x) > 3]
+
+
+def analyze(text, orders=(1, 2, 3)):
+    """
+    Get n-grams of a description, joined with spaces.
+
+    Notes
+    -----
+    N-grams are built within a description, unlike in the
+    wrangling notebook where descriptions were joined into
+    one string and n-grams spanned neighbouring listings.
+
+    Examples
+    --------
+    >>> analyze('duzy jasny balkon', orders=(1, 2))
+    ['duzy', 'jasny', 'balkon', 'duzy jasny', 'jasny balkon']
+
+    """
+
+    tokens = tokenize(text)
+    grams = []
+
+    for n in orders:
+        grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+    return grams
+
+
+def count_matrix(descriptions, min_df=MIN_DF, orders=(1, 2, 3), chunk_size=CHUNK_SIZE,
+                 n_features=2 ** 20):
+    """
+    Build a binary description by n-gram matrix over a vocabulary.
+
+    Parameters
+    ----------
+    descriptions : Series
+        Listing descriptions.
+    min_df : int
+        Minimum number of descriptions an n-gram has to appear in.
+    orders : tuple
+        Orders of n-grams to mine.
+    chunk_size : int
+        Descriptions vectorized at once.
+    n_features : int
+        Buckets n-grams are hashed into to count them in the first pass.
+
+    Returns
+    -------
+    tuple :
+        Sparse matrix of shape (n_descriptions, n_ngrams)
+        and array of n-grams for its columns, sorted.
+
+    Notes
+    -----
+    A vocabulary of every n-gram of the corpus is much larger than
+    the one left after pruning by `min_df`, so descriptions are read
+    in two passes over chunks. The first counts descriptions per hash
+    bucket of n-grams, which is at least the count of every n-gram in
+    the bucket. The second keeps only n-grams of buckets reaching
+    `min_df` and prunes them by their exact counts. The result is the
+    same as with `CountVectorizer(min_df=min_df)`.
+
+    Examples
+    --------
+    >>> X, ngrams = count_matrix(pd.Series(['duzy balkon', 'duzy ogrod', None]),
+    ...                          min_df=2, orders=(1,), chunk_size=2)
+    >>> ngrams.tolist(), X.toarray().ravel().tolist()
+    (['duzy'], [1.0, 1.0, 0.0])
+
+    """
+
+    from sklearn.feature_extraction import FeatureHasher
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    descriptions = descriptions.fillna('')
+    chunks = range(0, len(descriptions), chunk_size)
+    analyzer = lambda x: analyze(x, orders)  # noqa: E731
+
+    # Documents per bucket, every row counts each bucket once.
+    counts = np.zeros(n_features, dtype=np.int64)
+    for i in chunks:
+        Xc = hashed_matrix(descriptions.iloc[i:i + chunk_size], n_features=n_features,
+                           orders=orders, chunk_size=chunk_size)
+        counts += Xc.getnnz(axis=0)
+    frequent = counts >= min_df
+
+    hasher = FeatureHasher(n_features=n_features, input_type='string', alternate_sign=False)
+    vocabulary = {}
+    blocks = []
+
+    for i in chunks:
+        chunk = descriptions.iloc[i:i + chunk_size]
+        vectorizer = CountVectorizer(analyzer=analyzer, binary=True, dtype=np.float32)
+        try:
+            Xc = vectorizer.fit_transform(chunk)
+        except ValueError:
+            # No n-grams in any description of the chunk.
+            blocks.append((len(chunk), [], [], []))
+            continue
+        names = vectorizer.get_feature_names_out()
+
+        buckets = hasher.transform([[x] for x in names]).indices
+        keep = np.flatnonzero(frequent[buckets])
+        columns = np.array([vocabulary.setdefault(x, len(vocabulary)) for x in names[keep]],
+                           dtype=np.int64)
+
+        Xc = Xc[:, keep].tocoo()
+        blocks.append((len(chunk), Xc.data, Xc.row, columns[Xc.col]))
+
+    X = sp.vstack([sp.csr_matrix((data, (rows, cols)), shape=(n, len(vocabulary)),
+                                 dtype=np.float32)
+                   for n, data, rows, cols in blocks], format='csc')
+
+    ngrams = np.array(list(vocabulary), dtype=object)
+    order = np.argsort(ngrams)
+    order = order[X.getnnz(axis=0)[order] >= min_df]
+
+    return X[:, order], ngrams[order]
+
+
+def hashed_matrix(descriptions, n_features=2 ** 20, orders=(1, 2, 3), chunk_size=CHUNK_SIZE):
+    """
+    Build a binary description by hashed n-gram matrix.
+
+    Descriptions are vectorized in chunks of `chunk_size` and no
+    vocabulary is kept, so memory depends only on the number of
+    n-grams found. Use `count_matrix` to get n-gram names.
+
+    Returns
+    -------
+    csc_matrix :
+        Sparse matrix of shape (n_descriptions, n_features).
+
+    """
+
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    vectorizer = HashingVectorizer(analyzer=lambda x: analyze(x, orders),
+                                   n_features=n_features,
+                                   binary=True,
+                                   norm=None,
+                                   alternate_sign=False,
+                                   dtype=np.float32)
+
+    descriptions = descriptions.fillna('')
+    chunks = [vectorizer.transform(descriptions.iloc[i:i + chunk_size])
+              for i in range(0, len(descriptions), chunk_size)]
+
+    return sp.vstack(chunks, format='csc')
+
+
+def correlate(X, y):
+    """
+    Pearson correlation of every column of sparse `X` with `y`.
+
+    Computed from column sums and one sparse matrix-vector
+    product, without densifying `X`.
+
+    Examples
+    --------
+    >>> X = sp.csc_matrix(np.array([[1, 0], [1, 1], [0, 1], [0, 0]]))
+    >>> correlate(X, np.array([4.0, 3.0, 2.0, 1.0])).round(3).tolist()
+    [0.894, 0.0]
+
+    """
+
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+
+    mean_x = np.asarray(X.sum(axis=0), dtype=np.float64).ravel() / n
+    mean_x2 = np.asarray(X.multiply(X).sum(axis=0), dtype=np.float64).ravel() / n
+    mean_xy = np.asarray(X.T @ y, dtype=np.float64).ravel() / n
+
+    cov = mean_xy - mean_x * y.mean()
+    std_x = np.sqrt(np.maximum(mean_x2 - mean_x ** 2, 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / (std_x * y.std())
+
+
+def feature_name(ngram):
+    """
+    Name of the feature of an n-gram, as used in the wrangling notebook.
+
+    Examples
+    --------
+    >>> feature_name('blisko tramwaju')
+    'bi_blisko_tramwaju'
+
+    """
+
+    words = ngram.split(' ')
+    return PREFIXES[len(words)] + '_' + '_'.join(words)
+
+
+def top_ngrams(df, n=75, min_df=MIN_DF):
+    """
+    Rank n-grams of descriptions by their correlation with `Amount`.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Listings with `Description` and `Amount`.
+    n : int
+        Number of n-grams to keep.
+    min_df : int
+        Minimum number of descriptions an n-gram has to appear in.
+
+    Returns
+    -------
+    DataFrame :
+        N-grams with the absolute value of their correlation,
+        sorted from the most correlated.
+
+    """
+
+    X, ngrams = count_matrix(df['Description'], min_df=min_df)
+    corrs = np.abs(correlate(X, df['Amount'].to_numpy()))
+
+    corrs = pd.DataFrame({'N-Gram': [feature_name(x) for x in ngrams],
+                          'Correlation': corrs})
+
+    return corrs.sort_values('Correlation', ascending=False).head(n).reset_index(drop=True)
+
+
+def ngram_features(descriptions, ngrams):
+    """
+    Binary features marking which descriptions contain which n-grams.
+
+    Returns
+    -------
+    DataFrame :
+        Sparse columns named with `feature_name`.
+
+    Notes
+    -----
+    N-grams are matched as whole words of `tokenize`, while the
+    wrangling notebook matched them with `str.contains`, so that
+    'balkon' also marked 'balkonem' and 'balkony'. Fewer listings
+    get each feature than before.
+
+    Examples
+    --------
+    >>> X = ngram_features(pd.Series(['duzy balkon', 'z balkonem']), ['balkon'])
+    >>> X.sparse.to_dense()['uni_balkon'].tolist()
+    [1, 0]
+
+    """
+
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vocabulary = {x: i for i, x in enumerate(ngrams)}
+    orders = tuple(sorted({len(x.split(' ')) for x in ngrams}))
+
+    vectorizer = CountVectorizer(analyzer=lambda x: analyze(x, orders),
+                                 vocabulary=vocabulary,
+                                 binary=True,
+                                 dtype=np.int8)
+    X = vectorizer.transform(descriptions.fillna(''))
+
+    return pd.DataFrame.sparse.from_spmatrix(X,
+                                             index=descriptions.index,
+                                             columns=[feature_name(x) for x in ngrams])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Rank description n-grams by correlation with price.')
+    parser.add_argument('--in', dest='in_path', default='../flats-data/raw_data.csv')
+    parser.add_argument('--out', dest='out_path', default='../flats-data/ngrams.csv')
+    parser.add_argument('--top', type=int, default=75)
+    parser.add_argument('--min-df', type=int, default=MIN_DF)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.in_path, usecols=['Description', 'Amount'], lineterminator='\n')
+    df = df.dropna().reset_index(drop=True)
+
+    corrs = top_ngrams(df, n=args.top, min_df=args.min_df)
+    corrs.to_csv(args.out_path, index=False)
+
+    print(corrs.to_string())
@@ -0,0 +1,143 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Categorical columns extracted from scraped listings. Every column
+# is read from `source` and gets the label of the first keyword, in
+# order, found in the lower cased text, or nan if there is none.
+# With `match` set to 'field' a keyword must be a whole field of
+# the text split on commas instead of any part of it.
+RULES = {'Seller': {'source': 'Seller',
+                    'keywords': {'agencja': 'realtor',
+                                 'właściciel': 'owner'}},
+         'Property': {'source': 'Property',
+                      'keywords': {'dom': 'house',
+                                   'mieszkanie': 'flat'}},
+         'Parking': {'source': 'Parking',
+                     'keywords': {'garaż': 'garage',
+                                  'kryty': 'covered',
+                                  'ulica': 'street',
+                                  'brak': 'no parking'}},
+         'Currency': {'source': 'Price',
+                      'keywords': {'zł': 'pln',
+                                   'pln': 'pln'}},
+         'City': {'source': 'Location',
+                  'match': 'field',
+                  'keywords': {'kraków': 'kraków',
+                               'krakow': 'kraków',
+                               'cracow': 'kraków'}}}
+
+
+def compile_keywords(keywords, match='substring'):
+    """
+    Compile keywords into one regex with a group for every keyword.
+
+    Every keyword is looked for in a lookahead over the whole text,
+    and the alternation tries them in order, so the group that
+    matches is the first keyword in rule order found anywhere in the
+    text, not the leftmost one in the text.
+
+    Examples
+    --------
+    >>> pattern = compile_keywords(['garaż', 'ulica'])
+    >>> pattern.match('ulica, garaż').lastindex
+    1
+
+    """
+
+    if match == 'substring':
+        wrap = '{}'
+    elif match == 'field':
+        wrap = r'(?:^|,)\s*{}\s*(?:,|$)'
+    else:
+        raise ValueError(f"{match} is not a valid match, expected 'substring' or 'field'.")
+
+    alternatives = [r'(?=[\s\S]*?' + wrap.format(f'({re.escape(k)})') + ')' for k in keywords]
+
+    return re.compile('|'.join(alternatives))
+
+
+class Matcher:
+    """
+    Label text with the first of an ordered set of keywords it contains.
+
+    Parameters
+    ----------
+    keywords : dict
+        Labels by keyword, in order of priority.
+    match : str
+        'substring' or 'field', see `RULES`.
+
+    Examples
+    --------
+    >>> seller = Matcher(RULES['Seller']['keywords'])
+    >>> seller(pd.Series(['Agencja', 'Właściciel', 'Agencja', None, 'inny'])).tolist()
+    ['realtor', 'owner', 'realtor', nan, nan]
+
+    """
+
+    def __init__(self, keywords, match='substring'):
+        self.keywords = dict(keywords)
+        self.labels = np.array(list(self.keywords.values()) + [np.nan], dtype=object)
+        self.pattern = compile_keywords(self.keywords, match=match)
+
+    def code(self, x):
+        """
+        Index of the label of `x`, -1 if no keyword matches.
+        """
+
+        if not isinstance(x, str):
+            return -1
+
+        m = self.pattern.match(x.lower())
+        return m.lastindex - 1 if m else -1
+
+    def match(self, x):
+        """
+        Label of a single value, missing values are returned as they are.
+        """
+
+        if pd.isnull(x):
+            return x
+
+        return self.labels[self.code(x)]
+
+    def __call__(self, s):
+        """
+        Label a column, matching each distinct value once.
+        """
+
+        codes, uniques = pd.factorize(s)
+        labels = np.array([self.code(x) for x in uniques] + [-1], dtype=np.intp)
+
+        # Missing values have code -1, which takes the last label, nan.
+        return pd.Series(self.labels[labels[codes]], index=s.index, dtype=object)
+
+
+MATCHERS = {col: Matcher(rule['keywords'], match=rule.get('match', 'substring'))
+            for col, rule in RULES.items()}
+
+
+def apply_rules(df, columns=None):
+    """
+    Set the columns in `RULES` from their source columns.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Scraped listings with columns translated by `etl.translate_cols`.
+    columns : list or None
+        Names of columns to set, all in `RULES` if None.
+
+    Returns
+    -------
+    DataFrame :
+        `df` with the columns set.
+
+    """
+
+    for col in columns or RULES:
+        df[col] = MATCHERS[col](df[RULES[col]['source']])
+
+    return df
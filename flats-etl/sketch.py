@@ -0,0 +1,355 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+# Relative error of quantiles estimated by `QuantileSketch`.
+RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """
+    Mergeable sketch of a distribution of positive values.
+
+    Values are counted in logarithmic buckets, like in DDSketch,
+    so every quantile is estimated within `relative_accuracy` of
+    its true value whatever the number of values, and sketches of
+    parts of a dataset merge into the sketch of the whole.
+
+    Parameters
+    ----------
+    relative_accuracy : float
+        Relative error of estimated quantiles.
+
+    Examples
+    --------
+    >>> s = QuantileSketch()
+    >>> s.add(np.arange(1, 1001))
+    >>> abs(s.quantile(0.5) - 500) / 500 < 0.01
+    True
+
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.bins = {}
+        # Values too small for a logarithmic bucket.
+        self.zero = 0
+
+    @property
+    def count(self):
+        return self.zero + sum(self.bins.values())
+
+    def add(self, values):
+        """
+        Add an array of values, missing values are skipped.
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        positive = values > 0
+        self.zero += int((~positive).sum())
+
+        keys = np.ceil(np.log(values[positive]) / math.log(self.gamma)).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other):
+        """
+        Add the values counted by `other` to this sketch.
+        """
+
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Sketches with different accuracy can not be merged.')
+
+        self.zero += other.zero
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate the `q` quantile, nan if the sketch is empty.
+        """
+
+        n = self.count
+        if n == 0:
+            return math.nan
+
+        rank = q * (n - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_json(self):
+        return json.dumps({'relative_accuracy': self.relative_accuracy,
+                           'zero': self.zero,
+                           'bins': [[k, self.bins[k]] for k in sorted(self.bins)]})
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        sketch = cls(data['relative_accuracy'])
+        sketch.zero = data['zero']
+        sketch.bins = {k: c for k, c in data['bins']}
+
+        return sketch
+
+
+# Size of the compactors of `KLLSketch`, its rank
+# error is roughly proportional to 1 / k.
+KLL_K = 1000
+
+
+class KLLSketch:
+    """
+    Mergeable streaming sketch of the ranks of values.
+
+    Values go through a hierarchy of compactors, like in KLL. A full
+    compactor sorts its values and promotes every other one, from a
+    random offset, to the next level where each value stands for
+    twice as many. Memory stays around `3 * k` values however many
+    are added, and sketches of chunks merge into the sketch of the
+    whole.
+
+    Unlike `QuantileSketch`, whose error is relative to the value of a
+    quantile, the error is bounded in rank, which is what trimming a
+    fraction of listings needs, see `rank_error`. It also holds for
+    values of any sign.
+
+    Parameters
+    ----------
+    k : int
+        Capacity of the top compactor.
+    seed : int, SeedSequence or None
+        Seed for the random offsets of compactions. Sketches merged
+        together should get independent seeds, spawned from one
+        `np.random.SeedSequence`.
+
+    Attributes
+    ----------
+    n : int
+        Number of values added.
+    error : int
+        Bound on the absolute rank error of any query. Compacting
+        values of weight w moves any rank by at most w.
+    error_sq : int
+        Sum of the squares of those moves. The random offsets make
+        them cancel out, so errors are usually much smaller than
+        `error`, see `rank_error`.
+
+    Examples
+    --------
+    >>> seeds = np.random.SeedSequence(0)
+    >>> s = KLLSketch(seed=seeds.spawn(1)[0])
+    >>> for chunk in np.array_split(np.arange(100000), 10):
+    ...     _ = s.merge(KLLSketch(seed=seeds.spawn(1)[0]).add(chunk))
+    >>> lower, upper = s.bounds(0.5)
+    >>> bool(lower <= 50000 <= upper)
+    True
+
+    """
+
+    def __init__(self, k=KLL_K, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.error = 0
+        self.error_sq = 0
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def add(self, values):
+        """
+        Add an array of values, missing values are skipped.
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+        return self
+
+    def merge(self, other):
+        """
+        Add the values summarized by `other` to this sketch.
+        """
+
+        for level, values in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], values])
+
+        self.n += other.n
+        self.error += other.error
+        self.error_sq += other.error_sq
+        self._compress()
+
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if len(values) <= self.capacity(level):
+                level += 1
+                continue
+
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            values = np.sort(values)
+            # An odd value out stays behind.
+            end = len(values) - len(values) % 2
+            offset = self.rng.integers(2)
+
+            self.levels[level] = values[end:]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1],
+                                                     values[offset:end:2]])
+            self.error += 2 ** level
+            self.error_sq += 4 ** level
+
+            # Capacities shrink when a level is added, start over.
+            level = 0
+
+    def quantile(self, q):
+        """
+        Estimate the `q` quantile, nan if the sketch is empty.
+        """
+
+        if self.n == 0:
+            return math.nan
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2 ** h) for h, v in enumerate(self.levels)])
+
+        order = np.argsort(values, kind='stable')
+        ranks = np.cumsum(weights[order])
+        i = np.searchsorted(ranks, q * ranks[-1], side='left')
+
+        return float(values[order][min(i, len(order) - 1)])
+
+    def rank_error(self, confidence=0.99):
+        """
+        Bound on the rank error of a query as a fraction of `n`.
+
+        Parameters
+        ----------
+        confidence : float or None
+            Probability that the error is within the bound, from
+            Hoeffding's inequality over the random compactions.
+            With None, the bound holds always.
+
+        """
+
+        if self.n == 0:
+            return 0.0
+        if confidence is None:
+            return self.error / self.n
+
+        error = math.sqrt(2 * math.log(2 / (1 - confidence)) * self.error_sq)
+        return min(error, self.error) / self.n
+
+    def bounds(self, q, confidence=0.99):
+        """
+        Values between which the exact `q` quantile lies, see `rank_error`.
+        """
+
+        eps = self.rank_error(confidence)
+        return self.quantile(max(q - eps, 0)), self.quantile(min(q + eps, 1))
+
+
+# Dimensions of the aggregate cube.
+CUBE_KEYS = ['district', 'rooms', 'parking', 'scraped']
+
+
+def build_cube(df, measure='amount'):
+    """
+    Aggregate `measure` over every combination of `CUBE_KEYS`.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Listings with the columns in `CUBE_KEYS` and `measure`.
+        Missing keys are aggregated as their own cell, as ''
+        or -1 for rooms.
+
+    Returns
+    -------
+    DataFrame :
+        Count, sum, sum of squares and sketch of every cell.
+
+    """
+
+    keys = df[CUBE_KEYS].assign(district=df['district'].fillna(''),
+                                rooms=df['rooms'].fillna(-1).astype(int),
+                                parking=df['parking'].fillna(''),
+                                scraped=df['scraped'].fillna(''))
+    values = df[measure].astype(float)
+
+    rows = []
+    for key, group in values.groupby([keys[k] for k in CUBE_KEYS]):
+        group = group.dropna()
+        sketch = QuantileSketch()
+        sketch.add(group.to_numpy())
+        rows.append((*key, len(group), group.sum(), (group ** 2).sum(), sketch))
+
+    return pd.DataFrame(rows, columns=CUBE_KEYS + ['n', 'sum', 'sumsq', 'sketch'])
+
+
+def rollup(cube, by, quantiles=(0.1, 0.5, 0.9)):
+    """
+    Merge cells of a cube into the dimensions in `by`.
+
+    Returns
+    -------
+    DataFrame :
+        Count, mean, standard deviation and
+        quantiles of the measure for every group.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'district': ['a', 'a', 'b'], 'rooms': [1, 2, 1],
+    ...                    'parking': ['street'] * 3, 'scraped': ['2020-09-13'] * 3,
+    ...                    'amount': [100.0, 300.0, 50.0]})
+    >>> rollup(build_cube(df), ['district'])[['district', 'n', 'mean']]
+      district  n   mean
+    0        a  2  200.0
+    1        b  1   50.0
+
+    """
+
+    rows = []
+    for key, group in cube.groupby(by, sort=True):
+        sketch = QuantileSketch()
+        for s in group['sketch']:
+            sketch.merge(s)
+
+        n, total, sumsq = group['n'].sum(), group['sum'].sum(), group['sumsq'].sum()
+        mean = total / n if n else math.nan
+        std = math.sqrt(max(sumsq / n - mean ** 2, 0)) if n else math.nan
+
+        key = key if isinstance(key, tuple) else (key,)
+        rows.append((*key, n, mean, std, *[sketch.quantile(q) for q in quantiles]))
+
+    names = [f'q{round(q * 100)}' for q in quantiles]
+    return pd.DataFrame(rows, columns=list(by) + ['n', 'mean', 'std'] + names)
@@ -0,0 +1,400 @@
+import argparse
+import sqlite3
+import time
+
+import pandas as pd
+
+from sketch import CUBE_KEYS, QuantileSketch, build_cube, rollup
+
+# Columns of `etl.transform` output and their names in the database.
+COLUMNS = {'Date': 'date',
+           'City': 'city',
+           'District': 'district',
+           'Amount': 'amount',
+           'Currency': 'currency',
+           'Property': 'property',
+           'Seller': 'seller',
+           'Area': 'area',
+           'Rooms': 'rooms',
+           'Bathrooms': 'bathrooms',
+           'Parking': 'parking',
+           'Garden': 'garden',
+           'Balcony': 'balcony',
+           'Terrace': 'terrace',
+           'Basement': 'basement',
+           'New': 'new',
+           'Block': 'block',
+           'Townhouse': 'townhouse',
+           'Apartment': 'apartment',
+           'Bus stops': 'bus_stops',
+           'Studio': 'studio',
+           'Title': 'title',
+           'Description': 'description',
+           'Link': 'link',
+           'Scraped': 'scraped'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS listings (
+    date TEXT,
+    week TEXT,
+    city TEXT,
+    district TEXT,
+    amount REAL,
+    currency TEXT,
+    property TEXT,
+    seller TEXT,
+    area REAL,
+    price_m2 REAL,
+    rooms REAL,
+    bathrooms REAL,
+    parking TEXT,
+    garden INTEGER,
+    balcony INTEGER,
+    terrace INTEGER,
+    basement INTEGER,
+    new INTEGER,
+    block INTEGER,
+    townhouse INTEGER,
+    apartment INTEGER,
+    bus_stops INTEGER,
+    studio INTEGER,
+    title TEXT,
+    description TEXT,
+    link TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_district ON listings (district);
+CREATE INDEX IF NOT EXISTS listings_date ON listings (date);
+CREATE INDEX IF NOT EXISTS listings_link ON listings (link);
+-- Covers the median price per m2 by district and week.
+CREATE INDEX IF NOT EXISTS listings_district_week_price
+    ON listings (district, week, price_m2) WHERE price_m2 IS NOT NULL;
+
+-- Flats in Kraków priced in PLN, the ones the models are built on.
+CREATE VIEW IF NOT EXISTS flats AS
+    SELECT * FROM listings
+    WHERE city = 'kraków' AND currency = 'pln' AND property = 'flat';
+
+CREATE VIEW IF NOT EXISTS district_summary AS
+    SELECT district,
+           COUNT(*) AS n,
+           AVG(amount) AS mean_amount,
+           AVG(area) AS mean_area,
+           AVG(price_m2) AS mean_price_m2
+    FROM flats
+    WHERE district IS NOT NULL
+    GROUP BY district;
+
+CREATE TABLE IF NOT EXISTS district_week_price_m2 (
+    district TEXT,
+    week TEXT,
+    n INTEGER,
+    mean_price_m2 REAL,
+    median_price_m2 REAL,
+    PRIMARY KEY (district, week)
+);
+
+-- Amount of flats by district, rooms, parking and scrape date, see `sketch.build_cube`.
+CREATE TABLE IF NOT EXISTS cube (
+    district TEXT,
+    rooms INTEGER,
+    parking TEXT,
+    scraped TEXT,
+    n INTEGER,
+    sum REAL,
+    sumsq REAL,
+    sketch TEXT,
+    PRIMARY KEY (district, rooms, parking, scraped)
+);
+
+-- Scrapes loaded by `ListingStore.load_scrapes`, by their time.
+CREATE TABLE IF NOT EXISTS scrapes (
+    scraped TEXT PRIMARY KEY,
+    n INTEGER
+);
+'''
+
+# Median of price per m2 for every district and week, computed with
+# window functions over the covering index. `{where}` restricts it to
+# some weeks for incremental refreshes.
+MEDIAN_QUERY = '''
+WITH ranked AS (
+    SELECT district, week, price_m2,
+           ROW_NUMBER() OVER (PARTITION BY district, week ORDER BY price_m2) AS rn,
+           COUNT(*) OVER (PARTITION BY district, week) AS n,
+           AVG(price_m2) OVER (PARTITION BY district, week) AS mean
+    FROM flats
+    WHERE price_m2 IS NOT NULL AND district IS NOT NULL {where}
+)
+SELECT district, week, n, mean, AVG(price_m2)
+FROM ranked
+WHERE rn IN ((n + 1) / 2, (n + 2) / 2)
+GROUP BY district, week
+'''
+
+
+def prepare(df):
+    """
+    Rename columns of parsed listings and add derived ones.
+
+    Returns
+    -------
+    DataFrame :
+        Listings with the columns of the `listings` table.
+
+    """
+
+    df = df.rename(columns=COLUMNS)
+
+    date = pd.to_datetime(df['date'])
+    df['date'] = date.dt.strftime('%Y-%m-%d')
+    # Weeks start on Monday, like sqlite's strftime('%W').
+    df['week'] = date.dt.strftime('%Y-%W')
+
+    # Listings loaded without a scrape time are
+    # counted on the day they were added.
+    if 'scraped' in df:
+        df['scraped'] = pd.to_datetime(df['scraped']).dt.strftime('%Y-%m-%d')
+    else:
+        df['scraped'] = df['date']
+
+    area = df['area'].where(df['area'] > 0)
+    df['price_m2'] = (df['amount'] / area).where(df['currency'] == 'pln')
+
+    return df
+
+
+class ListingStore:
+    """
+    Listings in an embedded sqlite database.
+
+    Listings are indexed on district, date and link, the
+    median price per m2 by district and week is kept in the
+    `district_week_price_m2` table and summaries of the amount
+    of flats in the `cube` table. Both are updated for the
+    listings loaded, not rebuilt.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.con = sqlite3.connect(path)
+        self.con.executescript(SCHEMA)
+
+    def close(self):
+        self.con.close()
+
+    def clear(self):
+        """
+        Remove all listings and aggregates.
+        """
+
+        with self.con:
+            self.con.execute('DELETE FROM listings')
+            self.con.execute('DELETE FROM district_week_price_m2')
+            self.con.execute('DELETE FROM cube')
+            self.con.execute('DELETE FROM scrapes')
+
+    def columns(self):
+        return [row[1] for row in self.con.execute('PRAGMA table_info(listings)')]
+
+    def load(self, df, refresh=True):
+        """
+        Append parsed listings and refresh the aggregates of the weeks they fall in.
+
+        Returns
+        -------
+        set :
+            Weeks of the listings loaded.
+
+        """
+
+        df = prepare(df)
+        flats = (df['city'] == 'kraków') & (df['currency'] == 'pln') & (df['property'] == 'flat')
+
+        with self.con:
+            df[self.columns()].to_sql('listings', self.con, if_exists='append', index=False)
+            self.update_cube(df[flats])
+
+        weeks = set(df['week'].dropna())
+        if refresh:
+            self.refresh(weeks=sorted(weeks))
+
+        return weeks
+
+    def scrapes(self):
+        """
+        Times of the scrapes loaded with `load_scrapes`.
+        """
+
+        return {row[0] for row in self.con.execute('SELECT scraped FROM scrapes')}
+
+    def load_scrapes(self, df):
+        """
+        Load the listings of scrapes that are not in the store yet.
+
+        Scrapes are keyed by their `Scraped` time, like in `history.py`,
+        so listings `etl.transform` parsed again from scrapes loaded by
+        an earlier run are skipped, and the new ones are merged into
+        the aggregates. Listings without a scrape time are skipped.
+
+        Returns
+        -------
+        int :
+            Number of listings loaded.
+
+        """
+
+        keys = pd.to_datetime(df['Scraped']).dt.strftime('%Y-%m-%dT%H:%M:%S')
+        new = keys.notna() & ~keys.isin(self.scrapes())
+        if not new.any():
+            return 0
+
+        counts = keys[new].value_counts()
+        # Recorded in the same transaction as the listings.
+        with self.con:
+            self.con.executemany('INSERT INTO scrapes VALUES (?, ?)',
+                                 [(k, int(n)) for k, n in counts.items()])
+            weeks = self.load(df[new], refresh=False)
+        self.refresh(weeks=sorted(weeks))
+
+        return int(new.sum())
+
+    def load_csv(self, path, chunksize=100_000):
+        """
+        Append listings from a csv written by `etl.transform` in chunks,
+        so the file is never read into memory at once.
+        """
+
+        weeks = set()
+        for chunk in pd.read_csv(path, lineterminator='\n', chunksize=chunksize):
+            weeks |= self.load(chunk, refresh=False)
+
+        self.refresh(weeks=sorted(weeks))
+
+    def refresh(self, weeks=None):
+        """
+        Recompute median price per m2 by district, for
+        the given weeks only or for all of them.
+        """
+
+        if weeks is None:
+            where, params = '', []
+        else:
+            weeks = list(weeks)
+            if not weeks:
+                return
+            where = f'AND week IN ({", ".join("?" * len(weeks))})'
+            params = weeks
+
+        with self.con:
+            if weeks is None:
+                self.con.execute('DELETE FROM district_week_price_m2')
+            else:
+                self.con.execute(f'DELETE FROM district_week_price_m2 WHERE 1 {where}', params)
+            self.con.execute('INSERT INTO district_week_price_m2 '
+                             + MEDIAN_QUERY.format(where=where), params)
+
+    def cube(self):
+        """
+        Read the cube with its sketches.
+        """
+
+        cube = self.query('SELECT * FROM cube')
+        cube['sketch'] = cube['sketch'].map(QuantileSketch.from_json)
+
+        return cube
+
+    def update_cube(self, df):
+        """
+        Add flats to the cube, merging them into existing cells.
+        """
+
+        new = build_cube(df)
+        if new.empty:
+            return
+
+        old = self.cube().set_index(CUBE_KEYS)
+        rows = []
+
+        for cell in new.itertuples(index=False):
+            key = tuple(getattr(cell, k) for k in CUBE_KEYS)
+            n, total, sumsq, sketch = cell.n, cell.sum, cell.sumsq, cell.sketch
+
+            if key in old.index:
+                prev = old.loc[key]
+                n, total, sumsq = n + prev['n'], total + prev['sum'], sumsq + prev['sumsq']
+                sketch = sketch.merge(prev['sketch'])
+
+            rows.append((*key, int(n), float(total), float(sumsq), sketch.to_json()))
+
+        self.con.executemany('INSERT OR REPLACE INTO cube VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def summary(self, by, quantiles=(0.1, 0.5, 0.9)):
+        """
+        Summarize the amount of flats by some of
+        `district`, `rooms`, `parking` and `scraped`.
+
+        Only the cube is read, see `sketch.rollup`.
+        """
+
+        return rollup(self.cube(), by, quantiles=quantiles)
+
+    def query(self, sql, params=()):
+        return pd.read_sql(sql, self.con, params=params)
+
+    def price_m2(self, district=None, start=None, end=None):
+        """
+        Median price per m2 by district and week.
+
+        Parameters
+        ----------
+        district : str or None
+            Only this district if given.
+        start, end : str or None
+            First and last week, formatted as `YYYY-WW`.
+
+        """
+
+        sql = 'SELECT * FROM district_week_price_m2 WHERE 1'
+        params = []
+
+        if district is not None:
+            sql += ' AND district = ?'
+            params.append(district)
+        if start is not None:
+            sql += ' AND week >= ?'
+            params.append(start)
+        if end is not None:
+            sql += ' AND week <= ?'
+            params.append(end)
+
+        return self.query(sql + ' ORDER BY district, week', params)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Load listings into the analytical store.')
+    parser.add_argument('--in', dest='in_path', default='../flats-data/raw_data.csv')
+    parser.add_argument('--db', default='../flats-data/listings.sqlite')
+    parser.add_argument('--append', action='store_true', help='keep listings already in the store')
+    args = parser.parse_args()
+
+    store = ListingStore(args.db)
+    if not args.append:
+        store.clear()
+
+    start = time.perf_counter()
+    store.load_csv(args.in_path)
+    print(f'Loaded {args.in_path} in {time.perf_counter() - start:.1f}s.')
+
+    start = time.perf_counter()
+    result = store.price_m2()
+    print(f'Queried median price per m2 of {len(result)} district weeks '
+          f'in {(time.perf_counter() - start) * 1000:.1f}ms.')
+
+    store.close()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from etl import BINARY, districts
+from wrangle import DROP
+
+
+def listings(n, seed=0):
+    """
+    Generate `n` listings with the columns of `etl.transform`, for
+    benchmarks. Rooms, bathrooms and price depend on the area and
+    the district, like in scraped listings.
+
+    Examples
+    --------
+    >>> df = listings(1000)
+    >>> df.shape
+    (1000, 24)
+    >>> bool(df['Rooms'].corr(df['Area']) > 0.5)
+    True
+
+    """
+
+    rng = np.random.default_rng(seed)
+
+    district = rng.choice(list(districts), n)
+    area = np.clip(rng.lognormal(np.log(55), 0.35, n), 20, 150).round().astype(int)
+    rooms = np.clip(np.round(area / 22 + rng.normal(0, 0.6, n)), 1, 6).astype(int)
+    bathrooms = np.where(area + rng.normal(0, 15, n) > 90, 2, 1)
+    price_m2 = rng.normal(10000, 1500, n) + 500 * (district == 'stare miasto')
+
+    df = pd.DataFrame({'Date': pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 730, n), 'D'),
+                       'City': 'kraków',
+                       'District': district,
+                       'Amount': np.round(area * price_m2, -3).astype(int),
+                       'Currency': 'pln',
+                       'Property': rng.choice(['flat', 'house'], n, p=[0.9, 0.1]),
+                       'Seller': rng.choice(['realtor', 'owner'], n),
+                       'Area': area,
+                       'Rooms': rooms,
+                       'Bathrooms': bathrooms,
+                       'Parking': rng.choice(['no parking', 'street', 'garage', 'covered'], n)})
+
+    for col in BINARY:
+        df[col] = rng.random(n) < 0.3
+
+    df['Title'] = 'mieszkanie ' + df['District']
+    df['Description'] = 'opis ' * 40
+    df['Link'] = [f'/a-mieszkania-i-domy-sprzedam-i-kupie/krakow/{i}' for i in range(n)]
+
+    return df
+
+
+def cleaned(n, seed=0):
+    """
+    Generate `n` listings with the columns of `cleaned_data.csv`.
+    """
+
+    return listings(n, seed=seed).drop(columns=DROP)
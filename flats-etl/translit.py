@@ -0,0 +1,89 @@
+import os
+import re
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from unidecode import unidecode
+
+# Characters common in listings, transliterated with a table instead
+# of unidecode. Their mapping is taken from unidecode, so both give
+# the same result.
+POLISH = 'ąćęłńóśźżĄĆĘŁŃÓŚŹŻ'
+COMMON = '\xa0–—„”“’‘…²³°•€«»éüöäÉÜÖÄ'
+
+TABLE = {c: unidecode(c) for c in POLISH + COMMON}
+
+NON_ASCII = re.compile('[^\x00-\x7f]+')
+
+# Rows per task of the process pool.
+CHUNK_SIZE = 20_000
+
+
+def transliterate(text):
+    """
+    Replace non ascii characters with their closest ascii equivalents.
+
+    Characters left after the table, like emoji,
+    go through unidecode.
+
+    Examples
+    --------
+    >>> transliterate('Kraków, ul. Łobzowska – 50 m²')
+    'Krakow, ul. Lobzowska - 50 m2'
+
+    """
+
+    if text.isascii():
+        return text
+
+    # Texts are mostly ascii, replacing the few characters they
+    # contain is much faster than `str.translate`, which looks up
+    # every character of the text.
+    for char, ascii in TABLE.items():
+        if char in text:
+            text = text.replace(char, ascii)
+
+    if text.isascii():
+        return text
+
+    return NON_ASCII.sub(lambda m: unidecode(m.group()), text)
+
+
+def transliterate_chunk(texts):
+    return [x if not isinstance(x, str) else transliterate(x) for x in texts]
+
+
+def transliterate_series(s, n_jobs=None, chunk_size=CHUNK_SIZE):
+    """
+    Transliterate a column of text, missing values are kept.
+
+    Parameters
+    ----------
+    s : Series
+        Column of text.
+    n_jobs : int or None
+        Number of processes, all cores if None. Series
+        shorter than `chunk_size` are done in this process.
+    chunk_size : int
+        Rows sent to a process at a time.
+
+    Returns
+    -------
+    Series :
+        Transliterated text with the index of `s`.
+
+    """
+
+    texts = s.tolist()
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    if n_jobs == 1 or len(texts) <= chunk_size:
+        return pd.Series(transliterate_chunk(texts), index=s.index)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        result = [x for chunk in pool.map(transliterate_chunk, chunks) for x in chunk]
+
+    return pd.Series(result, index=s.index)
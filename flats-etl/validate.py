@@ -0,0 +1,172 @@
+import json
+import time
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from rules import RULES
+
+# Values outside of these bounds, inclusive, are not real listings,
+# like prices of one zloty or rents listed as sales. Missing values
+# pass, they are counted in the report.
+RANGES = {'Amount': (10_000, 100_000_000),
+          'Area': (5, 10_000),
+          'Rooms': (1, 50),
+          'Bathrooms': (1, 20)}
+
+# Labels every categorical column may take, besides missing values.
+CATEGORIES = {col: sorted(set(rule['keywords'].values())) for col, rule in RULES.items()}
+
+# Listings can not be added before this date or after they were scraped.
+MIN_DATE = pd.Timestamp('2000-01-01')
+MAX_DELAY = pd.Timedelta(days=1)
+
+# Rows failing these checks, by kind or name, are quarantined. Others,
+# like links repeated within a scrape or missing dates, are only reported.
+ERRORS = ['range', 'category', 'date:too old', 'date:future', 'link:missing']
+
+# Links of failing rows shown in the report for every check.
+EXAMPLES = 5
+
+
+def checks(df, scraped=None, categories=None):
+    """
+    Run every check on parsed listings in one vectorized pass.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Parsed listings, see `etl.parse_listings`.
+    scraped : Series or None
+        Time every listing was scraped, dates are compared
+        with the current time if not given.
+    categories : dict or None
+        Allowed labels by column, `CATEGORIES` if None.
+
+    Returns
+    -------
+    DataFrame :
+        One boolean column per check, True where a row fails it.
+        Columns are named `kind:column`.
+
+    """
+
+    categories = CATEGORIES if categories is None else categories
+    failed = {}
+
+    for col, (low, high) in RANGES.items():
+        values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+        with np.errstate(invalid='ignore'):
+            failed[f'range:{col}'] = (values < low) | (values > high)
+
+    for col, allowed in categories.items():
+        values = df[col]
+        failed[f'category:{col}'] = (values.notna() & ~values.isin(allowed)).to_numpy()
+
+    date = pd.to_datetime(df['Date'], errors='coerce')
+    if scraped is None:
+        latest = pd.Timestamp.now() + MAX_DELAY
+    else:
+        latest = (pd.to_datetime(scraped).fillna(pd.Timestamp.now()) + MAX_DELAY).to_numpy()
+    failed['date:missing'] = date.isna().to_numpy()
+    failed['date:too old'] = (date < MIN_DATE).to_numpy()
+    failed['date:future'] = (date > latest).to_numpy()
+
+    # The same listing is in every scrape it was seen in,
+    # only repeats within a scrape are flagged.
+    failed['link:missing'] = df['Link'].isna().to_numpy()
+    key = pd.DataFrame({'Link': df['Link'].to_numpy(),
+                        'Scraped': scraped.to_numpy() if scraped is not None else 0})
+    failed['link:duplicate'] = key.duplicated(keep='last').to_numpy() & df['Link'].notna().to_numpy()
+
+    return pd.DataFrame(failed, index=df.index)
+
+
+def is_error(name):
+    return name in ERRORS or name.split(':')[0] in ERRORS
+
+
+def make_report(df, failed):
+    """
+    Summarize checks into a dict that can be saved as json.
+
+    Returns
+    -------
+    tuple :
+        Report and mask of rows failing errors.
+
+    """
+
+    errors = failed[[name for name in failed if is_error(name)]].any(axis=1)
+
+    repeated = int(df['Link'].duplicated().sum() - failed['link:duplicate'].sum())
+
+    report = {'rows': len(df),
+              'valid': int((~errors).sum()),
+              'quarantined': int(errors.sum()),
+              'checks': {},
+              'missing': {col: round(float(share), 4) for col, share in df.isna().mean().items()},
+              'links_in_many_scrapes': repeated}
+
+    for name in failed:
+        mask = failed[name].to_numpy()
+        report['checks'][name] = {'failed': int(mask.sum()),
+                                  'severity': 'error' if is_error(name) else 'warning',
+                                  'examples': df.loc[mask, 'Link'].head(EXAMPLES).tolist()}
+
+    return report, errors.to_numpy()
+
+
+def validate(df, scraped=None, categories=None, report_path=None, quarantine_path=None):
+    """
+    Check parsed listings and take out the ones failing errors.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Parsed listings, see `etl.parse_listings`.
+    scraped, categories :
+        See `checks`.
+    report_path : str or None
+        Json file the report is saved to.
+    quarantine_path : str or None
+        Csv file failing listings are saved to, with
+        the checks they failed in a `Failed` column.
+
+    Returns
+    -------
+    tuple :
+        Mask of valid listings and the report.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'Date': ['2020-09-01', '2020-09-02'], 'Amount': [500000, 1],
+    ...                    'Area': [50, 40], 'Rooms': [2, 1], 'Bathrooms': [1, 1],
+    ...                    'City': ['kraków', 'kraków'], 'Link': ['a', 'b']})
+    >>> valid, report = validate(df, categories={'City': ['kraków']})
+    >>> valid.tolist(), report['checks']['range:Amount']['examples']
+    ([True, False], ['b'])
+
+    """
+
+    start = time.perf_counter()
+    failed = checks(df, scraped=scraped, categories=categories)
+    report, errors = make_report(df, failed)
+    report['seconds'] = round(time.perf_counter() - start, 3)
+
+    if report_path is not None:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if quarantine_path is not None:
+        if errors.any():
+            bad = failed[errors]
+            reasons = bad.apply(lambda row: ';'.join(bad.columns[row.to_numpy()]), axis=1)
+            df[errors].assign(Failed=reasons).to_csv(quarantine_path, index=False)
+        else:
+            # Do not leave the listings of an earlier run behind.
+            Path(quarantine_path).unlink(missing_ok=True)
+
+    return ~errors, report
@@ -0,0 +1,308 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import dedup
+
+from colcache import ColumnCache, cache_path
+from impute import METHODS, impute
+from sketch import KLLSketch
+
+# Quantiles outside of which listings are trimmed as outliers.
+AMOUNT_QUANTILES = (0.025, 0.975)
+AREA_QUANTILES = (0.01, 0.99)
+QUANTILES = {'Amount': AMOUNT_QUANTILES, 'Area': AREA_QUANTILES}
+
+# Rows of raw data read at once when trimming with sketches.
+CHUNK_SIZE = 100_000
+
+# Columns not used after wrangling.
+DROP = ['Title', 'Description', 'Link', 'Property', 'City', 'Currency', 'Date']
+
+
+def extract_parking(descriptions):
+    """
+    Extract parking information from property descriptions.
+
+    Parameters
+    ----------
+    descriptions : Series
+        Listing descriptions.
+
+    Returns
+    -------
+    Series :
+        Type of parking for every description.
+
+    Examples
+    --------
+    >>> s = pd.Series(['garaż podziemny', 'miejsce w garazu', 'parking', 'brak'])
+    >>> extract_parking(s).tolist()
+    ['covered', 'garage', 'street', 'no parking']
+
+    """
+
+    descriptions = descriptions.fillna('')
+
+    def contains(word):
+        return descriptions.str.contains(word, regex=False).to_numpy()
+
+    garage = contains('garaż') | contains('garaz')
+    parking = contains('parking')
+    underground = contains('podziemny')
+
+    conditions = [(garage | parking) & underground,
+                  garage & ~underground,
+                  parking & ~underground]
+
+    labels = np.select(conditions, ['covered', 'garage', 'street'], default='no parking')
+
+    return pd.Series(labels, index=descriptions.index)
+
+
+def deduplicate(df):
+    """
+    Keep the newest listing for every title.
+
+    Notes
+    -----
+    Assumes that `Title` uniquely identifies a listing.
+    """
+
+    df = df.sort_values(by='Date',
+                        ascending=False,
+                        na_position='last',
+                        ignore_index=True)
+
+    return df.drop_duplicates(['Title'], keep='first')
+
+
+def fill_city(df):
+    """
+    Fill in `City` as Kraków where the district is known.
+    """
+
+    df = df.copy()
+
+    mask = df['City'].isna() & df['District'].notna()
+    df.loc[mask, 'City'] = 'kraków'
+
+    return df
+
+
+def fill_missing(df):
+    """
+    Fill in `City` and `Parking` where they can be inferred.
+    """
+
+    df = fill_city(df)
+
+    mask = df['Parking'].isna() & df['Description'].notna()
+    df.loc[mask, 'Parking'] = extract_parking(df.loc[mask, 'Description'])
+    df['Parking'] = df['Parking'].fillna('no parking')
+
+    return df
+
+
+def trim_bounds(values, quantiles):
+    """
+    Get the bounds values are trimmed to.
+
+    Examples
+    --------
+    >>> trim_bounds(pd.Series(range(101)), (0.1, 0.9))
+    (10.0, 90.0)
+
+    """
+
+    lower, upper = values.quantile(list(quantiles))
+    return lower, upper
+
+
+def flats_in_krakow(df):
+    """
+    Mask of flats in Kraków priced in PLN.
+    """
+
+    return ((df['City'] == 'kraków')
+            & (df['Currency'] == 'pln')
+            & (df['Property'] == 'flat'))
+
+
+def sketch_bounds(chunks, seed=0):
+    """
+    Get the bounds `Amount` and `Area` are trimmed to from
+    quantile sketches of chunks of listings, merged together.
+
+    Only one chunk at a time is held in memory, so `chunks`
+    can be read from a csv in chunks. Every chunk is sketched
+    with its own random stream spawned from `seed`.
+
+    Returns
+    -------
+    tuple :
+        Bounds of every column and the bound on the rank error
+        of their quantiles, see `sketch.KLLSketch.rank_error`.
+
+    """
+
+    seeds = np.random.SeedSequence(seed)
+    sketches = {col: KLLSketch(seed=seeds.spawn(1)[0]) for col in QUANTILES}
+
+    for chunk in chunks:
+        mask = flats_in_krakow(chunk)
+        for col, sketch in sketches.items():
+            sketch.merge(KLLSketch(seed=seeds.spawn(1)[0]).add(chunk.loc[mask, col]))
+
+    bounds = {col: tuple(sketches[col].quantile(q) for q in QUANTILES[col])
+              for col in QUANTILES}
+    errors = {col: sketch.rank_error() for col, sketch in sketches.items()}
+
+    return bounds, errors
+
+
+def filter_rows(df, bounds=None):
+    """
+    Keep flats in Kraków priced in PLN with known district,
+    seller and description, trimming `Amount` and `Area` outliers.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Listings.
+    bounds : dict or None
+        Bounds of `Amount` and `Area`, see `sketch_bounds`.
+        Computed from exact quantiles if not given.
+
+    Notes
+    -----
+    All rules are combined into a single mask. The quantiles are
+    computed once over the flats in Kraków priced in PLN, instead
+    of after each preceding rule.
+    """
+
+    mask = flats_in_krakow(df)
+
+    if bounds is None:
+        bounds = {col: trim_bounds(df.loc[mask, col], QUANTILES[col]) for col in QUANTILES}
+
+    for col, (lower, upper) in bounds.items():
+        mask &= df[col].between(lower, upper)
+    mask &= (df['District'] != 'unknown') & df['District'].notna()
+    mask &= df['Seller'].notna()
+    mask &= df['Description'].notna()
+
+    return df[mask].reset_index(drop=True)
+
+
+def wrangle(df, method='grouped', near_duplicates=True, bounds=None):
+    """
+    Turn raw data into a cleaned dataset ready for modelling.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Data produced by `etl.transform`.
+    method : str
+        Imputation method, see `impute.impute`.
+    near_duplicates : bool
+        Also remove reposts with small changes, see `dedup.deduplicate`.
+    bounds : dict or None
+        Bounds `Amount` and `Area` are trimmed to, see `filter_rows`.
+
+    Returns
+    -------
+    DataFrame :
+        Cleaned data.
+
+    """
+
+    nrows_before = len(df)
+
+    df = deduplicate(df)
+    print(f'Rows after removing duplicates {len(df)}.')
+
+    if near_duplicates:
+        df = dedup.deduplicate(df)
+        print(f'Rows after removing near-duplicates {len(df)}.')
+
+    df = fill_missing(df)
+
+    df = filter_rows(df, bounds=bounds)
+    print(f'Rows after filtering {len(df)}.')
+
+    df = impute(df, method=method)
+    df = df.drop(DROP, axis=1)
+
+    print(f'Rows remaining {len(df)}.')
+    print(f'Dropped {nrows_before - len(df)}.')
+
+    return df
+
+
+def read_trimmed(in_path, chunk_size=CHUNK_SIZE, seed=0):
+    """
+    Read raw data in chunks, trimming outliers to quantiles
+    estimated with sketches, see `sketch_bounds`.
+
+    The csv is read twice, once to sketch the quantiles and once to
+    filter the rows, so only one chunk of raw data and the rows kept
+    are held in memory.
+
+    Returns
+    -------
+    tuple :
+        Rows kept by `filter_rows` and the bounds they are trimmed to.
+
+    Notes
+    -----
+    Quantiles are estimated over all the flats in Kraków priced in
+    PLN, duplicates included, and rows are filtered before removing
+    duplicates, so results differ slightly from the exact path.
+    """
+
+    def chunks():
+        return pd.read_csv(in_path, lineterminator='\n', chunksize=chunk_size)
+
+    bounds, errors = sketch_bounds((fill_city(chunk) for chunk in chunks()), seed=seed)
+    for col, (lower, upper) in bounds.items():
+        print(f'Trimming {col} to {lower:,.0f}-{upper:,.0f}, '
+              f'quantile rank error below {errors[col]:.2%}.')
+
+    df = pd.concat([filter_rows(fill_missing(chunk), bounds=bounds) for chunk in chunks()],
+                   ignore_index=True)
+    print(f'Rows after trimming outliers {len(df)}.')
+
+    return df, bounds
+
+
+def run(in_path, out_path, method='grouped', near_duplicates=True, sketch=False):
+    """
+    Read raw data, wrangle it and save the cleaned data.
+
+    With `sketch`, raw data is read in chunks, see `read_trimmed`.
+    """
+
+    if sketch:
+        df, bounds = read_trimmed(in_path)
+    else:
+        df, bounds = pd.read_csv(in_path, lineterminator='\n'), None
+
+    df = wrangle(df, method=method, near_duplicates=near_duplicates, bounds=bounds)
+    df.to_csv(out_path, index=False)
+    ColumnCache(cache_path(out_path)).write(df, source=out_path)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Clean raw listings for modelling.')
+    parser.add_argument('--in', dest='in_path', default='../flats-data/raw_data.csv')
+    parser.add_argument('--out', dest='out_path', default='../flats-data/cleaned_data.csv')
+    parser.add_argument('--impute', choices=METHODS, default='grouped')
+    parser.add_argument('--keep-near-duplicates', action='store_true')
+    parser.add_argument('--sketch', action='store_true', help='trim outliers with quantile sketches')
+    args = parser.parse_args()
+
+    run(args.in_path, args.out_path, method=args.impute,
+        near_duplicates=not args.keep_near_duplicates, sketch=args.sketch)
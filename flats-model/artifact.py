@@ -0,0 +1,78 @@
+import argparse
+import time
+
+# joblib (and with it sklearn when a pipeline is unpickled)
+# is imported inside the functions that need it, so that
+# importing this module stays cheap.
+
+
+def save_model(model, path):
+    """
+    Save a model so that it can be memory-mapped when loaded.
+
+    Notes
+    -----
+    Compressed files are decompressed into memory on load,
+    so the model is always saved uncompressed.
+    """
+
+    import joblib
+
+    joblib.dump(model, path, compress=0)
+
+
+def load_model(path, mmap_mode='r'):
+    """
+    Load a model saved with `joblib.dump`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the saved model.
+    mmap_mode : str or None
+        Passed to `joblib.load`. With the default read only mode
+        numpy arrays in the model are mapped from the file instead
+        of being copied, so processes loading the same file share
+        those pages through the os page cache.
+
+    Returns
+    -------
+    object :
+        The loaded model.
+
+    Notes
+    -----
+    sklearn copies the node arrays of fitted trees into its own
+    buffers when they are unpickled, so for tree ensembles only the
+    remaining arrays (e.g. encoder categories) stay mapped. A model
+    compiled with `compiled.py` keeps its trees in plain arrays
+    that stay mapped.
+
+    """
+
+    import joblib
+
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def convert(in_path, out_path):
+    """
+    Re-save a possibly compressed model uncompressed.
+    """
+
+    import joblib
+
+    model = joblib.load(in_path)
+    save_model(model, out_path)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Re-save a model so it can be memory-mapped.')
+    parser.add_argument('in_path')
+    parser.add_argument('out_path')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    convert(args.in_path, args.out_path)
+    print(f'Saved {args.out_path} in {time.perf_counter() - start:.3f}s.')
@@ -0,0 +1,80 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifact import load_model
+from compiled import CompiledEnsemble
+from features import features
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+
+
+def time_it(func, X, min_time=0.5):
+    """
+    Time `func(X)` in seconds, repeating short runs.
+    """
+
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(X)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def benchmark(model_path, sample_path, batch_sizes=BATCH_SIZES, seed=123):
+    """
+    Compare tree evaluation of sklearn and the compiled ensemble.
+
+    Parameters
+    ----------
+    model_path : str
+        Saved pipeline ending with a `GradientBoostingRegressor`.
+    sample_path : str
+        Csv with cleaned records, resampled to every batch size.
+    batch_sizes : list of int
+        Number of rows scored at once.
+
+    Notes
+    -----
+    Rows are preprocessed up front, so only the evaluation
+    of the trees is timed.
+    """
+
+    pipeline = load_model(model_path)
+    regressor = pipeline[-1]
+    compiled = CompiledEnsemble.from_gbr(regressor)
+
+    sample = pd.read_csv(sample_path, lineterminator='\n')
+    sample = features(sample)
+
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(sample), max(batch_sizes))
+    X = pipeline[:-1].transform(sample.iloc[rows])
+    if hasattr(X, 'toarray'):
+        X = X.toarray()
+
+    print(f'{"batch":>9}{"sklearn rows/s":>17}{"compiled rows/s":>17}{"speedup":>9}{"equal":>7}')
+
+    for n in batch_sizes:
+        Xb = X[:n]
+        equal = np.array_equal(regressor.predict(Xb), compiled.predict(Xb))
+        t_sklearn = time_it(regressor.predict, Xb)
+        t_compiled = time_it(compiled.predict, Xb)
+        print(f'{n:>9}{n / t_sklearn:>17,.0f}{n / t_compiled:>17,.0f}'
+              f'{t_sklearn / t_compiled:>9.2f}{str(equal):>7}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark compiled tree ensemble inference.')
+    parser.add_argument('--model', default='gbr.joblib')
+    parser.add_argument('--sample', required=True, help='csv with cleaned records')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    args = parser.parse_args()
+
+    benchmark(args.model, args.sample, batch_sizes=args.batch_sizes)
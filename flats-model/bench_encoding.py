@@ -0,0 +1,93 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+
+from synthetic import cleaned
+from train import ENCODINGS, build_gbr, build_mlp, column_types
+
+# The one hot encoded matrix made dense, which the preprocessor
+# returns whenever it is not mostly zeros, then every encoding.
+VARIANTS = [('dense', 'onehot', {'preprocessor__sparse_threshold': 0})]
+VARIANTS += [(encoding, encoding, {}) for encoding in ENCODINGS]
+
+
+def synthetic(n, cardinality, seed=0):
+    """
+    Generate `n` rows like the cleaned data, see `synthetic.cleaned`,
+    with a text column of `cardinality` distinct values, like titles
+    kept as a categorical, drawn with a long tail.
+    """
+
+    rng = np.random.default_rng(seed)
+    X = cleaned(n, seed=seed)
+
+    titles = np.minimum(rng.zipf(1.3, n), cardinality)
+    X['Title'] = pd.Series(titles).map('title {}'.format).astype(object)
+
+    y = X.pop('Amount') + (titles % 7) * 20_000
+
+    return X, y
+
+
+def nbytes(X):
+    if sparse.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def benchmark(n, cardinality, variants=VARIANTS):
+    """
+    Compare the width, memory and fit time of the model
+    pipelines with every encoding of categorical columns.
+    """
+
+    X, y = synthetic(n, cardinality)
+    categorical, continuous = column_types(X)
+    print(f'{n:,} rows, {X["Title"].nunique():,} distinct titles')
+    print(f'{"model":<6}{"variant":<10}{"format":>8}{"columns":>9}{"matrix MB":>11}'
+          f'{"peak MB":>9}{"transform s":>13}{"fit s":>8}')
+
+    builders = {'gbr': lambda e: build_gbr(categorical, encoding=e).set_params(
+                    regressor__n_estimators=20, regressor__max_depth=5),
+                'mlp': lambda e: build_mlp(categorical, continuous, encoding=e).set_params(
+                    transformer__regressor__hidden_layer_sizes=(100,),
+                    transformer__regressor__max_iter=5)}
+
+    for name, build in builders.items():
+        for variant, encoding, params in variants:
+            model = build(encoding).set_params(**params)
+            pre = model[0]
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            Xt = pre.fit_transform(X)
+            transform = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            model.fit(X, y)
+            fit = time.perf_counter() - start
+
+            fmt = Xt.format if sparse.issparse(Xt) else 'dense'
+            print(f'{name:<6}{variant:<10}{fmt:>8}{Xt.shape[1]:>9,}{nbytes(Xt) / 1e6:>11,.1f}'
+                  f'{peak / 1e6:>9,.1f}{transform:>13.2f}{fit:>8.2f}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark encodings of categorical columns.')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--cardinality', type=int, default=5_000,
+                        help='most distinct values of the text column')
+    parser.add_argument('--variants', nargs='+', choices=[v[0] for v in VARIANTS],
+                        default=[v[0] for v in VARIANTS])
+    args = parser.parse_args()
+
+    benchmark(args.rows, args.cardinality,
+              variants=[v for v in VARIANTS if v[0] in args.variants])
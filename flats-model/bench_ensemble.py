@@ -0,0 +1,85 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ensemble import EnsembleScorer
+from features import features
+
+BATCH_SIZES = [1, 100, 10000, 100000]
+
+
+def time_it(func, X, min_time=0.5):
+    """
+    Time `func(X)` in seconds, repeating short runs.
+    """
+
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(X)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def benchmark(model_paths, sample_path, batch_sizes=BATCH_SIZES, n_jobs=1, seed=123):
+    """
+    Compare scoring every model on its own with scoring them
+    together on shared preprocessing.
+
+    Parameters
+    ----------
+    model_paths : list of str
+        Saved pipelines, see `EnsembleScorer.load`.
+    sample_path : str
+        Csv with cleaned records, resampled to every batch size.
+    batch_sizes : list of int
+        Number of rows scored at once.
+    n_jobs : int
+        Threads the shared scorer scores models on.
+
+    """
+
+    scorer = EnsembleScorer.load(model_paths, n_jobs=n_jobs)
+    models = scorer.models
+
+    sample = features(pd.read_csv(sample_path, lineterminator='\n'))
+    rng = np.random.default_rng(seed)
+    X = sample.iloc[rng.integers(0, len(sample), max(batch_sizes))]
+
+    def separately(Xb):
+        return {name: model.predict(Xb) for name, model in models.items()}
+
+    print(f'{len(models)} models, {len(scorer.blocks)} distinct preprocessing blocks')
+    print(f'{"batch":>9}{"separate rows/s":>17}{"shared rows/s":>15}{"speedup":>9}{"equal":>7}')
+
+    for n in batch_sizes:
+        Xb = X.iloc[:n]
+        expected = separately(Xb)
+        preds = scorer.predict_features(Xb)
+        equal = all(np.array_equal(preds[name], expected[name]) for name in models)
+        t_separate = time_it(separately, Xb)
+        t_shared = time_it(scorer.predict_features, Xb)
+        print(f'{n:>9}{n / t_separate:>17,.0f}{n / t_shared:>15,.0f}'
+              f'{t_separate / t_shared:>9.2f}{str(equal):>7}')
+
+    print('Latency of the shared scorer over all batches:')
+    for name, stats in scorer.stats().items():
+        print(f'  {name:<12}{stats}')
+
+    scorer.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark scoring models on shared preprocessing.')
+    parser.add_argument('--models', nargs='+', default=['gbr.joblib', 'mlp.joblib', 'vote.joblib'])
+    parser.add_argument('--sample', required=True, help='csv with cleaned records')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    benchmark(args.models, args.sample, batch_sizes=args.batch_sizes, n_jobs=args.n_jobs)
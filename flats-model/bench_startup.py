@@ -0,0 +1,160 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# Code run in a fresh interpreter for every measurement.
+# It reports the time spent in each phase as json.
+CHILD = '''
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {here!r})
+import predict
+t1 = time.perf_counter()
+phases = {{'import': t1 - t0}}
+if {load!r}:
+    p = predict.PricePredictor({model!r}, mmap_mode={mmap_mode!r})
+    t2 = time.perf_counter()
+    phases['load'] = t2 - t1
+    if {score!r}:
+        import pandas as pd
+        x = pd.read_csv({sample!r}, nrows=1)
+        t3 = time.perf_counter()
+        p.predict(x)
+        phases['first_prediction'] = time.perf_counter() - t3
+print(json.dumps(phases))
+'''
+
+# Worker that loads the model and waits so its memory can be inspected.
+WORKER = '''
+import sys
+sys.path.insert(0, {here!r})
+import predict
+p = predict.PricePredictor({model!r}, mmap_mode={mmap_mode!r})
+print('ready', flush=True)
+sys.stdin.read()
+'''
+
+
+def run_child(model, mmap_mode, load=True, score=False, sample=None):
+    """
+    Measure startup phases in a fresh interpreter.
+
+    Returns
+    -------
+    dict :
+        Seconds spent in every phase, plus the
+        total wall time of the process.
+
+    """
+
+    code = CHILD.format(here=str(HERE), model=model, mmap_mode=mmap_mode,
+                        load=load, score=score, sample=sample)
+
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code],
+                         capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+
+    phases = json.loads(out.stdout.strip().splitlines()[-1])
+    phases['process'] = total
+
+    return phases
+
+
+def memory_usage(pid):
+    """
+    Read resident and proportional set size of a process in MB.
+
+    Notes
+    -----
+    Pss splits shared pages between the processes mapping them,
+    so it drops when workers share memory. Linux only.
+    """
+
+    usage = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, *value = line.split()
+            if name in ('Rss:', 'Pss:'):
+                usage[name[:-1].lower() + '_mb'] = int(value[0]) / 1024
+
+    return usage
+
+
+def measure_workers(model, mmap_mode, n_workers):
+    """
+    Load the model in `n_workers` processes and report their memory.
+    """
+
+    code = WORKER.format(here=str(HERE), model=model, mmap_mode=mmap_mode)
+    workers = [subprocess.Popen([sys.executable, '-c', code],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+               for _ in range(n_workers)]
+
+    try:
+        for w in workers:
+            w.stdout.readline()
+        usage = [memory_usage(w.pid) for w in workers]
+    finally:
+        for w in workers:
+            w.stdin.close()
+            w.wait()
+
+    return {'rss_mb': statistics.mean(u['rss_mb'] for u in usage),
+            'pss_mb': statistics.mean(u['pss_mb'] for u in usage)}
+
+
+def benchmark(model, sample=None, repeat=5, n_workers=4):
+    """
+    Compare cold start of the scoring stack with and without mmap.
+
+    Parameters
+    ----------
+    model : str
+        Path to a saved model.
+    sample : str
+        Csv with cleaned records, used to time the first prediction.
+    repeat : int
+        Number of fresh interpreters per variant.
+    n_workers : int
+        Number of concurrent workers for the memory measurement.
+
+    """
+
+    variants = [('import only', None, False),
+                ('load', None, True),
+                ('load mmap', 'r', True)]
+
+    print(f'{"variant":<14}{"import s":>10}{"load s":>10}{"1st pred s":>12}{"process s":>11}')
+
+    for name, mmap_mode, load in variants:
+        runs = [run_child(model, mmap_mode, load=load, score=load and sample is not None,
+                          sample=sample) for _ in range(repeat)]
+        median = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print(f'{name:<14}{median["import"]:>10.3f}{median.get("load", 0):>10.3f}'
+              f'{median.get("first_prediction", 0):>12.3f}{median["process"]:>11.3f}')
+
+    if Path('/proc/self/smaps_rollup').exists():
+        print(f'\nMemory per worker with {n_workers} workers:')
+        for name, mmap_mode in [('load', None), ('load mmap', 'r')]:
+            usage = measure_workers(model, mmap_mode, n_workers)
+            print(f'{name:<14} rss {usage["rss_mb"]:8.1f} MB   pss {usage["pss_mb"]:8.1f} MB')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark model cold start.')
+    parser.add_argument('--model', default=str(HERE / 'gbr.joblib'))
+    parser.add_argument('--sample', help='csv with cleaned records to score')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    benchmark(args.model, sample=args.sample, repeat=args.repeat, n_workers=args.workers)
@@ -0,0 +1,314 @@
+import argparse
+import json
+import time
+
+from pathlib import Path
+
+import numpy as np
+
+from artifact import load_model, save_model
+
+# Arrays making up a compiled ensemble, each saved as its own
+# .npy file so that they can be memory-mapped when loaded.
+ARRAYS = ['feature', 'threshold', 'left', 'value', 'roots']
+
+# Losses for which the raw prediction of the
+# ensemble is the prediction itself.
+REGRESSION_LOSSES = ['ls', 'lad', 'huber', 'quantile',
+                     'squared_error', 'absolute_error']
+
+# Rows times trees evaluated at once, bounds memory use.
+BLOCK_SIZE = 2 ** 16
+
+
+def _breadth_first(tree):
+    """
+    Order the nodes of a tree so that siblings are adjacent.
+
+    Returns
+    -------
+    ndarray :
+        Node ids of `tree` in the new order.
+
+    """
+
+    left = tree.children_left
+    right = tree.children_right
+
+    order = []
+    level = np.array([0])
+
+    while level.size:
+        order.append(level)
+        internal = level[left[level] != -1]
+        level = np.column_stack([left[internal], right[internal]]).ravel()
+
+    return np.concatenate(order)
+
+
+class CompiledEnsemble:
+    """
+    Gradient boosted trees flattened into numpy arrays.
+
+    The nodes of all trees are stored in shared arrays, so the
+    whole ensemble is evaluated over a batch with a handful of
+    vectorized operations per tree level instead of one call
+    per tree.
+
+    Parameters
+    ----------
+    feature : ndarray
+        Feature tested at every node.
+    threshold : ndarray
+        Threshold tested at every node, infinite for leaves.
+    left : ndarray
+        Index of the left child of every node, the right child
+        follows it. Leaves point to themselves and their infinite
+        threshold keeps them in place on extra iterations.
+    value : ndarray
+        Value of every node.
+    roots : ndarray
+        Index of the root of every tree.
+    init : float
+        Initial prediction of the ensemble.
+    learning_rate : float
+        Weight of every tree.
+    max_depth : int
+        Depth of the deepest tree.
+
+    """
+
+    def __init__(self, feature, threshold, left, value, roots,
+                 init, learning_rate, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.value = value
+        self.roots = roots
+        self.init = init
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_gbr(cls, gbr):
+        """
+        Compile a fitted `GradientBoostingRegressor`.
+        """
+
+        loss = getattr(gbr, 'loss', None)
+        if loss not in REGRESSION_LOSSES:
+            raise ValueError(f'Loss {loss} is not supported.')
+
+        if isinstance(gbr.init_, str) and gbr.init_ == 'zero':
+            init = 0.0
+        elif type(gbr.init_).__name__ == 'DummyRegressor':
+            init = float(np.ravel(gbr.init_.constant_)[0])
+        else:
+            raise ValueError(f'Init estimator {gbr.init_} is not supported.')
+
+        features, thresholds, lefts, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in gbr.estimators_[:, 0]:
+            tree = estimator.tree_
+            order = _breadth_first(tree)
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            leaf = tree.children_left[order] == -1
+
+            features.append(np.where(leaf, 0, tree.feature[order]))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold[order]))
+            lefts.append(np.where(leaf, np.arange(len(order)),
+                                  position[tree.children_left[order]]) + offset)
+            values.append(tree.value[order, 0, 0])
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        # Indices are stored as intp so that
+        # numpy does not convert them on every lookup.
+        return cls(feature=np.concatenate(features).astype(np.intp),
+                   threshold=np.concatenate(thresholds).astype(np.float64),
+                   left=np.concatenate(lefts).astype(np.intp),
+                   value=np.concatenate(values).astype(np.float64),
+                   roots=np.asarray(roots, dtype=np.intp),
+                   init=init,
+                   learning_rate=float(gbr.learning_rate),
+                   max_depth=int(max_depth))
+
+    def leaves(self, X):
+        """
+        Find the leaf every row lands in, for every tree.
+
+        Returns
+        -------
+        ndarray :
+            Array of shape (n_trees, n_rows) with leaf indices.
+
+        """
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        rows = (np.arange(n_rows) * n_features)[None, :]
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+
+        for _ in range(self.max_depth):
+            x = flat[rows + self.feature[nodes]]
+            nodes = self.left[nodes] + (x > self.threshold[nodes])
+
+        return nodes
+
+    def predict(self, X):
+        """
+        Predict with the compiled ensemble.
+
+        Parameters
+        ----------
+        X : array or sparse matrix
+            Transformed input of shape (n_rows, n_features).
+
+        Returns
+        -------
+        ndarray :
+            Predictions, identical to the ones of the source model.
+
+        Notes
+        -----
+        Inputs are cast to float32 like sklearn does before walking
+        its trees, and tree outputs are summed in the same order, so
+        results match `predict` of the source model exactly.
+
+        """
+
+        n_rows = X.shape[0]
+        chunk = max(1, BLOCK_SIZE // len(self.roots))
+        out = np.empty(n_rows, dtype=np.float64)
+
+        for start in range(0, n_rows, chunk):
+            Xc = X[start:start + chunk]
+            if hasattr(Xc, 'toarray'):
+                Xc = Xc.toarray()
+            Xc = np.ascontiguousarray(Xc, dtype=np.float32)
+
+            if not np.isfinite(Xc).all():
+                raise ValueError('Input contains NaN or infinity.')
+
+            steps = self.learning_rate * self.value[self.leaves(Xc)]
+            # Accumulate tree by tree like sklearn does,
+            # cumsum adds rows sequentially in order.
+            steps = np.vstack([np.full((1, Xc.shape[0]), self.init), steps])
+            out[start:start + chunk] = np.cumsum(steps, axis=0)[-1]
+
+        return out
+
+    def save(self, path):
+        """
+        Save arrays and parameters to the directory `path`.
+        """
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        for name in ARRAYS:
+            np.save(path / f'{name}.npy', getattr(self, name))
+
+        meta = {'init': self.init,
+                'learning_rate': self.learning_rate,
+                'max_depth': self.max_depth}
+
+        with open(path / 'ensemble.json', 'w') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load a compiled ensemble saved with `save`.
+
+        Notes
+        -----
+        With `mmap_mode='r'` the node arrays are mapped from disk,
+        so worker processes scoring with the same ensemble share
+        a single copy through the os page cache.
+        """
+
+        path = Path(path)
+
+        with open(path / 'ensemble.json') as f:
+            meta = json.load(f)
+
+        arrays = {name: np.load(path / f'{name}.npy', mmap_mode=mmap_mode)
+                  for name in ARRAYS}
+
+        return cls(**arrays, **meta)
+
+
+class CompiledPipeline:
+    """
+    A model pipeline with its regressor compiled.
+
+    Parameters
+    ----------
+    preprocessor : object
+        Fitted preprocessing step of the pipeline.
+    ensemble : CompiledEnsemble
+        Compiled regressor.
+
+    """
+
+    def __init__(self, preprocessor, ensemble):
+        self.preprocessor = preprocessor
+        self.ensemble = ensemble
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Compile a fitted pipeline ending with a `GradientBoostingRegressor`.
+        """
+
+        preprocessor = pipeline[:-1]
+        ensemble = CompiledEnsemble.from_gbr(pipeline[-1])
+
+        return cls(preprocessor, ensemble)
+
+    def predict(self, X):
+        return self.ensemble.predict(self.preprocessor.transform(X))
+
+    def save(self, path):
+        self.ensemble.save(path)
+        save_model(self.preprocessor, Path(path) / 'preprocessor.joblib')
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        preprocessor = load_model(Path(path) / 'preprocessor.joblib', mmap_mode=mmap_mode)
+        ensemble = CompiledEnsemble.load(path, mmap_mode=mmap_mode)
+
+        return cls(preprocessor, ensemble)
+
+
+def compile_model(in_path, out_path):
+    """
+    Compile a saved pipeline and save it to the directory `out_path`.
+    """
+
+    pipeline = load_model(in_path)
+    compiled = CompiledPipeline.from_pipeline(pipeline)
+    compiled.save(out_path)
+
+    return compiled
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Compile a saved gradient boosting pipeline.')
+    parser.add_argument('in_path')
+    parser.add_argument('out_path')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    compiled = compile_model(args.in_path, args.out_path)
+    n_nodes = len(compiled.ensemble.value)
+    n_trees = len(compiled.ensemble.roots)
+    print(f'Compiled {n_trees} trees with {n_nodes} nodes to {args.out_path} '
+          f'in {time.perf_counter() - start:.3f}s.')
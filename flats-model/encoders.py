@@ -0,0 +1,64 @@
+import numpy as np
+
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
+
+# Kept out of features.py, which is imported by the scoring
+# cli and server and does not import sklearn.
+
+
+class HashingEncoder(TransformerMixin, BaseEstimator):
+    """
+    Encode categorical columns into a fixed number of sparse columns.
+
+    Every value is hashed together with its column name, so the width
+    of the output does not grow with the number of categories and
+    values not seen in training need no special handling. Distinct
+    values can share a column when their hashes collide.
+
+    Parameters
+    ----------
+    n_features : int
+        Number of output columns.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> X = pd.DataFrame({'District': ['krowodrza', 'debniki'], 'Seller': ['owner', 'owner']})
+    >>> Xt = HashingEncoder(n_features=16).fit_transform(X)
+    >>> Xt.shape, Xt.format, Xt.sum(axis=1).A1.tolist()
+    ((2, 16), 'csr', [2.0, 2.0])
+
+    Missing values are hashed as a value of their own.
+
+    >>> X = pd.DataFrame({'District': pd.Categorical(['krowodrza', None])})
+    >>> Xt = HashingEncoder(n_features=16).fit_transform(X)
+    >>> Xt.sum(axis=1).A1.tolist()
+    [1.0, 1.0]
+
+    """
+
+    def __init__(self, n_features=2 ** 12):
+        self.n_features = n_features
+
+    def fit(self, X, y=None):
+        self.columns_ = list(X.columns)
+        self.n_features_in_ = len(self.columns_)
+
+        return self
+
+    def transform(self, X):
+        # One 'column=value' string per cell, missing values included.
+        tokens = []
+        for col in self.columns_:
+            values = X[col].astype(object).where(X[col].notna(), '<NA>')
+            tokens.append(f'{col}=' + values.astype(str).to_numpy(dtype=object))
+        tokens = np.column_stack(tokens)
+        hasher = FeatureHasher(n_features=self.n_features,
+                               input_type='string',
+                               alternate_sign=False)
+
+        return hasher.transform(tokens.tolist())
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f'hash{i}' for i in range(self.n_features)], dtype=object)
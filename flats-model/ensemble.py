@@ -0,0 +1,356 @@
+import argparse
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from artifact import load_model
+from compiled import CompiledPipeline
+from features import features
+from predict import read_table, summarize_latency, write_table
+
+# sklearn, scipy and joblib are imported where they are used,
+# like in predict.py.
+
+
+def split_model(model):
+    """
+    Split a fitted model into its preprocessing and its regressor.
+
+    Returns
+    -------
+    tuple :
+        Preprocessing, None for a bare regressor, and the regressor.
+
+    """
+
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(model, CompiledPipeline):
+        return model.preprocessor, model.ensemble
+    elif isinstance(model, Pipeline):
+        return model[:-1], model[-1]
+    else:
+        return None, model
+
+
+def transformer_columns(ct, columns):
+    """
+    Names of the columns a fitted `ColumnTransformer` passes to a
+    transformer. The remainder is given by position.
+    """
+
+    if isinstance(columns, str):
+        return columns
+
+    columns = list(columns)
+    if columns and not isinstance(columns[0], str):
+        columns = list(ct.feature_names_in_[columns])
+
+    return columns
+
+
+def to_numeric(block):
+    """
+    Turn a transformed block into an array, or keep it sparse.
+    """
+
+    from scipy import sparse
+
+    if sparse.issparse(block):
+        return block
+
+    block = np.asarray(block)
+    if block.dtype == object:
+        block = block.astype(float)
+
+    return block
+
+
+class EnsembleScorer:
+    """
+    Score cleaned listings with several models, sharing their preprocessing.
+
+    The models in `train.py` each one hot encode the same columns,
+    with encoders fit on the same data. Every transformer of the
+    models' `ColumnTransformer`s is keyed by its fitted state and the
+    columns it takes, so a transformer the models have in common is
+    run once per batch. Each model's matrix is then stacked from the
+    blocks it uses and the regressors are scored on it, on threads
+    if `n_jobs` > 1. A `VotingRegressor` is split into its members
+    and predicts the weighted average of their predictions.
+
+    The threads are stopped by `close`, or at the end of a `with` block.
+
+    Parameters
+    ----------
+    models : dict
+        Fitted models by name.
+    n_jobs : int
+        Threads the regressors are scored on.
+
+    Attributes
+    ----------
+    latencies : dict
+        Seconds every batch took, for the preprocessing and
+        for every model.
+
+    """
+
+    def __init__(self, models, n_jobs=1):
+        from sklearn.ensemble import VotingRegressor
+
+        self.models = dict(models)
+        self.n_jobs = n_jobs
+        self.blocks = {}
+        self.plans = {}
+        self.votes = {}
+
+        for name, model in self.models.items():
+            if isinstance(model, VotingRegressor):
+                weights = model.weights
+                if weights is not None:
+                    weights = [w for (_, est), w in zip(model.estimators, weights) if est != 'drop']
+                # Dropped members have no fitted estimator.
+                kept = (member for member, est in model.estimators if est != 'drop')
+                members = [f'{name}/{member}' for member in kept]
+                self.votes[name] = (members, weights)
+                for member, estimator in zip(members, model.estimators_):
+                    self.plans[member] = self.plan(estimator)
+            else:
+                self.plans[name] = self.plan(model)
+
+        self.latencies = {name: [] for name in ['preprocess'] + list(self.models)}
+        self.pool = ThreadPoolExecutor(n_jobs) if n_jobs > 1 else None
+
+    @classmethod
+    def load(cls, paths, n_jobs=1, mmap_mode='r'):
+        """
+        Load models saved with `joblib.dump` or compiled with `compiled.py`,
+        named after their files.
+        """
+
+        models = {}
+        for path in paths:
+            if Path(path).is_dir():
+                models[Path(path).name] = CompiledPipeline.load(path, mmap_mode=mmap_mode)
+            else:
+                models[Path(path).stem] = load_model(path, mmap_mode=mmap_mode)
+
+        return cls(models, n_jobs=n_jobs)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def block(self, transformer, columns=None):
+        """
+        Register a transformer applied to `columns`, all if None.
+
+        Returns
+        -------
+        tuple :
+            Key of the block, the same for equal fitted transformers.
+
+        """
+
+        import joblib
+
+        fingerprint = transformer if isinstance(transformer, str) else joblib.hash(transformer)
+        key = (fingerprint, None if columns is None else tuple(np.atleast_1d(columns)))
+        self.blocks.setdefault(key, (transformer, columns))
+
+        return key
+
+    def plan(self, model):
+        """
+        Register the preprocessing of a model.
+
+        Returns
+        -------
+        tuple :
+            `ColumnTransformer` stacking the blocks or None,
+            keys of the blocks and the regressor.
+
+        """
+
+        from sklearn.compose import ColumnTransformer
+
+        pre, regressor = split_model(model)
+
+        if pre is None:
+            return None, [], regressor
+
+        if len(pre) == 1 and isinstance(pre[0], ColumnTransformer):
+            ct = pre[0]
+            keys = []
+            for _, transformer, columns in ct.transformers_:
+                columns = transformer_columns(ct, columns)
+                if isinstance(transformer, str) and transformer == 'drop' or len(columns) == 0:
+                    continue
+                keys.append(self.block(transformer, columns))
+            return ct, keys, regressor
+
+        # Other preprocessing is shared only with models that have an equal one.
+        return None, [self.block(pre)], regressor
+
+    def transform(self, X):
+        """
+        Run every distinct block once and stack the matrix of every model.
+
+        Returns
+        -------
+        dict :
+            Input of the regressor of every model.
+
+        """
+
+        from scipy import sparse
+
+        blocks = {}
+        for key, (transformer, columns) in self.blocks.items():
+            Xc = X if columns is None else X[columns]
+            blocks[key] = Xc if isinstance(transformer, str) else transformer.transform(Xc)
+
+        stacked = {}
+        inputs = {}
+        for name, (ct, keys, _) in self.plans.items():
+            if not keys:
+                inputs[name] = X
+            elif ct is None:
+                inputs[name] = blocks[keys[0]]
+            else:
+                # Models with the same blocks share the stacked matrix too.
+                key = (ct.sparse_output_, tuple(keys))
+                if key not in stacked:
+                    parts = [to_numeric(blocks[k]) for k in keys]
+                    if ct.sparse_output_:
+                        stacked[key] = sparse.hstack(parts).tocsr()
+                    else:
+                        stacked[key] = np.hstack([p.toarray() if sparse.issparse(p) else p
+                                                  for p in parts])
+                inputs[name] = stacked[key]
+
+        return inputs
+
+    def score(self, name, X):
+        start = time.perf_counter()
+        preds = self.plans[name][2].predict(X)
+
+        return preds, time.perf_counter() - start
+
+    def predict_features(self, X):
+        """
+        Predict prices of every model from features.
+
+        Returns
+        -------
+        dict :
+            Predicted amounts of every model.
+
+        """
+
+        start = time.perf_counter()
+        inputs = self.transform(X)
+        self.latencies['preprocess'].append(time.perf_counter() - start)
+
+        names = list(self.plans)
+        tasks = [(name, inputs[name]) for name in names]
+        if self.pool is None:
+            results = [self.score(name, Xm) for name, Xm in tasks]
+        else:
+            results = list(self.pool.map(lambda task: self.score(*task), tasks))
+        results = dict(zip(names, results))
+
+        preds = {}
+        for name in self.models:
+            if name in self.votes:
+                members, weights = self.votes[name]
+                preds[name] = np.average(np.column_stack([results[m][0] for m in members]),
+                                         axis=1, weights=weights)
+                self.latencies[name].append(sum(results[m][1] for m in members))
+            else:
+                preds[name], seconds = results[name]
+                self.latencies[name].append(seconds)
+
+        return preds
+
+    def predict(self, df):
+        """
+        Predict prices of every model for a batch of cleaned listings.
+        """
+
+        return self.predict_features(features(df))
+
+    def check(self, df):
+        """
+        Largest difference of the shared predictions from the
+        predictions of every model on its own.
+        """
+
+        X = features(df)
+        preds = self.predict_features(X)
+
+        return {name: float(np.abs(preds[name] - model.predict(X)).max())
+                for name, model in self.models.items()}
+
+    def stats(self):
+        return {name: summarize_latency(latencies)
+                for name, latencies in self.latencies.items()}
+
+
+def score_file(scorer, in_path, out_path, batch_size=10000, check=False):
+    """
+    Score a csv or parquet file with every model and report
+    the latency of the preprocessing and of every model.
+    """
+
+    df = read_table(in_path)
+
+    if check:
+        for name, diff in scorer.check(df.head(batch_size)).items():
+            print(f'{name}: largest difference from the model on its own {diff:.3g}')
+
+    X = features(df)
+    preds = {name: [] for name in scorer.models}
+
+    start = time.perf_counter()
+    for offset in range(0, len(X), batch_size):
+        for name, p in scorer.predict_features(X.iloc[offset:offset + batch_size]).items():
+            preds[name].append(p)
+    duration = time.perf_counter() - start
+
+    for name, p in preds.items():
+        df[f'Predicted Amount {name}'] = np.concatenate(p) if p else np.empty(0)
+    write_table(df, out_path)
+
+    print(f'Scored {len(df)} rows with {len(scorer.models)} models in {duration:.3f}s '
+          f'({len(df) / max(duration, 1e-9):,.0f} rows/s).')
+    for name, stats in scorer.stats().items():
+        print(f'{name} batch latency: {stats}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Score flat prices with several models at once.')
+    parser.add_argument('--models', nargs='+', default=['gbr.joblib', 'mlp.joblib', 'vote.joblib'])
+    parser.add_argument('--in', dest='in_path', required=True, help='csv or parquet file to score')
+    parser.add_argument('--out', dest='out_path', default='predictions.csv')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--n-jobs', type=int, default=1, help='threads the models are scored on')
+    parser.add_argument('--check', action='store_true',
+                        help='compare the first batch with every model on its own')
+    args = parser.parse_args()
+
+    with EnsembleScorer.load(args.models, n_jobs=args.n_jobs) as scorer:
+        score_file(scorer, args.in_path, args.out_path,
+                   batch_size=args.batch_size, check=args.check)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+
+from pathlib import Path
+
+import numpy as np
+
+# Columns of the cleaned dataset used by the
+# models, in the order they were trained on.
+COLUMNS = ['District',
+           'Seller',
+           'Area',
+           'Rooms',
+           'Bathrooms',
+           'Parking',
+           'Garden',
+           'Balcony',
+           'Terrace',
+           'Basement',
+           'New',
+           'Block',
+           'Townhouse',
+           'Apartment',
+           'Bus stops',
+           'Studio']
+
+# Binary columns extracted from the listing text.
+BINARY = ['Garden',
+          'Balcony',
+          'Terrace',
+          'Basement',
+          'New',
+          'Block',
+          'Townhouse',
+          'Apartment',
+          'Bus stops',
+          'Studio']
+
+# Features engineered from the columns above.
+ENGINEERED = ['Log Area',
+              'Bool Sum',
+              'Area to Bool Sum',
+              'Rooms to Bool Sum',
+              'Rooms to Bathrooms',
+              'Total Rooms',
+              'Area to Rooms',
+              'Area to Bathrooms',
+              'Area to Total Rooms']
+
+FEATURES = COLUMNS + ENGINEERED
+
+# Bump when the definition of a feature changes,
+# so that cached features are computed again.
+FEATURE_VERSION = 1
+
+TARGET = 'Amount'
+
+
+def engineered_columns(df):
+    """
+    Compute the features in `ENGINEERED` in one vectorized pass.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Data with the columns in `COLUMNS`.
+
+    Returns
+    -------
+    dict :
+        Arrays of engineered features by name.
+
+    Notes
+    -----
+    The definitions follow the `02_Model` notebook the saved
+    models were trained with. This includes `Area to Bathrooms`
+    being computed as the ratio of `Area` to `Rooms`.
+
+    """
+
+    area = df['Area'].to_numpy()
+    rooms = df['Rooms'].to_numpy()
+    bathrooms = df['Bathrooms'].to_numpy()
+    bool_sum = df[BINARY].sum(axis=1).to_numpy()
+    total_rooms = rooms + bathrooms
+
+    # Like pandas, give inf instead of warning on division by zero.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'Log Area': np.round(np.log(area), 2),
+                'Bool Sum': bool_sum,
+                # Avoid division by zero
+                'Area to Bool Sum': np.round(area / (bool_sum + 1), 2),
+                'Rooms to Bool Sum': np.round(rooms / (bool_sum + 1), 2),
+                'Rooms to Bathrooms': np.round(rooms / bathrooms, 2),
+                'Total Rooms': np.round(total_rooms, 2),
+                'Area to Rooms': np.round(area / rooms, 2),
+                'Area to Bathrooms': np.round(area / rooms, 2),
+                'Area to Total Rooms': np.round(area / total_rooms, 2)}
+
+
+def add_features(df):
+    """
+    Add engineered features to cleaned data.
+
+    Returns
+    -------
+    DataFrame :
+        Copy of `df` with the columns in `ENGINEERED` added.
+
+    """
+
+    return df.assign(**engineered_columns(df))
+
+
+def features(df, store=None):
+    """
+    Get the model features of cleaned data.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Data with the columns in `COLUMNS`.
+    store : FeatureStore or None
+        Cache for the features, they are computed if not given.
+
+    Returns
+    -------
+    DataFrame :
+        Columns in `FEATURES`, with the index of `df`.
+
+    """
+
+    if store is not None:
+        return store.load(df)
+
+    return df[COLUMNS].assign(**engineered_columns(df))
+
+
+class FeatureStore:
+    """
+    Cache of features on disk.
+
+    Features are saved in a pickle named after a hash of the input
+    columns, their index and `FEATURE_VERSION`, so training,
+    evaluation and batch scoring of the same data read identical
+    columns computed once.
+
+    Parameters
+    ----------
+    path : str
+        Directory the features are saved to.
+
+    Attributes
+    ----------
+    hits : int
+        Number of loads served from the cache.
+    misses : int
+        Number of loads that computed features.
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, df):
+        """
+        Hash the input columns of `df` and the feature version.
+        """
+
+        import pandas as pd
+
+        digest = hashlib.sha1(f'v{FEATURE_VERSION}'.encode())
+        digest.update(str(list(df[COLUMNS].dtypes.astype(str))).encode())
+        digest.update(pd.util.hash_pandas_object(df[COLUMNS]).to_numpy().tobytes())
+
+        return digest.hexdigest()
+
+    def load(self, df):
+        """
+        Read the features of `df` from the cache, computing
+        and saving them first if they are not there.
+        """
+
+        import pandas as pd
+
+        path = self.path / f'features-v{FEATURE_VERSION}-{self.key(df)}.pkl'
+
+        if path.exists():
+            self.hits += 1
+            return pd.read_pickle(path)
+
+        self.misses += 1
+        X = features(df)
+
+        # Write under a temporary name so that concurrent
+        # readers never see a partially written file.
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        X.to_pickle(tmp)
+        tmp.replace(path)
+
+        return X
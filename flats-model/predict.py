@@ -0,0 +1,416 @@
+import argparse
+import json
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Event, Thread
+
+import numpy as np
+
+from artifact import load_model
+from features import FeatureStore, features
+
+# pandas is imported where it is used so that starting
+# the cli or the server does not pay for it up front.
+
+DEFAULT_MODEL = 'gbr.joblib'
+
+
+def read_table(path):
+    """
+    Read records to score from a csv or parquet file.
+    """
+
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    else:
+        return pd.read_csv(path, lineterminator='\n')
+
+
+def write_table(df, path):
+    """
+    Write scored records to a csv or parquet file.
+    """
+
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def summarize_latency(latencies):
+    """
+    Summarize latencies given in seconds.
+
+    Returns
+    -------
+    dict :
+        Percentiles of latency in milliseconds.
+
+    Examples
+    --------
+    >>> summarize_latency([0.001, 0.002, 0.003])
+    {'p50_ms': 2.0, 'p95_ms': 2.9, 'max_ms': 3.0}
+    >>> summarize_latency([])
+    {}
+
+    """
+
+    if not latencies:
+        return {}
+
+    ms = np.asarray(latencies) * 1000
+
+    return {'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3),
+            'max_ms': round(float(ms.max()), 3)}
+
+
+class PricePredictor:
+    """
+    Score cleaned listings with a saved model pipeline.
+
+    The pipeline is loaded once and reused for every batch.
+
+    Parameters
+    ----------
+    path : str
+        Path to a model saved with `joblib.dump`, or to
+        a directory with a model compiled by `compiled.py`.
+    mmap_mode : str or None
+        Memory-map numpy arrays in the model, see `load_model`.
+
+    Attributes
+    ----------
+    load_time : float
+        Seconds it took to load the model.
+
+    """
+
+    def __init__(self, path=DEFAULT_MODEL, mmap_mode='r'):
+        start = time.perf_counter()
+        if Path(path).is_dir():
+            from compiled import CompiledPipeline
+            self.model = CompiledPipeline.load(path, mmap_mode=mmap_mode)
+        else:
+            self.model = load_model(path, mmap_mode=mmap_mode)
+        self.load_time = time.perf_counter() - start
+        self.path = path
+
+    def predict(self, df):
+        """
+        Predict prices for a batch of cleaned listings.
+
+        Parameters
+        ----------
+        df : DataFrame
+            Records with the cleaned data columns.
+
+        Returns
+        -------
+        ndarray :
+            Predicted amount for every record.
+
+        """
+
+        return self.model.predict(features(df))
+
+    def predict_batches(self, df, batch_size=10000, store=None):
+        """
+        Predict prices in batches of `batch_size` rows.
+
+        Features of all rows are computed, or read from `store`,
+        up front, so batch latencies cover the model only.
+
+        Returns
+        -------
+        tuple :
+            Predictions and the latency of every batch in seconds.
+
+        """
+
+        X = features(df, store=store)
+        preds = []
+        latencies = []
+
+        for start in range(0, len(X), batch_size):
+            batch = X.iloc[start:start + batch_size]
+            t = time.perf_counter()
+            preds.append(self.model.predict(batch))
+            latencies.append(time.perf_counter() - t)
+
+        if preds:
+            preds = np.concatenate(preds)
+        else:
+            preds = np.empty(0)
+
+        return preds, latencies
+
+
+class MicroBatcher:
+    """
+    Group concurrent requests into batches for the model.
+
+    Requests are queued and a single worker thread scores
+    everything that arrives within `max_wait` seconds of the
+    first waiting request, up to `max_batch` records.
+
+    Parameters
+    ----------
+    predictor : PricePredictor
+        Loaded model.
+    max_batch : int
+        Maximum number of records scored at once.
+    max_wait : float
+        Maximum time in seconds a request waits for others.
+
+    """
+
+    def __init__(self, predictor, max_batch=512, max_wait=0.005):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = Queue()
+        self.batch_sizes = []
+        self.latencies = []
+        self.worker = Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def submit(self, records):
+        """
+        Score a list of records and wait for the result.
+        """
+
+        request = {'records': records, 'done': Event(), 'result': None, 'error': None}
+        self.queue.put(request)
+        request['done'].wait()
+
+        if request['error'] is not None:
+            raise request['error']
+
+        return request['result']
+
+    def collect(self, batch):
+        """
+        Gather requests to batch with the ones in `batch`.
+        """
+
+        size = sum(len(request['records']) for request in batch)
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=timeout)
+            except Empty:
+                break
+            batch.append(request)
+            size += len(request['records'])
+
+        return batch
+
+    def score(self, batch):
+        """
+        Score a batch of requests and hand every request its result.
+        """
+
+        import pandas as pd
+
+        records = [r for request in batch for r in request['records']]
+
+        start = time.perf_counter()
+        try:
+            preds = self.predictor.predict(pd.DataFrame.from_records(records))
+        except Exception:
+            # Score requests one by one so that a single
+            # malformed request does not fail the whole batch.
+            for request in batch:
+                start = time.perf_counter()
+                try:
+                    preds = self.predictor.predict(pd.DataFrame.from_records(request['records']))
+                    request['result'] = preds.tolist()
+                    self.latencies.append(time.perf_counter() - start)
+                    self.batch_sizes.append(len(request['records']))
+                except Exception as e:
+                    request['error'] = e
+                request['done'].set()
+            return
+        self.latencies.append(time.perf_counter() - start)
+        self.batch_sizes.append(len(records))
+
+        offset = 0
+        for request in batch:
+            n = len(request['records'])
+            request['result'] = preds[offset:offset + n].tolist()
+            offset += n
+            request['done'].set()
+
+    def run(self):
+
+        while True:
+            batch = [self.queue.get()]
+            try:
+                self.collect(batch)
+                self.score(batch)
+            except Exception as e:
+                # Fail the requests of the batch, never the worker,
+                # or every later request would wait forever.
+                for request in batch:
+                    if not request['done'].is_set():
+                        request['error'] = e
+                        request['done'].set()
+
+    def stats(self):
+
+        stats = {'batches': len(self.batch_sizes),
+                 'records': int(sum(self.batch_sizes)),
+                 'mean_batch': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                 'load_time_s': round(self.predictor.load_time, 3)}
+        stats.update(summarize_latency(self.latencies[-1000:]))
+
+        return stats
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """
+    Serve predictions over http.
+
+    `POST /predict` takes a json record or a list of records and
+    returns their predicted amounts, `GET /stats` reports batching
+    and latency stats.
+    """
+
+    def do_POST(self):
+
+        if self.path != '/predict':
+            self.respond(404, {'error': 'not found'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+
+        try:
+            records = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.respond(400, {'error': 'invalid json'})
+            return
+
+        if isinstance(records, dict):
+            records = [records]
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            self.respond(400, {'error': 'expected a json record or a list of records'})
+            return
+
+        try:
+            preds = self.server.batcher.submit(records)
+        except (KeyError, ValueError, TypeError) as e:
+            # Records the model can not score.
+            self.respond(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self.respond(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+
+        self.respond(200, {'predictions': preds})
+
+    def do_GET(self):
+
+        if self.path == '/stats':
+            self.respond(200, self.server.batcher.stats())
+        else:
+            self.respond(404, {'error': 'not found'})
+
+    def respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PredictionServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # Allow bursts of concurrent clients to queue up.
+    request_queue_size = 128
+
+
+def serve(predictor, host='127.0.0.1', port=8080, max_batch=512, max_wait=0.005):
+    """
+    Serve predictions over http until interrupted.
+    """
+
+    server = PredictionServer((host, port), PredictionHandler)
+    server.batcher = MicroBatcher(predictor, max_batch=max_batch, max_wait=max_wait)
+
+    print(f'Serving predictions on http://{host}:{port}/predict')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def score_file(predictor, in_path, out_path, batch_size=10000, feature_cache=None):
+    """
+    Score a csv or parquet file and report throughput.
+
+    Features are read from a `FeatureStore` in `feature_cache`
+    if given.
+    """
+
+    df = read_table(in_path)
+    store = FeatureStore(feature_cache) if feature_cache else None
+
+    start = time.perf_counter()
+    preds, latencies = predictor.predict_batches(df, batch_size=batch_size, store=store)
+    duration = time.perf_counter() - start
+
+    df['Predicted Amount'] = preds
+    write_table(df, out_path)
+
+    print(f'Scored {len(df)} rows in {duration:.3f}s '
+          f'({len(df) / max(duration, 1e-9):,.0f} rows/s).')
+    print(f'Batch latency: {summarize_latency(latencies)}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Predict flat prices with a saved model.')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--in', dest='in_path', help='csv or parquet file to score')
+    parser.add_argument('--out', dest='out_path', default='predictions.csv')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--feature-cache', default=None, help='directory of cached features')
+    parser.add_argument('--serve', action='store_true', help='serve predictions over http')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch', type=int, default=512)
+    parser.add_argument('--max-wait', type=float, default=0.005)
+    args = parser.parse_args()
+
+    predictor = PricePredictor(args.model)
+    print(f'Loaded {args.model} in {predictor.load_time:.3f}s.')
+
+    if args.serve:
+        serve(predictor,
+              host=args.host,
+              port=args.port,
+              max_batch=args.max_batch,
+              max_wait=args.max_wait)
+    elif args.in_path:
+        score_file(predictor, args.in_path, args.out_path,
+                   batch_size=args.batch_size, feature_cache=args.feature_cache)
+    else:
+        parser.error('either --in or --serve is required')
@@ -0,0 +1,562 @@
+import argparse
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import GradientBoostingRegressor, VotingRegressor
+from sklearn.metrics import (mean_absolute_error, mean_squared_error,
+                             mean_squared_log_error)
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+from sklearn.neural_network import MLPRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+
+from artifact import save_model
+# The column cache of the cleaned data is kept by the ETL. `flats.py`
+# makes flats-etl importable, see `flats.SHARED`, otherwise add it
+# to PYTHONPATH.
+from colcache import ColumnCache, read_csv
+from features import TARGET, FeatureStore, features
+
+RANDOM_STATE = 123
+
+# `max_features=None` uses all features, which
+# is what 'auto' meant for regressors.
+GBR_GRID = {'regressor__max_depth': [5, 10, 15],
+            'regressor__n_estimators': [50, 100, 200, 300],
+            'regressor__min_samples_split': [2, 4],
+            'regressor__min_samples_leaf': [2, 4],
+            'regressor__max_features': [None]}
+
+LAYERS = [(100, 100, 100),
+          (150, 200, 150),
+          (200, 400, 200)]
+
+MLP_GRID = {'transformer__regressor__activation': ['relu'],
+            'transformer__regressor__solver': ['adam'],
+            'transformer__regressor__learning_rate': ['adaptive'],
+            'transformer__regressor__learning_rate_init': [0.01, 0.001, 0.0001],
+            'transformer__regressor__hidden_layer_sizes': LAYERS}
+
+# For successive halving the number of trees is the budget that
+# grows between rounds, 75 -> 150 -> 300 with a factor of 2, and
+# every fit stops early once the validation loss stops improving.
+GBR_HALVING_GRID = {k: v for k, v in GBR_GRID.items() if k != 'regressor__n_estimators'}
+GBR_HALVING_GRID.update({'regressor__n_iter_no_change': [10],
+                         'regressor__validation_fraction': [0.1]})
+
+GBR_HALVING = {'resource': 'regressor__n_estimators',
+               'min_resources': 75,
+               'max_resources': 300,
+               'factor': 2}
+
+# The perceptron has no natural budget parameter,
+# so rounds grow the number of training samples.
+MLP_HALVING_GRID = dict(MLP_GRID)
+MLP_HALVING_GRID.update({'transformer__regressor__early_stopping': [True],
+                         'transformer__regressor__validation_fraction': [0.1]})
+
+MLP_HALVING = {'resource': 'n_samples',
+               'min_resources': 'exhaust',
+               'factor': 3}
+
+SEARCHES = ['grid', 'halving']
+
+# How categorical columns are encoded, see `make_encoder`.
+ENCODINGS = ['onehot', 'sparse', 'hashing']
+
+# With sparse encoding, categories seen fewer times in training are
+# merged into one infrequent category, and no column is split into
+# more categories than this.
+MIN_FREQUENCY = 10
+MAX_CATEGORIES = 100
+
+# Columns categorical values are hashed into with hashing encoding.
+HASH_FEATURES = 2 ** 10
+
+
+def load_data(path, feature_cache=None):
+    """
+    Read cleaned data and split it into features and target.
+
+    Data is read through its column cache, see `colcache.read_csv`,
+    so text columns are Categoricals. Features are read from a
+    `FeatureStore` in `feature_cache` if given.
+    """
+
+    data = read_csv(path, lineterminator='\n')
+    store = FeatureStore(feature_cache) if feature_cache else None
+
+    X = features(data, store=store)
+    data = X.assign(**{TARGET: data[TARGET]}).drop_duplicates()
+
+    X = data.drop(columns=TARGET)
+    y = data[TARGET]
+
+    return X, y
+
+
+def column_types(X):
+    """
+    Split columns into categorical and continuous ones.
+    """
+
+    categorical = list(X.select_dtypes(['object', 'category']).columns)
+    continuous = list(X.select_dtypes('int64'))
+    continuous += list(X.select_dtypes('float64'))
+
+    return categorical, continuous
+
+
+def make_encoder(encoding='onehot'):
+    """
+    Set up the encoder of categorical columns.
+
+    Parameters
+    ----------
+    encoding : str
+        'onehot' encodes every category in its own column, and the
+        preprocessor returns a dense matrix unless it is mostly
+        zeros. 'sparse' encodes frequent categories only, capped by
+        `MIN_FREQUENCY` and `MAX_CATEGORIES`, and 'hashing' hashes
+        values into `HASH_FEATURES` columns. Both always keep the
+        output of the preprocessor a sparse CSR matrix.
+
+    Returns
+    -------
+    tuple :
+        Encoding pipeline and the `sparse_threshold` of
+        the `ColumnTransformer` it goes in.
+
+    """
+
+    if encoding == 'onehot':
+        return Pipeline(steps=[('onehot', OneHotEncoder(handle_unknown='ignore'))]), 0.3
+    elif encoding == 'sparse':
+        ohe = OneHotEncoder(handle_unknown='infrequent_if_exist',
+                            min_frequency=MIN_FREQUENCY,
+                            max_categories=MAX_CATEGORIES)
+        return Pipeline(steps=[('onehot', ohe)]), 1.0
+    elif encoding == 'hashing':
+        from encoders import HashingEncoder
+
+        return Pipeline(steps=[('hash', HashingEncoder(n_features=HASH_FEATURES))]), 1.0
+    else:
+        raise ValueError(f'{encoding} is not a valid encoding, expected one of {ENCODINGS}.')
+
+
+def build_dmr():
+    """
+    Baseline model predicting the mean price.
+    """
+
+    dmr_ohe = Pipeline(steps=[('onehot', OneHotEncoder(handle_unknown='ignore'))])
+
+    return Pipeline(steps=[('preprocessor', dmr_ohe),
+                           ('regressor', DummyRegressor())])
+
+
+def build_mlp(categorical, continuous, memory=None, encoding='onehot'):
+    """
+    Multi-layer perceptron on scaled continuous and one hot encoded
+    categorical columns, with a scaled target.
+
+    Parameters
+    ----------
+    categorical, continuous : list
+        Column names.
+    memory : str or None
+        Directory used to cache the fitted preprocessor, so that it
+        is fit once per fold rather than once per candidate.
+    encoding : str
+        Encoding of categorical columns, see `make_encoder`.
+
+    """
+
+    mlp = MLPRegressor(hidden_layer_sizes=(100, 100, 100),
+                       max_iter=2*10**4,
+                       random_state=RANDOM_STATE)
+
+    mlp_ohe, sparse_threshold = make_encoder(encoding)
+    mlp_scale = Pipeline(steps=[('scale', MinMaxScaler())])
+
+    mlp_pre = ColumnTransformer(
+        transformers=[
+            ('scale', mlp_scale, continuous),
+            ('cat', mlp_ohe, categorical),
+        ],
+        remainder='passthrough',
+        sparse_threshold=sparse_threshold
+    )
+
+    mlp_trans = TransformedTargetRegressor(regressor=mlp,
+                                           transformer=MinMaxScaler())
+
+    return Pipeline(steps=[('preprocessor', mlp_pre),
+                           ('transformer', mlp_trans)],
+                    memory=memory)
+
+
+def build_gbr(categorical, memory=None, encoding='onehot'):
+    """
+    Gradient boosting on one hot encoded categorical columns.
+
+    Parameters
+    ----------
+    categorical : list
+        Column names.
+    memory : str or None
+        Directory used to cache the fitted preprocessor.
+    encoding : str
+        Encoding of categorical columns, see `make_encoder`.
+
+    """
+
+    gbr = GradientBoostingRegressor(random_state=RANDOM_STATE)
+
+    gbr_ohe, sparse_threshold = make_encoder(encoding)
+
+    gbr_pre = ColumnTransformer(
+        transformers=[
+            ('cat', gbr_ohe, categorical)
+        ],
+        remainder='passthrough',
+        sparse_threshold=sparse_threshold
+    )
+
+    return Pipeline(steps=[('preprocessor', gbr_pre),
+                           ('regressor', gbr)],
+                    memory=memory)
+
+
+def grid_search(estimator, grid, n_jobs=-1, verbose=1):
+    """
+    Set up 5-fold cross validated grid search.
+    """
+
+    kf = KFold(n_splits=5, random_state=RANDOM_STATE, shuffle=True)
+
+    return GridSearchCV(estimator=estimator,
+                        param_grid=grid,
+                        cv=kf,
+                        n_jobs=n_jobs,
+                        scoring='neg_root_mean_squared_error',
+                        verbose=verbose)
+
+
+def halving_search(estimator, grid, halving, n_jobs=-1, verbose=1):
+    """
+    Set up 5-fold cross validated successive halving search.
+
+    Candidates are first evaluated on a small budget and only
+    the best `1 / factor` of them advance to the next round.
+
+    Parameters
+    ----------
+    halving : dict
+        Resource and budget arguments of `HalvingGridSearchCV`.
+
+    """
+
+    # Successive halving is still experimental in sklearn.
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV
+
+    kf = KFold(n_splits=5, random_state=RANDOM_STATE, shuffle=True)
+
+    return HalvingGridSearchCV(estimator=estimator,
+                               param_grid=grid,
+                               cv=kf,
+                               n_jobs=n_jobs,
+                               scoring='neg_root_mean_squared_error',
+                               random_state=RANDOM_STATE,
+                               verbose=verbose,
+                               **halving)
+
+
+def make_searches(categorical, continuous, memory=None, search='grid', encoding='onehot',
+                  n_jobs=-1, verbose=1):
+    """
+    Set up hyperparameter search for the perceptron and gradient boosting.
+
+    Parameters
+    ----------
+    search : str
+        Either 'grid' for exhaustive search over the notebook grids
+        or 'halving' for successive halving with early stopping.
+    encoding : str
+        Encoding of categorical columns, see `make_encoder`.
+
+    Returns
+    -------
+    dict :
+        Search object for every model name.
+
+    """
+
+    mlp = build_mlp(categorical, continuous, memory=memory, encoding=encoding)
+    gbr = build_gbr(categorical, memory=memory, encoding=encoding)
+
+    if search == 'grid':
+        return {'mlp': grid_search(mlp, MLP_GRID, n_jobs=n_jobs, verbose=verbose),
+                'gbr': grid_search(gbr, GBR_GRID, n_jobs=n_jobs, verbose=verbose)}
+    elif search == 'halving':
+        return {'mlp': halving_search(mlp, MLP_HALVING_GRID, MLP_HALVING,
+                                      n_jobs=n_jobs, verbose=verbose),
+                'gbr': halving_search(gbr, GBR_HALVING_GRID, GBR_HALVING,
+                                      n_jobs=n_jobs, verbose=verbose)}
+    else:
+        raise ValueError(f'{search} is not a valid search, expected one of {SEARCHES}.')
+
+
+def candidate_report(search):
+    """
+    Summarize fit time and score of every candidate.
+
+    Returns
+    -------
+    DataFrame :
+        One row per candidate sorted by rank.
+
+    """
+
+    results = pd.DataFrame(search.cv_results_)
+
+    # Successive halving also reports the round and budget.
+    cols = ['iter', 'n_resources', 'rank_test_score',
+            'mean_fit_time', 'std_fit_time', 'mean_score_time']
+    cols = [col for col in cols if col in results]
+
+    report = results[cols].copy()
+    report['rmse'] = -results['mean_test_score']
+    report['params'] = results['params'].astype(str)
+
+    if 'iter' in report:
+        report = report.sort_values(['iter', 'rank_test_score'], ascending=[False, True])
+    else:
+        report = report.sort_values('rank_test_score')
+
+    return report.reset_index(drop=True)
+
+
+def share(X, y, path):
+    """
+    Save training data to a column cache and read it back memory mapped.
+
+    joblib sends memory mapped arrays to the workers of a search by
+    file name, so they all read the same pages instead of unpickling
+    a copy of the training data for every fit.
+
+    Returns
+    -------
+    tuple :
+        `X` and `y` backed by the files in `path`.
+
+    """
+
+    cache = ColumnCache(path)
+    cache.write(X.assign(**{TARGET: y}))
+    data = cache.read()
+
+    return data.drop(columns=TARGET), data[TARGET]
+
+
+def get_scores(regressor, X_test, y_test):
+    """
+    Obtain RMSE, MAE and MSLE for test set.
+    """
+
+    y_pred = regressor.predict(X_test)
+
+    rmse = np.sqrt(mean_squared_error(y_pred=y_pred, y_true=y_test))
+    mae = mean_absolute_error(y_pred=y_pred, y_true=y_test)
+    # MSLE is undefined for negative predictions.
+    if (y_pred < 0).any():
+        msle = np.nan
+    else:
+        msle = mean_squared_log_error(y_pred=y_pred, y_true=y_test)
+
+    return (rmse, mae, msle)
+
+
+def train(data_path, out_path, n_jobs=-1, cache_dir=None, feature_cache=None,
+          search='grid', encoding='onehot', final=True, verbose=1):
+    """
+    Tune, evaluate and save the models from the `02_Model` notebook.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to `cleaned_data.csv`.
+    out_path : str
+        Directory the models and reports are saved to.
+    n_jobs : int
+        Number of workers for grid search, -1 uses all cores.
+    cache_dir : str or None
+        Directory for the preprocessing cache. A temporary
+        directory is used if not given.
+    feature_cache : str or None
+        Directory of the feature cache, see `load_data`.
+    search : str
+        Hyperparameter search strategy, see `make_searches`.
+    encoding : str
+        Encoding of categorical columns, see `make_encoder`.
+    final : bool
+        Refit the tuned models on all data before saving them,
+        otherwise the models fit on the training split are saved.
+
+    Returns
+    -------
+    DataFrame :
+        Test set scores of every model.
+
+    """
+
+    out_path = Path(out_path)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    X, y = load_data(data_path, feature_cache=feature_cache)
+    categorical, continuous = column_types(X)
+
+    split = train_test_split(X, y, train_size=.8, random_state=RANDOM_STATE)
+    X_train, X_test, y_train, y_test = split
+
+    with TemporaryDirectory() as tmp:
+        memory = cache_dir or tmp
+        X_train, y_train = share(X_train, y_train, Path(tmp) / 'train.cols')
+
+        dmr = build_dmr()
+        dmr.fit(X_train, y_train)
+
+        models = {'dmr': dmr}
+        searches = make_searches(categorical, continuous, memory=memory, search=search,
+                                 encoding=encoding, n_jobs=n_jobs, verbose=verbose)
+
+        for name, search in searches.items():
+            start = time.perf_counter()
+            search.fit(X_train, y_train)
+            duration = time.perf_counter() - start
+
+            report = candidate_report(search)
+            report.to_csv(out_path / f'{name}_candidates.csv', index=False)
+
+            print(f'{name}: searched {len(report)} candidates in {duration:.1f}s, '
+                  f'CV RMSE {abs(search.best_score_):,.0f}.')
+            print(report.head(10).to_string())
+
+            # The cache only helps the search, it is
+            # not needed once the candidates are fit.
+            models[name] = search.best_estimator_.set_params(memory=None)
+
+        vote = VotingRegressor(estimators=[('mlp', models['mlp']), ('gbr', models['gbr'])],
+                               n_jobs=n_jobs)
+        models['vote'] = vote.fit(X_train, y_train)
+
+        scores = pd.DataFrame([get_scores(models[name], X_test, y_test) for name in models],
+                              index=[name.upper() for name in models],
+                              columns=['RMSE', 'MAE', 'MSLE'])
+        print(scores)
+
+        if final:
+            start = time.perf_counter()
+            for name in ['gbr', 'mlp', 'vote']:
+                models[name].fit(X, y)
+            print(f'Full training took {time.perf_counter() - start:.1f} seconds.')
+
+        # Without the final refit the models fit on the training split are saved.
+        for name in ['gbr', 'mlp', 'vote']:
+            save_model(models[name], out_path / f'{name}.joblib')
+
+    return scores
+
+
+def compare_searches(data_path, n_jobs=-1, feature_cache=None, encoding='onehot', verbose=0):
+    """
+    Compare exhaustive grid search with successive halving.
+
+    Both strategies tune the models on the same training split and
+    their best models are scored on the same test split, so the
+    time saved can be judged against the RMSE obtained.
+
+    Returns
+    -------
+    DataFrame :
+        Search time and test RMSE per model and strategy.
+
+    """
+
+    X, y = load_data(data_path, feature_cache=feature_cache)
+    categorical, continuous = column_types(X)
+
+    split = train_test_split(X, y, train_size=.8, random_state=RANDOM_STATE)
+    X_train, X_test, y_train, y_test = split
+
+    rows = []
+
+    for search in SEARCHES:
+        with TemporaryDirectory() as memory:
+            X_shared, y_shared = share(X_train, y_train, Path(memory) / 'train.cols')
+            searches = make_searches(categorical, continuous, memory=memory, search=search,
+                                     encoding=encoding, n_jobs=n_jobs, verbose=verbose)
+            for name, model in searches.items():
+                start = time.perf_counter()
+                model.fit(X_shared, y_shared)
+                duration = time.perf_counter() - start
+                rmse = get_scores(model.best_estimator_, X_test, y_test)[0]
+                rows.append({'model': name,
+                             'search': search,
+                             'fits': len(model.cv_results_['params']) * model.n_splits_,
+                             'seconds': duration,
+                             'cv_rmse': abs(model.best_score_),
+                             'test_rmse': rmse})
+
+    results = pd.DataFrame(rows).set_index(['model', 'search']).sort_index()
+
+    for name in results.index.get_level_values('model').unique():
+        grid = results.loc[(name, 'grid')]
+        halving = results.loc[(name, 'halving')]
+        saved = grid['seconds'] - halving['seconds']
+        print(f'{name}: halving saved {saved:.1f}s ({saved / grid["seconds"]:.0%}), '
+              f'test RMSE {halving["test_rmse"]:,.0f} vs {grid["test_rmse"]:,.0f} with grid search.')
+
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Train the flat price models.')
+    parser.add_argument('--data', default='../flats-data/cleaned_data.csv')
+    parser.add_argument('--out', default='.')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--feature-cache', default=None, help='directory of cached features')
+    parser.add_argument('--search', choices=SEARCHES, default='grid')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='onehot',
+                        help='encoding of categorical columns')
+    parser.add_argument('--compare', action='store_true',
+                        help='compare grid search with successive halving and exit')
+    parser.add_argument('--no-final', action='store_true',
+                        help='save the models fit on the training split, without refitting on all data')
+    parser.add_argument('--verbose', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare_searches(args.data, n_jobs=args.n_jobs,
+                               feature_cache=args.feature_cache,
+                               encoding=args.encoding).to_string())
+    else:
+        train(args.data,
+              args.out,
+              n_jobs=args.n_jobs,
+              cache_dir=args.cache_dir,
+              feature_cache=args.feature_cache,
+              search=args.search,
+              encoding=args.encoding,
+              final=not args.no_final,
+              verbose=args.verbose)
@@ -0,0 +1,167 @@
+import argparse
+import resource
+import time
+
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+
+from helpers import make_directory
+from mock_server import listing_urls, serve_in_thread
+
+# Settings shared by all benchmark runs. Delays are
+# disabled since the mock server adds its own latency.
+BASE_SETTINGS = {
+    'BOT_NAME': 'gumtree',
+    'SPIDER_MODULES': ['gumtree.spiders'],
+    'NEWSPIDER_MODULE': 'gumtree.spiders',
+    'ROBOTSTXT_OBEY': True,
+    'DOWNLOAD_DELAY': 0,
+    'LOG_LEVEL': 'ERROR',
+    'TELNETCONSOLE_ENABLED': False,
+}
+
+
+def _crawl(spider_name, settings, kwargs, queue):
+    """
+    Run a single crawl and report stats.
+
+    Notes
+    -----
+    Runs in a child process because the twisted
+    reactor can not be restarted within a process.
+    """
+
+    from scrapy.crawler import CrawlerProcess
+    from gumtree.spiders.link_spider import LinkSpider
+    from gumtree.spiders.listing_spider import ListingSpider
+
+    spiders = {'links': LinkSpider, 'listings': ListingSpider}
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spiders[spider_name])
+    process.crawl(crawler, **kwargs)
+    process.start()
+
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    stats = crawler.stats.get_stats()
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    queue.put({'elapsed': elapsed,
+               'cpu': cpu,
+               'max_rss_mb': after.ru_maxrss / 1024,
+               'responses': stats.get('response_received_count', 0),
+               'items': stats.get('item_scraped_count', 0),
+               'retries': stats.get('retry/count', 0)})
+
+
+def run_crawl(spider_name, settings, kwargs):
+    """
+    Run a crawl in a fresh process and return its stats.
+    """
+
+    ctx = get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_crawl, args=(spider_name, settings, kwargs, queue))
+    process.start()
+    process.join()
+
+    if process.exitcode != 0:
+        raise RuntimeError(f'Crawl with {spider_name} failed with exit code {process.exitcode}.')
+
+    return queue.get()
+
+
+def benchmark(concurrency=(1, 4, 16, 64), n_pages=20, n_listings=500,
+              latency=0.05, error_rate=0.0):
+    """
+    Measure crawl throughput against the mock server.
+
+    Parameters
+    ----------
+    concurrency : iterable of int
+        Values of `CONCURRENT_REQUESTS` to test.
+    n_pages : int
+        Number of search result pages for the `LinkSpider`.
+    n_listings : int
+        Number of listings for the `ListingSpider`.
+    latency : float
+        Mean response latency of the mock server in seconds.
+    error_rate : float
+        Fraction of requests the mock server fails.
+
+    Returns
+    -------
+    list :
+        One dict with stats per spider and concurrency.
+
+    """
+
+    server, base_url = serve_in_thread(latency=latency, error_rate=error_rate)
+    urls = listing_urls(base_url, n_listings)
+
+    results = []
+
+    try:
+        for n in concurrency:
+            settings = dict(BASE_SETTINGS,
+                            CONCURRENT_REQUESTS=n,
+                            CONCURRENT_REQUESTS_PER_DOMAIN=n)
+
+            with TemporaryDirectory() as tmp:
+                path = make_directory(dirtype='urls', path=tmp)
+                links = run_crawl('links', settings,
+                                  {'n_pages': n_pages, 'path': path,
+                                   'save_page': False, 'base_url': base_url})
+
+                path = make_directory(dirtype='listings', path=tmp)
+                listing_settings = dict(settings,
+                                        FEEDS={f'{path}/data.csv': {'format': 'csv'}})
+                listings = run_crawl('listings', listing_settings,
+                                     {'urls': urls, 'path': path, 'save_page': False})
+
+            for spider_name, stats in [('links', links), ('listings', listings)]:
+                pages = max(stats['responses'], 1)
+                stats.update({'spider': spider_name,
+                              'concurrency': n,
+                              'pages_per_sec': pages / stats['elapsed'],
+                              'cpu_ms_per_page': stats['cpu'] / pages * 1000})
+                results.append(stats)
+    finally:
+        server.shutdown()
+
+    return results
+
+
+def print_results(results):
+
+    print(f'{"spider":<10}{"conc":>6}{"pages":>8}{"pages/s":>10}'
+          f'{"cpu ms/page":>13}{"rss MB":>9}{"retries":>9}')
+
+    for r in results:
+        print(f'{r["spider"]:<10}{r["concurrency"]:>6}{r["responses"]:>8}'
+              f'{r["pages_per_sec"]:>10.1f}{r["cpu_ms_per_page"]:>13.2f}'
+              f'{r["max_rss_mb"]:>9.1f}{r["retries"]:>9}')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark spiders against a mock gumtree server.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--listings', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    results = benchmark(concurrency=args.concurrency,
+                        n_pages=args.pages,
+                        n_listings=args.listings,
+                        latency=args.latency,
+                        error_rate=args.error_rate)
+
+    print_results(results)
@@ -9,11 +9,13 @@ class LinkSpider(scrapy.Spider):
 
     name = 'gumtree-links'
 
-    def __init__(self, n_pages, path, save_page, *args, **kwargs):
+    def __init__(self, n_pages, path, save_page,
+                 base_url='https://www.gumtree.pl', *args, **kwargs):
         super(LinkSpider, self).__init__(*args, **kwargs)
         self.n_pages = n_pages
         self.path = path
         self.save_page = save_page
+        self.base_url = base_url
 
     def start_requests(self):
 
@@ -22,7 +24,7 @@ class LinkSpider(scrapy.Spider):
         shuffle(page_nums)          
 
         for i in page_nums:
-            url = f'https://www.gumtree.pl/s-mieszkania-i-domy-sprzedam-i-kupie/krakow/page-{i}/v1c9073l3200208p{i}'
+            url = f'{self.base_url}/s-mieszkania-i-domy-sprzedam-i-kupie/krakow/page-{i}/v1c9073l3200208p{i}'
             urls.append(url)
 
         for url in urls:
@@ -47,6 +49,6 @@ class LinkSpider(scrapy.Spider):
         self.log(f'Saving links to {links_path}.')
         with open(links_path, 'w') as f:
             for link in listings:
-                full_link = 'https://www.gumtree.pl' + link        
+                full_link = self.base_url + link        
                 f.write(full_link)
                 f.write('\n')
\ No newline at end of file
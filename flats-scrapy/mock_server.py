@@ -0,0 +1,281 @@
+import argparse
+import random
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+# Paths mirror the ones used on gumtree.pl so that the spiders
+# can be pointed at this server by only changing the base url.
+SEARCH_PATH = '/s-mieszkania-i-domy-sprzedam-i-kupie/krakow/page-{page}/v1c9073l3200208p{page}'
+LISTING_PATH = '/a-mieszkania-i-domy-sprzedam-i-kupie/krakow/{slug}/{listing_id}'
+
+FIRST_LISTING_ID = 1000000000
+
+DISTRICTS = ['Stare Miasto', 'Grzegórzki', 'Prądnik Czerwony',
+             'Prądnik Biały', 'Krowodrza', 'Bronowice', 'Zwierzyniec',
+             'Dębniki', 'Łagiewniki', 'Swoszowice', 'Podgórze Duchackie',
+             'Bieżanów', 'Podgórze', 'Czyżyny', 'Mistrzejowice',
+             'Bieńczyce', 'Wzgórza Krzesławickie', 'Nowa Huta']
+
+STREETS = ['Długa', 'Karmelicka', 'Wielicka', 'Zakopiańska', 'Kapelanka',
+           'Armii Krajowej', 'Opolska', 'Dobrego Pasterza', 'os. Piastów',
+           'os. Na Stoku', 'Ruczaj', 'Kamieńskiego', 'Lipska', 'Mogilska']
+
+SELLERS = ['Agencja', 'Właściciel']
+PROPERTIES = ['Mieszkanie', 'Dom']
+PARKING = ['Garaż', 'Kryty', 'Ulica', 'Brak']
+ROOMS = ['Kawalerka lub garsoniera', '2 pokoje', '3 pokoje', '4 pokoje', '5 pokoi']
+BATHROOMS = ['1 łazienka', '2 łazienki', '3 łazienki']
+
+WORDS = ['mieszkanie', 'balkon', 'ogrod', 'taras', 'piwnica', 'nowe',
+         'w bloku', 'w kamienicy', 'apartament', 'kawalerka',
+         'komunikacji miejskiej', 'garaż podziemny', 'parking', 'widok',
+         'słoneczne', 'po remoncie', 'blisko centrum', 'cicha okolica']
+
+ROBOTS = 'User-agent: *\nAllow: /\n'
+
+
+def search_url(base_url, page):
+    """
+    Build the url of a page with search results.
+
+    Examples
+    --------
+    >>> search_url('http://127.0.0.1:8000', 3)
+    'http://127.0.0.1:8000/s-mieszkania-i-domy-sprzedam-i-kupie/krakow/page-3/v1c9073l3200208p3'
+    """
+
+    return base_url + SEARCH_PATH.format(page=page)
+
+
+def listing_id(page, slot, listings_per_page):
+    """
+    Map a slot on a page of search results to a listing id.
+
+    Examples
+    --------
+    >>> listing_id(1, 0, 20)
+    1000000000
+    >>> listing_id(2, 5, 20)
+    1000000025
+    """
+
+    return FIRST_LISTING_ID + (page - 1) * listings_per_page + slot
+
+
+def listing_path(lid):
+    """
+    Build the path of a listing from its id.
+
+    Examples
+    --------
+    >>> listing_path(1000000000)
+    '/a-mieszkania-i-domy-sprzedam-i-kupie/krakow/mieszkanie-1000000000/1000000000'
+    """
+
+    return LISTING_PATH.format(slug=f'mieszkanie-{lid}',
+                               listing_id=lid)
+
+
+def listing_urls(base_url, n_listings):
+    """
+    Get urls of the first `n_listings` synthetic listings.
+    """
+
+    ids = range(FIRST_LISTING_ID, FIRST_LISTING_ID + n_listings)
+    return [base_url + listing_path(lid) for lid in ids]
+
+
+def render_search_page(page, listings_per_page):
+    """
+    Render a page of search results.
+
+    Notes
+    -----
+    Links are stored the same way as on the
+    real website i.e. `div.title > a[href]`.
+    """
+
+    rows = []
+    for slot in range(listings_per_page):
+        lid = listing_id(page, slot, listings_per_page)
+        rows.append(f'<li><div class="title">'
+                    f'<a href="{listing_path(lid)}">Mieszkanie {lid}</a>'
+                    f'</div></li>')
+
+    rows = '\n'.join(rows)
+
+    return f'<html><body><ul class="result-list">\n{rows}\n</ul></body></html>'
+
+
+def render_listing_page(lid, description_words=60):
+    """
+    Render a listing with the layout the `ListingSpider` expects.
+
+    Notes
+    -----
+    The content is seeded with the listing id so that
+    a given url always returns the same listing.
+    """
+
+    rng = random.Random(lid)
+
+    district = DISTRICTS[lid % len(DISTRICTS)]
+    area = rng.randint(18, 150)
+    price = area * rng.randint(7000, 16000)
+    price = f'{price:,}'.replace(',', '\xa0') + ' zł'
+    description = ' '.join(rng.choice(WORDS) for _ in range(description_words))
+    date = f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2020'
+
+    attributes = [('Lokalizacja', f'{rng.choice(STREETS)}, Kraków-{district}, Kraków'),
+                  ('Data dodania', date),
+                  ('Na sprzedaż przez', rng.choice(SELLERS)),
+                  ('Rodzaj nieruchomości', rng.choice(PROPERTIES)),
+                  ('Liczba pokoi', rng.choice(ROOMS)),
+                  ('Liczba łazienek', rng.choice(BATHROOMS)),
+                  ('Wielkość (m2)', str(area)),
+                  ('Parking', rng.choice(PARKING))]
+
+    attributes = '\n'.join(f'<div class="attribute">'
+                           f'<span class="name">{name}</span>'
+                           f'<span class="value">{value}</span>'
+                           f'</div>' for name, value in attributes)
+
+    return (f'<html><body>\n'
+            f'<span class="myAdTitle">Mieszkanie {lid} {district}</span>\n'
+            f'<span class="amount">{price}</span>\n'
+            f'<span class="address">{district}, Kraków</span>\n'
+            f'{attributes}\n'
+            f'<span class="pre">{description}</span>\n'
+            f'</body></html>')
+
+
+class GumtreeHandler(BaseHTTPRequestHandler):
+    """
+    Serve synthetic search results and listings.
+
+    Notes
+    -----
+    Latency and error rate are read from the server
+    so that all handler threads share one configuration.
+    """
+
+    def do_GET(self):
+
+        server = self.server
+
+        if server.latency > 0:
+            time.sleep(server.latency * random.uniform(0.5, 1.5))
+
+        path = self.path.split('?')[0]
+        parts = path.strip('/').split('/')
+
+        if path == '/robots.txt':
+            self.respond(200, ROBOTS, 'text/plain')
+        elif random.random() < server.error_rate:
+            self.respond(503, 'Service Unavailable', 'text/plain')
+        elif parts[0] == 's-mieszkania-i-domy-sprzedam-i-kupie' and len(parts) == 4:
+            page = int(parts[2].replace('page-', ''))
+            body = render_search_page(page, server.listings_per_page)
+            self.respond(200, body)
+        elif parts[0] == 'a-mieszkania-i-domy-sprzedam-i-kupie' and len(parts) == 4:
+            body = render_listing_page(int(parts[3]), server.description_words)
+            self.respond(200, body)
+        else:
+            self.respond(404, 'Not Found', 'text/plain')
+
+    def respond(self, status, body, content_type='text/html'):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean.
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # Allow bursts of concurrent requests to queue up.
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                listings_per_page=20, description_words=60):
+    """
+    Create a mock gumtree server.
+
+    Parameters
+    ----------
+    host : str
+        Interface to bind to.
+    port : int
+        Port to bind to, 0 picks a free port.
+    latency : float
+        Mean delay in seconds added to every response.
+    error_rate : float
+        Fraction of requests answered with HTTP 503.
+    listings_per_page : int
+        Number of links on a page of search results.
+    description_words : int
+        Length of listing descriptions.
+
+    Returns
+    -------
+    MockServer :
+        Server that is not yet serving.
+
+    """
+
+    server = MockServer((host, port), GumtreeHandler)
+    server.latency = latency
+    server.error_rate = error_rate
+    server.listings_per_page = listings_per_page
+    server.description_words = description_words
+
+    return server
+
+
+def serve_in_thread(**kwargs):
+    """
+    Start a mock gumtree server in a background thread.
+
+    Returns
+    -------
+    tuple :
+        The server and its base url.
+
+    """
+
+    server = make_server(**kwargs)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address[:2]
+
+    return server, f'http://{host}:{port}'
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for gumtree.pl.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--listings-per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    server = make_server(host=args.host,
+                         port=args.port,
+                         latency=args.latency,
+                         error_rate=args.error_rate,
+                         listings_per_page=args.listings_per_page)
+
+    print(f'Serving on http://{args.host}:{args.port}')
+    server.serve_forever()
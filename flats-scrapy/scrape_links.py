@@ -1,21 +1,28 @@
-import scrapy
-from scrapy.crawler import CrawlerProcess
-
 from config import DATA_PATH, SAVE_PAGE
-from gumtree.spiders.link_spider import LinkSpider
 from helpers import make_directory
 
-path = DATA_PATH
 
-path = make_directory(dirtype='urls', path=path)
+def main(n_pages=50, path=DATA_PATH):
+    """
+    Crawl search pages and save links to listings.
+    """
+
+    from scrapy.crawler import CrawlerProcess
+    from gumtree.spiders.link_spider import LinkSpider
+
+    path = make_directory(dirtype='urls', path=path)
+
+    process = CrawlerProcess({
+        'BOT_NAME': 'gumtree',
+        'SPIDER_MODULES': ['gumtree.spiders'],
+        'NEWSPIDER_MODULE': 'gumtree.spiders',
+        'ROBOTSTXT_OBEY': True,
+        'DOWNLOAD_DELAY': 5
+    })
+
+    process.crawl(LinkSpider, n_pages=n_pages, path=path, save_page=SAVE_PAGE)
+    process.start()
 
-process = CrawlerProcess({
-    'BOT_NAME': 'gumtree',
-    'SPIDER_MODULES': ['gumtree.spiders'],
-    'NEWSPIDER_MODULE': 'gumtree.spiders',
-    'ROBOTSTXT_OBEY': True,
-    'DOWNLOAD_DELAY': 5
-})
 
-process.crawl(LinkSpider, n_pages=50, path=path, save_page=SAVE_PAGE)
-process.start() 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+"""
+Command line interface for the whole pipeline.
+
+Every stage lives in its own directory and is imported only by the
+subcommand that runs it, so heavy dependencies such as scrapy,
+pandas and scikit-learn are loaded only when needed. Stages run
+from their directory, like their scripts do.
+
+Examples
+--------
+    python flats.py crawl links --pages 50
+    python flats.py crawl listings
+    python flats.py etl
+    python flats.py history --as-of 2020-09-13
+    python flats.py wrangle --impute grouped
+    python flats.py train --search halving
+    python flats.py score --in flats-data/cleaned_data.csv
+    python flats.py score --models flats-model/gbr.joblib flats-model/mlp.joblib
+    python flats.py run --crawl
+    python flats.py bench
+    python flats.py bench dedup --sizes 10000 100000
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+DATA = ROOT / 'flats-data'
+
+STAGES = {'crawl': ROOT / 'flats-scrapy',
+          'etl': ROOT / 'flats-etl',
+          'history': ROOT / 'flats-etl',
+          'wrangle': ROOT / 'flats-etl',
+          'train': ROOT / 'flats-model',
+          'score': ROOT / 'flats-model'}
+
+# Stage directories whose modules another stage imports. The model
+# reads cleaned data through the column cache kept by the ETL.
+SHARED = {ROOT / 'flats-model': [ROOT / 'flats-etl']}
+
+# Benchmarks of the stages, run with `flats bench <name>`.
+BENCHMARKS = {'crawl': ('flats-scrapy', 'bench_crawl.py'),
+              'impute': ('flats-etl', 'bench_impute.py'),
+              'ngrams': ('flats-etl', 'bench_ngrams.py'),
+              'dedup': ('flats-etl', 'bench_dedup.py'),
+              'store': ('flats-etl', 'bench_store.py'),
+              'trim': ('flats-etl', 'bench_trim.py'),
+              'translit': ('flats-etl', 'bench_translit.py'),
+              'ingest': ('flats-etl', 'bench_ingest.py'),
+              'colcache': ('flats-etl', 'bench_colcache.py'),
+              'rules': ('flats-etl', 'bench_rules.py'),
+              'validate': ('flats-etl', 'bench_validate.py'),
+              'gazetteer': ('flats-etl', 'bench_gazetteer.py'),
+              'startup': ('flats-model', 'bench_startup.py'),
+              'compiled': ('flats-model', 'bench_compiled.py'),
+              'ensemble': ('flats-model', 'bench_ensemble.py'),
+              'encoding': ('flats-model', 'bench_encoding.py')}
+
+# Module every subcommand imports before it starts working.
+MODULES = {'crawl': 'scrapy.crawler',
+           'etl': 'etl',
+           'history': 'history',
+           'wrangle': 'wrangle',
+           'train': 'train',
+           'score': 'predict'}
+
+# Choices of stage options, the same as `impute.METHODS`, `train.SEARCHES`
+# and `train.ENCODINGS`, which can not be imported without pandas.
+METHODS = ['grouped', 'tree', 'knn']
+SEARCHES = ['grid', 'halving']
+ENCODINGS = ['onehot', 'sparse', 'hashing']
+
+# Modules reported by the cold start benchmark when a subcommand loads them.
+HEAVY_MODULES = ['scrapy', 'twisted', 'pandas', 'numpy', 'sklearn', 'scipy', 'unidecode']
+
+
+def stage_paths(path):
+    """
+    Directories a stage imports modules from, see `SHARED`.
+    """
+
+    return [str(p) for p in [path] + SHARED.get(Path(path), [])]
+
+
+@contextmanager
+def stage(path):
+    """
+    Run code from a stage directory, with its modules importable.
+    """
+
+    cwd = os.getcwd()
+    paths = stage_paths(path)
+    sys.path[:0] = paths
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        for p in paths:
+            sys.path.remove(p)
+
+
+def absolute(path):
+    if isinstance(path, list):
+        return [absolute(p) for p in path]
+    return None if path is None else str(Path(path).resolve())
+
+
+def run_setup(args):
+    import setup
+
+    setup.main(ROOT)
+
+
+def run_crawl(args):
+    with stage(STAGES['crawl']):
+        if args.target == 'links':
+            import scrape_links
+            scrape_links.main(n_pages=args.pages, path=args.data + '/')
+        else:
+            import scrape_listings
+            scrape_listings.main(path=args.data + '/')
+
+
+def run_etl(args):
+    with stage(STAGES['etl']):
+        import create_raw_data
+        create_raw_data.main(path_listings=args.listings,
+                             path_cleaned=args.out_dir + '/',
+                             path_db=args.db,
+                             before=args.before)
+
+
+def run_history(args):
+    with stage(STAGES['history']):
+        import history
+
+        store = history.HistoryStore(args.db)
+        if args.as_of:
+            df = store.as_of(args.as_of)
+            df.to_csv(args.out_path, index=False)
+            print(f'Saved {len(df)} listings present at {args.as_of} to {args.out_path}.')
+        else:
+            store.ingest_all(args.listings)
+        store.close()
+
+
+def run_wrangle(args):
+    with stage(STAGES['wrangle']):
+        import wrangle
+        wrangle.run(args.in_path, args.out_path,
+                    method=args.impute,
+                    near_duplicates=not args.keep_near_duplicates,
+                    sketch=args.sketch)
+
+
+def run_train(args):
+    with stage(STAGES['train']):
+        import train
+
+        if args.compare:
+            print(train.compare_searches(args.data, n_jobs=args.n_jobs,
+                                         feature_cache=args.feature_cache,
+                                         encoding=args.encoding).to_string())
+            return
+
+        train.train(args.data, args.out,
+                    n_jobs=args.n_jobs,
+                    cache_dir=args.cache_dir,
+                    feature_cache=args.feature_cache,
+                    search=args.search,
+                    encoding=args.encoding,
+                    final=not args.no_final)
+
+
+def run_score(args):
+    if args.models:
+        with stage(STAGES['score']):
+            import ensemble
+
+            with ensemble.EnsembleScorer.load(args.models, n_jobs=args.n_jobs) as scorer:
+                ensemble.score_file(scorer, args.in_path, args.out_path,
+                                    batch_size=args.batch_size, check=args.check)
+        return
+
+    with stage(STAGES['score']):
+        import predict
+
+        predictor = predict.PricePredictor(args.model)
+        print(f'Loaded {args.model} in {predictor.load_time:.3f}s.')
+
+        if args.serve:
+            predict.serve(predictor, host=args.host, port=args.port,
+                          max_batch=args.max_batch, max_wait=args.max_wait)
+        else:
+            predict.score_file(predictor, args.in_path, args.out_path,
+                               batch_size=args.batch_size,
+                               feature_cache=args.feature_cache)
+
+
+def run_pipeline(args):
+    import pipeline
+
+    stages = pipeline.make_stages(data=args.data, model=args.model)
+    unknown = set(args.targets) - set(stages)
+    if unknown:
+        sys.exit(f'Unknown stages: {", ".join(sorted(unknown))}.')
+
+    runner = pipeline.Pipeline(stages, state_path=Path(args.data) / 'pipeline.json',
+                               logs=Path(args.data) / 'logs')
+    report = runner.run(args.targets, crawl=args.crawl, force=args.force,
+                        jobs=args.jobs, dry_run=args.dry_run)
+
+    if any(status == 'failed' for status, _ in report.values()):
+        sys.exit(1)
+
+
+def cold_start(argv, repeat):
+    """
+    Time a command in fresh interpreters and find the heavy modules it imports.
+
+    Returns
+    -------
+    tuple :
+        Median seconds and names of heavy modules imported.
+
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + argv, capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+
+    out = subprocess.run([sys.executable, '-X', 'importtime'] + argv,
+                         capture_output=True, text=True, check=True)
+    imported = {line.split('|')[-1].strip() for line in out.stderr.splitlines()}
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+
+    return statistics.median(times), heavy
+
+
+def run_bench(args):
+    if args.target == 'cli':
+        # The cli on its own, then the imports every subcommand
+        # pays for once it starts running.
+        commands = [('python', ['-c', 'pass'])]
+        commands += [(f'flats {name} --help', [__file__, name, '--help']) for name in COMMANDS]
+        commands += [(f'flats {name} imports',
+                      ['-c', f'import sys; sys.path[:0] = {stage_paths(STAGES[name])!r}; '
+                             f'import {module}'])
+                     for name, module in MODULES.items()]
+
+        print(f'{"command":<24}{"cold start ms":>14}  heavy imports')
+        for name, argv in commands:
+            seconds, heavy = cold_start(argv, args.repeat)
+            print(f'{name:<24}{seconds * 1000:>14.0f}  {", ".join(heavy) or "-"}')
+        return
+
+    directory, script = BENCHMARKS[args.target]
+    path = ROOT / directory
+
+    with stage(path):
+        import runpy
+
+        sys.argv = [script] + args.args
+        runpy.run_path(str(path / script), run_name='__main__')
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='flats', description='Flat prices in Kraków pipeline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('setup', help='create data directories')
+    p.set_defaults(run=run_setup)
+
+    p = commands.add_parser('crawl', help='scrape links or listings')
+    p.add_argument('target', choices=['links', 'listings'])
+    p.add_argument('--pages', type=int, default=50, help='search pages to crawl for links')
+    p.add_argument('--data', default=str(DATA))
+    p.set_defaults(run=run_crawl)
+
+    p = commands.add_parser('etl', help='parse scraped listings into raw_data.csv')
+    p.add_argument('--listings', default=str(DATA / 'listings'))
+    p.add_argument('--out-dir', default=str(DATA))
+    p.add_argument('--db', default=str(DATA / 'listings.sqlite'))
+    p.add_argument('--before', type=int, default=None,
+                   help='only scrapes started before this unix timestamp in ms')
+    p.set_defaults(run=run_etl)
+
+    p = commands.add_parser('history', help='track listings across scrapes, see history.py')
+    p.add_argument('--listings', default=str(DATA / 'listings'))
+    p.add_argument('--db', default=str(DATA / 'history.sqlite'))
+    p.add_argument('--as-of', default=None,
+                   help='export listings present at this time instead of ingesting')
+    p.add_argument('--out', dest='out_path', default=str(DATA / 'raw_data.csv'))
+    p.set_defaults(run=run_history)
+
+    p = commands.add_parser('wrangle', help='clean raw data for modelling')
+    p.add_argument('--in', dest='in_path', default=str(DATA / 'raw_data.csv'))
+    p.add_argument('--out', dest='out_path', default=str(DATA / 'cleaned_data.csv'))
+    p.add_argument('--impute', choices=METHODS, default='grouped')
+    p.add_argument('--keep-near-duplicates', action='store_true')
+    p.add_argument('--sketch', action='store_true', help='trim outliers with quantile sketches')
+    p.set_defaults(run=run_wrangle)
+
+    p = commands.add_parser('train', help='tune, evaluate and save models')
+    p.add_argument('--data', default=str(DATA / 'cleaned_data.csv'))
+    p.add_argument('--out', default=str(ROOT / 'flats-model'))
+    p.add_argument('--n-jobs', type=int, default=-1)
+    p.add_argument('--cache-dir', default=None, help='directory caching fitted preprocessing')
+    p.add_argument('--feature-cache', default=None)
+    p.add_argument('--search', choices=SEARCHES, default='grid')
+    p.add_argument('--encoding', choices=ENCODINGS, default='onehot',
+                   help='encoding of categorical columns')
+    p.add_argument('--no-final', action='store_true',
+                   help='save the models fit on the training split, without refitting on all data')
+    p.add_argument('--compare', action='store_true',
+                   help='compare grid search with successive halving and exit')
+    p.set_defaults(run=run_train)
+
+    p = commands.add_parser('score', help='predict prices with a saved model')
+    p.add_argument('--model', default=str(ROOT / 'flats-model' / 'gbr.joblib'))
+    p.add_argument('--in', dest='in_path', default=str(DATA / 'cleaned_data.csv'))
+    p.add_argument('--out', dest='out_path', default=str(DATA / 'predictions.csv'))
+    p.add_argument('--batch-size', type=int, default=10000)
+    p.add_argument('--feature-cache', default=None)
+    p.add_argument('--serve', action='store_true', help='serve predictions over http')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8080)
+    p.add_argument('--max-batch', type=int, default=512, help='most records scored at once')
+    p.add_argument('--max-wait', type=float, default=0.005,
+                   help='seconds a request waits for others to batch with')
+    p.add_argument('--models', nargs='+', default=None,
+                   help='score with several models at once on shared preprocessing')
+    p.add_argument('--n-jobs', type=int, default=1, help='threads the models are scored on')
+    p.add_argument('--check', action='store_true',
+                   help='compare shared predictions with every model on its own')
+    p.set_defaults(run=run_score)
+
+    p = commands.add_parser('run', help='run stages that are not cached, see pipeline.py')
+    p.add_argument('targets', nargs='*', metavar='stage',
+                   help='links, listings, etl, wrangle or train, brought up to date '
+                        'with the stages they depend on, all by default')
+    p.add_argument('--crawl', action='store_true', help='also crawl links and listings')
+    p.add_argument('--force', action='store_true', help='run stages even if cached')
+    p.add_argument('--jobs', type=int, default=None, help='stages run at once')
+    p.add_argument('--dry-run', action='store_true')
+    p.add_argument('--data', default=str(DATA))
+    p.add_argument('--model', default=str(ROOT / 'flats-model'))
+    p.set_defaults(run=run_pipeline)
+
+    p = commands.add_parser('bench', help='measure cold start of subcommands or run a benchmark')
+    p.add_argument('target', nargs='?', default='cli', choices=['cli'] + list(BENCHMARKS))
+    p.add_argument('--repeat', type=int, default=5, help='fresh interpreters per subcommand')
+    p.add_argument('args', nargs=argparse.REMAINDER, help='arguments of the benchmark')
+    p.set_defaults(run=run_bench)
+
+    return parser, list(commands.choices)
+
+
+PATHS = ['data', 'listings', 'out_dir', 'db', 'in_path', 'out_path', 'out', 'model', 'models',
+         'feature_cache', 'cache_dir']
+
+
+def main(argv=None):
+    parser, _ = make_parser()
+    args = parser.parse_args(argv)
+
+    # Stages run from their own directory.
+    for name in PATHS:
+        if hasattr(args, name):
+            setattr(args, name, absolute(getattr(args, name)))
+
+    args.run(args)
+
+
+COMMANDS = [name for name in make_parser()[1] if name != 'bench'] + ['bench']
+
+
+if __name__ == '__main__':
+    main()
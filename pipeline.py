@@ -0,0 +1,365 @@
+"""
+Run the stages of the pipeline as a DAG, skipping cached ones.
+
+Every stage runs `flats.py` in its own process. Before a stage
+runs it is fingerprinted with the content of its inputs, its code
+and its arguments. If the fingerprint matches the one of its last
+successful run and its outputs exist, the stage is skipped. Stages
+whose dependencies are done run concurrently, so ETL on finished
+scrapes runs while today's crawl continues.
+
+Examples
+--------
+    python flats.py run
+    python flats.py run --crawl
+    python flats.py run wrangle --force
+
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+DATA = ROOT / 'flats-data'
+
+# Crawling is never cached, the listings on the web change.
+CRAWL = ['links', 'listings']
+
+
+class Stage:
+    """
+    Step of the pipeline.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+    argv : list
+        Arguments of `flats.py`.
+    extra : list
+        Arguments left out of the fingerprint.
+    deps : list
+        Stages that must finish first.
+    inputs : callable
+        Returns the files the stage reads.
+    code : list
+        Globs of source files, relative to the root of the repo.
+    outputs : list
+        Files the stage writes.
+    volatile : bool
+        Always run the stage.
+
+    """
+
+    def __init__(self, name, argv, extra=(), deps=(), inputs=list, code=(), outputs=(),
+                 volatile=False):
+        self.name = name
+        self.argv = [str(x) for x in argv]
+        self.extra = [str(x) for x in extra]
+        self.deps = list(deps)
+        self.inputs = inputs
+        self.code = list(code)
+        self.outputs = [Path(x) for x in outputs]
+        self.volatile = volatile
+
+    def code_files(self):
+        files = {ROOT / 'flats.py'}
+        for pattern in self.code:
+            files.update(ROOT.glob(pattern))
+
+        return sorted(files)
+
+
+def unix_ts():
+    """
+    Timestamp in ms, the way `flats-scrapy/helpers.py` names scrape folders.
+    """
+
+    return int((datetime.now() - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def finished_scrapes(path_listings, started):
+    """
+    Files of scrapes that started before the pipeline did.
+    """
+
+    return sorted(path for path in Path(path_listings).glob('*/*.csv')
+                  if path.parent.name.isdigit() and int(path.parent.name) < started)
+
+
+def make_stages(data=DATA, model=ROOT / 'flats-model', started=None):
+    """
+    Stages from scraping links to trained models.
+
+    Parameters
+    ----------
+    data : Path
+        Folder with scraped and processed data.
+    model : Path
+        Folder the models are saved to.
+    started : int or None
+        Time the pipeline started, see `unix_ts`. Scrapes
+        started later are left out of ETL.
+
+    Returns
+    -------
+    dict :
+        Stages by name.
+
+    """
+
+    started = started or unix_ts()
+    data, model = Path(data), Path(model)
+
+    stages = [
+        Stage('links', ['crawl', 'links', '--data', data],
+              code=['flats-scrapy/scrape_links.py', 'flats-scrapy/gumtree/**/*.py'],
+              volatile=True),
+        Stage('listings', ['crawl', 'listings', '--data', data], deps=['links'],
+              code=['flats-scrapy/scrape_listings.py', 'flats-scrapy/gumtree/**/*.py'],
+              volatile=True),
+        # ETL does not wait for the crawl, it
+        # only reads scrapes that are finished.
+        Stage('etl', ['etl', '--listings', data / 'listings', '--out-dir', data,
+                      '--db', data / 'listings.sqlite'],
+              # Finished scrapes are in the fingerprint through the inputs.
+              extra=['--before', started],
+              inputs=lambda: finished_scrapes(data / 'listings', started),
+              code=['flats-etl/create_raw_data.py', 'flats-etl/etl.py',
+                    'flats-etl/ingest.py', 'flats-etl/translit.py', 'flats-etl/rules.py',
+                    'flats-etl/store.py', 'flats-etl/sketch.py',
+                    'flats-etl/colcache.py', 'flats-etl/validate.py',
+                    'flats-etl/gazetteer.py', 'flats-etl/gazetteer.csv'],
+              outputs=[data / 'raw_data.csv', data / 'listings.sqlite']),
+        Stage('wrangle', ['wrangle', '--in', data / 'raw_data.csv',
+                          '--out', data / 'cleaned_data.csv'], deps=['etl'],
+              inputs=lambda: [data / 'raw_data.csv'],
+              code=['flats-etl/wrangle.py', 'flats-etl/impute.py',
+                    'flats-etl/dedup.py', 'flats-etl/sketch.py',
+                    'flats-etl/colcache.py'],
+              outputs=[data / 'cleaned_data.csv']),
+        Stage('train', ['train', '--data', data / 'cleaned_data.csv', '--out', model],
+              deps=['wrangle'],
+              inputs=lambda: [data / 'cleaned_data.csv'],
+              code=['flats-model/train.py', 'flats-model/features.py',
+                    'flats-model/artifact.py', 'flats-model/encoders.py',
+                    'flats-etl/colcache.py'],
+              outputs=[model / 'gbr.joblib', model / 'mlp.joblib', model / 'vote.joblib']),
+    ]
+
+    return {stage.name: stage for stage in stages}
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order and caches their fingerprints.
+
+    Fingerprints of stages and hashes of the files they read are kept
+    in a json state file. A file is only hashed again when its size
+    or modification time changed.
+
+    Parameters
+    ----------
+    stages : dict
+        Stages by name, see `make_stages`.
+    state_path : str
+        Path to the state file.
+    logs : str
+        Folder for the output of every stage.
+
+    """
+
+    def __init__(self, stages, state_path=DATA / 'pipeline.json', logs=DATA / 'logs'):
+        self.stages = stages
+        self.state_path = Path(state_path)
+        self.logs = Path(logs)
+        self.lock = threading.Lock()
+
+        if self.state_path.exists():
+            self.state = json.loads(self.state_path.read_text())
+        else:
+            self.state = {'stages': {}, 'files': {}}
+
+    def save(self):
+        tmp = self.state_path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(self.state, indent=2))
+        tmp.replace(self.state_path)
+
+    def file_hash(self, path):
+        stat = path.stat()
+        key = str(path)
+        cached = self.state['files'].get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+            return cached['sha1']
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+
+        with self.lock:
+            self.state['files'][key] = {'size': stat.st_size,
+                                        'mtime': stat.st_mtime_ns,
+                                        'sha1': sha1.hexdigest()}
+
+        return sha1.hexdigest()
+
+    def fingerprint(self, stage):
+        """
+        Hash of the arguments, code and inputs of a stage.
+        """
+
+        sha1 = hashlib.sha1(json.dumps(stage.argv).encode())
+        for path in stage.code_files() + list(stage.inputs()):
+            path = Path(path)
+            sha1.update(str(path.relative_to(ROOT) if ROOT in path.parents else path).encode())
+            sha1.update(self.file_hash(path).encode() if path.exists() else b'missing')
+
+        return sha1.hexdigest()
+
+    def cached(self, stage, fingerprint):
+        previous = self.state['stages'].get(stage.name, {})
+        return (not stage.volatile
+                and previous.get('fingerprint') == fingerprint
+                and all(path.exists() for path in stage.outputs))
+
+    def plan(self, targets=None, crawl=False):
+        """
+        Names of the stages needed for `targets`, all if None.
+        """
+
+        if targets:
+            names, todo = set(), list(targets)
+            while todo:
+                name = todo.pop()
+                if name not in names:
+                    names.add(name)
+                    todo.extend(self.stages[name].deps)
+        else:
+            names = set(self.stages)
+
+        if not crawl:
+            names -= set(CRAWL)
+
+        return [name for name in self.stages if name in names]
+
+    def run_stage(self, stage, force=False):
+        """
+        Run a stage unless it is cached.
+
+        Returns
+        -------
+        tuple :
+            Status and seconds it took.
+
+        """
+
+        start = time.perf_counter()
+        fingerprint = self.fingerprint(stage)
+
+        if not force and self.cached(stage, fingerprint):
+            return 'cached', time.perf_counter() - start
+
+        self.logs.mkdir(parents=True, exist_ok=True)
+        log = self.logs / f'{stage.name}.log'
+
+        with open(log, 'w') as f:
+            result = subprocess.run([sys.executable, str(ROOT / 'flats.py')] + stage.argv + stage.extra,
+                                    stdout=f, stderr=subprocess.STDOUT)
+        duration = time.perf_counter() - start
+
+        if result.returncode != 0:
+            print(f'{stage.name} failed, see {log}.')
+            return 'failed', duration
+
+        # Outputs of the stage are inputs of others, hash them once now.
+        for path in stage.outputs:
+            if path.exists():
+                self.file_hash(path)
+
+        with self.lock:
+            self.state['stages'][stage.name] = {'fingerprint': fingerprint,
+                                                'seconds': round(duration, 3),
+                                                'finished': datetime.now().isoformat(timespec='seconds')}
+            self.save()
+
+        return 'ran', duration
+
+    def run(self, targets=None, crawl=False, force=False, jobs=None, dry_run=False):
+        """
+        Run the stages needed for `targets`, independent ones concurrently.
+
+        Parameters
+        ----------
+        targets : list or None
+            Names of stages to bring up to date, all if None.
+        crawl : bool
+            Also crawl links and listings.
+        force : bool
+            Run stages even if they are cached.
+        jobs : int or None
+            Number of stages run at once.
+        dry_run : bool
+            Only print which stages would run.
+
+        Returns
+        -------
+        dict :
+            Status and seconds of every stage.
+
+        """
+
+        names = self.plan(targets, crawl=crawl)
+
+        if dry_run:
+            for name in names:
+                stage = self.stages[name]
+                status = 'cached' if not force and self.cached(stage, self.fingerprint(stage)) else 'run'
+                print(f'{name:<10}{status}')
+            return {}
+
+        report = {}
+        pending = {name: [d for d in self.stages[name].deps if d in names] for name in names}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=jobs or len(names) or 1) as pool:
+            running = {}
+            while pending or running:
+                for name, deps in list(pending.items()):
+                    if any(report.get(d, ('',))[0] in ('failed', 'skipped') for d in deps):
+                        report[name] = ('skipped', 0.0)
+                        del pending[name]
+                    elif all(d in report for d in deps):
+                        print(f'Starting {name}.')
+                        running[pool.submit(self.run_stage, self.stages[name], force)] = name
+                        del pending[name]
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    report[name] = future.result()
+                    print(f'{name} {report[name][0]} in {report[name][1]:.1f}s.')
+
+        with self.lock:
+            self.save()
+
+        total = time.perf_counter() - start
+        print(f'\n{"stage":<10}{"status":<9}{"seconds":>9}')
+        for name in names:
+            status, seconds = report[name]
+            print(f'{name:<10}{status:<9}{seconds:>9.1f}')
+        print(f'{"total":<19}{total:>9.1f}')
+
+        return report
@@ -1,5 +1,17 @@
 from pathlib import Path
 
-Path('flats-data').mkdir(parents=True, exist_ok=True)
-Path('flats-data/listings').mkdir(parents=True, exist_ok=True)
-Path('flats-data/urls').mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+
+def main(root='.'):
+    """
+    Create directories for scraped data.
+    """
+
+    root = Path(root)
+
+    (root / 'flats-data').mkdir(parents=True, exist_ok=True)
+    (root / 'flats-data/listings').mkdir(parents=True, exist_ok=True)
+    (root / 'flats-data/urls').mkdir(parents=True, exist_ok=True)
+
+
+if __name__ == '__main__':
+    main()